@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from benchmarks.servidor_local import Catalogo, ServidorCatalogo
+from benchmarks.ejecutar_motor import MOTORES, MARCA_RESULTADO
+
+# ---------------------------------------------------------
+# BENCHMARK DE RENDIMIENTO DE LOS SCRAPERS
+# ---------------------------------------------------------
+# Levanta el sitio local, ejecuta cada motor de principio a fin contra él
+# y guarda las métricas en un JSON para comparar ejecuciones entre commits.
+#
+#   python -m benchmarks.bench --motores bs4,async,pipeline --paginas 50 --detalle 200
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_motor(motor, args):
+    """Ejecuta un motor contra un servidor local nuevo y devuelve sus métricas."""
+    catalogo = Catalogo(args.paginas, args.libros_por_pagina)
+    servidor = ServidorCatalogo(catalogo, args.latencia_ms / 1000, args.tasa_error, args.tasa_429).iniciar()
+
+    with tempfile.TemporaryDirectory(prefix=f"bench-{motor}-") as temporal:
+        ruta_bd = os.path.join(temporal, "libros.db")
+        entorno = dict(
+            os.environ,
+            URL_DESTINO=servidor.url,
+            RUTA_BD=ruta_bd,
+            RUTA_CACHE=os.path.join(temporal, "cache_http.db"),
+            CACHE_HTTP="0",
+            LOG_ARCHIVO=os.path.join(temporal, "logs.log"),
+            LOG_NIVEL="WARNING",
+            METRICAS_ARCHIVO="",
+            N_PAGINA=str(args.paginas),
+            LIBROS_NAVEGA_DETALLE=str(args.detalle),
+            CONCURRENCIA=str(args.concurrencia),
+            TASA_RPS=str(args.tasa_rps),
+            TASA_MAX_RPS=str(args.tasa_rps),
+            TASA_RAFAGA=str(args.concurrencia),
+            PYTHONPATH=RAIZ,
+        )
+
+        print(f"⏱️  {motor}: {args.paginas} páginas, {args.detalle} detalles contra {servidor.url}")
+        proceso = subprocess.run(
+            [sys.executable, "-m", "benchmarks.ejecutar_motor", motor],
+            cwd=RAIZ, env=entorno, capture_output=True, text=True
+        )
+        servidor.detener()
+
+        lineas = [l for l in proceso.stdout.splitlines() if l.startswith(MARCA_RESULTADO)]
+        if proceso.returncode != 0 or not lineas:
+            error = (proceso.stderr.strip().splitlines() or ["sin salida"])[-1]
+            print(f"   ❌ {motor} falló: {error}")
+            return {"error": error}
+
+        medido = json.loads(lineas[-1][len(MARCA_RESULTADO):])
+
+        conn = sqlite3.connect(ruta_bd)
+        libros = conn.execute("SELECT COUNT(*) FROM libros").fetchone()[0]
+        conn.close()
+
+    segundos = medido["segundos"]
+    latencias = sorted(servidor.latencias)
+    paginas = servidor.contadores.get("catalogo", 0) + servidor.contadores.get("categoria", 0)
+    requests_totales = sum(servidor.contadores.values())
+
+    return {
+        "segundos": round(segundos, 3),
+        "requests": requests_totales,
+        "respuestas": dict(servidor.contadores),
+        "paginas_s": round(paginas / segundos, 2),
+        "libros": libros,
+        "libros_s": round(libros / segundos, 2),
+        "requests_s": round(requests_totales / segundos, 2),
+        "latencia_ms": {
+            "p50": round(percentil(latencias, 50) * 1000, 2),
+            "p95": round(percentil(latencias, 95) * 1000, 2),
+            "p99": round(percentil(latencias, 99) * 1000, 2),
+        },
+        "escritura_bd_s": round(medido["escritura_bd"]["segundos"], 4),
+        "lotes_bd": medido["escritura_bd"]["lotes"],
+        "rss_pico_mb": round(medido["rss_pico_mb"], 1),
+        # Histogramas y contadores del propio motor (lado cliente)
+        "metricas": medido["metricas"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los scrapers contra un sitio local")
+    parser.add_argument("--motores", default="bs4,async,pipeline", help=f"Lista separada por comas: {', '.join(MOTORES)}")
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--libros-por-pagina", type=int, default=20)
+    parser.add_argument("--detalle", type=int, default=50, help="Libros cuyo detalle se visita")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--tasa-rps", type=float, default=1000, help="Presupuesto del limitador (req/s)")
+    parser.add_argument("--latencia-ms", type=float, default=20, help="Latencia inyectada por request")
+    parser.add_argument("--tasa-error", type=float, default=0, help="Fracción de respuestas 500")
+    parser.add_argument("--tasa-429", type=float, default=0, help="Fracción de respuestas 429 con Retry-After")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmarks/resultados/)")
+    args = parser.parse_args()
+
+    resultados = {}
+    for motor in args.motores.split(","):
+        motor = motor.strip()
+        if motor not in MOTORES:
+            print(f"❌ Motor desconocido: {motor}")
+            continue
+        resultados[motor] = ejecutar_motor(motor, args)
+
+    # ----------- RESUMEN EN PANTALLA ------------
+    print(f"\n{'Motor':<10} {'Seg':>8} {'Pág/s':>8} {'Libros/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'BD s':>7} {'RSS MB':>7}")
+    for motor, r in resultados.items():
+        if "error" in r:
+            print(f"{motor:<10} error: {r['error']}")
+            continue
+        lat = r["latencia_ms"]
+        print(
+            f"{motor:<10} {r['segundos']:>8.2f} {r['paginas_s']:>8.1f} {r['libros_s']:>9.1f} "
+            f"{lat['p50']:>8.1f} {lat['p95']:>8.1f} {lat['p99']:>8.1f} {r['escritura_bd_s']:>7.3f} {r['rss_pico_mb']:>7.1f}"
+        )
+
+    # ----------- RESULTADOS EN JSON ------------
+    commit = commit_actual()
+    fecha = datetime.now()
+    salida = args.salida or os.path.join(
+        DIRECTORIO_RESULTADOS, f"{fecha:%Y%m%d-%H%M%S}{'-' + commit if commit else ''}.json"
+    )
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "fecha": fecha.isoformat(timespec="seconds"),
+            "commit": commit,
+            "configuracion": vars(args),
+            "resultados": resultados,
+        }, f, indent=2, ensure_ascii=False)
+
+    print(f"\n📁 Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
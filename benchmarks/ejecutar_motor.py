@@ -0,0 +1,54 @@
+import sys
+import json
+import time
+import resource
+from importlib import import_module
+
+# ---------------------------------------------------------
+# EJECUCIÓN DE UN MOTOR EN UN PROCESO AISLADO
+# ---------------------------------------------------------
+# bench.py lanza este módulo en un subproceso con las variables de entorno
+# ya apuntando al servidor local, para que cada motor lea su configuración
+# al importarse exactamente igual que en una ejecución normal.
+
+MOTORES = {
+    "bs4": ("scrapers.scraper_bs4", "scraper_bs4"),
+    "async": ("scrapers.scraper_async", "scraper_async"),
+    "pipeline": ("scrapers.scraper_pipeline", "scraper_pipeline"),
+    "selenium": ("scrapers.scraper_selenium", "scraper_selenium"),
+    "hibrido": ("scrapers.scraper_hibrido", "scraper_hibrido"),
+}
+
+# Prefijo de la línea de stdout que contiene el resultado en JSON
+MARCA_RESULTADO = "RESULTADO_BENCH "
+
+
+def main():
+    motor = sys.argv[1]
+    modulo, funcion = MOTORES[motor]
+
+    from db.base_datos import crear_tablas, ESTADISTICAS_ESCRITURA
+    from utils.metricas import metricas
+    crear_tablas()
+
+    scraper = getattr(import_module(modulo), funcion)
+
+    inicio = time.perf_counter()
+    scraper()
+    duracion = time.perf_counter() - inicio
+
+    # ru_maxrss está en KB en Linux; los hijos cubren los procesos de parseo
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    resultado = {
+        "segundos": duracion,
+        "escritura_bd": dict(ESTADISTICAS_ESCRITURA),
+        "rss_pico_mb": max(propio, hijos) / 1024,
+        "metricas": metricas.instantanea(),
+    }
+    print(MARCA_RESULTADO + json.dumps(resultado), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+import re
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ---------------------------------------------------------
+# SITIO LOCAL COMPATIBLE CON BOOKS TO SCRAPE
+# ---------------------------------------------------------
+# Genera al vuelo páginas de catálogo, categorías, detalle e imágenes con
+# el mismo marcado que https://books.toscrape.com/, para medir los
+# scrapers sin depender de la red ni castigar el sitio real.
+
+RATINGS = ["One", "Two", "Three", "Four", "Five"]
+CATEGORIAS = ["Travel", "Mystery", "Historical Fiction", "Poetry", "Science", "Fantasy", "Romance", "Humor"]
+
+PLANTILLA_PAGINA = """<!DOCTYPE html>
+<html lang="en-us" class="no-js">
+<head>
+    <title>{titulo} | Books to Scrape - Sandbox</title>
+    <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+    <link rel="stylesheet" type="text/css" href="{raiz}static/oscar/css/styles.css" />
+</head>
+<body id="default" class="default">
+<div class="container-fluid page">
+    <div class="page_inner">
+        <ul class="breadcrumb">
+            <li><a href="{raiz}index.html">Home</a></li>
+            {migas}
+        </ul>
+        <div class="row">
+            <aside class="sidebar col-sm-4 col-md-3">
+                <div class="side_categories">
+                    <ul class="nav nav-list">
+                        <li>
+                            <a href="{raiz}catalogue/category/books_1/index.html">Books</a>
+                            <ul>
+{categorias}
+                            </ul>
+                        </li>
+                    </ul>
+                </div>
+            </aside>
+            <div class="col-sm-8 col-md-9">
+{contenido}
+            </div>
+        </div>
+    </div>
+</div>
+</body>
+</html>
+"""
+
+PLANTILLA_ARTICULO = """
+<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+    <article class="product_pod">
+        <div class="image_container">
+            <a href="{prefijo}{slug}/index.html"><img src="{raiz}media/cache/{imagen}" alt="{titulo}" class="thumbnail"></a>
+        </div>
+        <p class="star-rating {rating}">
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+            <i class="icon-star"></i>
+        </p>
+        <h3><a href="{prefijo}{slug}/index.html" title="{titulo}">{titulo_corto}</a></h3>
+        <div class="product_price">
+            <p class="price_color">£{precio}</p>
+            <p class="{clase_stock} availability">
+                <i class="icon-ok"></i>
+                {disponibilidad}
+            </p>
+            <form><button type="submit" class="btn btn-primary btn-block">Add to basket</button></form>
+        </div>
+    </article>
+</li>"""
+
+PLANTILLA_DETALLE = """
+<article class="product_page">
+    <div class="row">
+        <div class="col-sm-6">
+            <div id="product_gallery" class="carousel">
+                <div class="thumbnail"><div class="carousel-inner"><div class="item active">
+                    <img src="../../media/cache/{imagen}" alt="{titulo}" />
+                </div></div></div>
+            </div>
+        </div>
+        <div class="col-sm-6 product_main">
+            <h1>{titulo}</h1>
+            <p class="price_color">£{precio}</p>
+            <p class="{clase_stock} availability">
+                <i class="icon-ok"></i>
+                {disponibilidad_detalle}
+            </p>
+            <p class="star-rating {rating}"><i class="icon-star"></i></p>
+        </div>
+    </div>
+    <div id="product_description" class="sub-header">
+        <h2>Product Description</h2>
+    </div>
+    <p>{descripcion}</p>
+    <div class="sub-header">
+        <h2>Product Information</h2>
+    </div>
+    <table class="table table-striped">
+        <tr><th>UPC</th><td>{upc}</td></tr>
+        <tr><th>Product Type</th><td>Books</td></tr>
+        <tr><th>Price (excl. tax)</th><td>£{precio}</td></tr>
+        <tr><th>Availability</th><td>{disponibilidad_detalle}</td></tr>
+        <tr><th>Number of reviews</th><td>0</td></tr>
+    </table>
+</article>"""
+
+
+class Catalogo:
+    """Catálogo sintético determinista: el mismo número de libro genera siempre los mismos datos."""
+
+    def __init__(self, paginas=50, libros_por_pagina=20, semilla=0):
+        self.paginas = paginas
+        self.libros_por_pagina = libros_por_pagina
+        self.total = paginas * libros_por_pagina
+        self.semilla = semilla
+
+    def libro(self, n):
+        aleatorio = random.Random(f"{self.semilla}-{n}")
+        en_stock = aleatorio.random() > 0.1
+        unidades = aleatorio.randint(1, 22)
+        titulo = f"Libro de prueba {n}: {aleatorio.choice(['El viaje', 'La sombra', 'Un misterio', 'Poemas'])}"
+        return {
+            "n": n,
+            "titulo": titulo,
+            "slug": f"libro-de-prueba-{n}_{n}",
+            "precio": f"{aleatorio.uniform(10, 60):.2f}",
+            "rating": aleatorio.choice(RATINGS),
+            "categoria": CATEGORIAS[n % len(CATEGORIAS)],
+            "imagen": f"{n % 97:02x}/{n % 89:02x}/{hashlib.md5(str(n).encode()).hexdigest()}.jpg",
+            "upc": hashlib.sha1(f"upc-{n}".encode()).hexdigest()[:16],
+            "clase_stock": "instock" if en_stock else "outofstock",
+            "disponibilidad": "In stock" if en_stock else "Out of stock",
+            "disponibilidad_detalle": f"In stock ({unidades} available)" if en_stock else "Out of stock",
+            "descripcion": f"Descripción del libro {n}. " + "Lorem ipsum dolor sit amet. " * aleatorio.randint(5, 30),
+        }
+
+    def _categorias_html(self, raiz):
+        return "\n".join(
+            f'<li><a href="{raiz}catalogue/category/books/{self._slug_categoria(i)}/index.html">{nombre}</a></li>'
+            for i, nombre in enumerate(CATEGORIAS)
+        )
+
+    @staticmethod
+    def _slug_categoria(i):
+        return f"{CATEGORIAS[i].lower().replace(' ', '-')}_{i + 2}"
+
+    def _listado(self, numeros, pagina, total_paginas, raiz, prefijo, titulo, migas):
+        articulos = "".join(
+            PLANTILLA_ARTICULO.format(
+                prefijo=prefijo, raiz=raiz, titulo_corto=libro["titulo"][:20] + "...", **libro
+            )
+            for libro in map(self.libro, numeros)
+        )
+        siguiente = (
+            f'<li class="next"><a href="page-{pagina + 1}.html">next</a></li>' if pagina < total_paginas else ""
+        )
+        anterior = f'<li class="previous"><a href="page-{pagina - 1}.html">previous</a></li>' if pagina > 1 else ""
+        contenido = f"""
+                <div class="page-header action"><h1>{titulo}</h1></div>
+                <section>
+                    <ol class="row">{articulos}
+                    </ol>
+                    <div>
+                        <ul class="pager">
+                            {anterior}
+                            <li class="current">Page {pagina} of {total_paginas}</li>
+                            {siguiente}
+                        </ul>
+                    </div>
+                </section>"""
+        return PLANTILLA_PAGINA.format(
+            titulo=titulo, raiz=raiz, migas=migas, categorias=self._categorias_html(raiz), contenido=contenido
+        )
+
+    def pagina_catalogo(self, pagina):
+        if not 1 <= pagina <= self.paginas:
+            return None
+        inicio = (pagina - 1) * self.libros_por_pagina
+        numeros = range(inicio, inicio + self.libros_por_pagina)
+        return self._listado(numeros, pagina, self.paginas, "../", "", "All products",
+                             '<li class="active">All products</li>')
+
+    def pagina_categoria(self, indice, pagina):
+        if not 0 <= indice < len(CATEGORIAS):
+            return None
+        numeros = list(range(indice, self.total, len(CATEGORIAS)))
+        total_paginas = max(1, -(-len(numeros) // self.libros_por_pagina))
+        if not 1 <= pagina <= total_paginas:
+            return None
+        trozo = numeros[(pagina - 1) * self.libros_por_pagina: pagina * self.libros_por_pagina]
+        migas = f'<li><a href="../../../category/books_1/index.html">Books</a></li><li class="active">{CATEGORIAS[indice]}</li>'
+        return self._listado(trozo, pagina, total_paginas, "../../../../", "../../../", CATEGORIAS[indice], migas)
+
+    def pagina_detalle(self, n):
+        if not 0 <= n < self.total:
+            return None
+        libro = self.libro(n)
+        indice = CATEGORIAS.index(libro["categoria"])
+        migas = (
+            '<li><a href="../category/books_1/index.html">Books</a></li>'
+            f'<li><a href="../category/books/{self._slug_categoria(indice)}/index.html">{libro["categoria"]}</a></li>'
+            f'<li class="active">{libro["titulo"]}</li>'
+        )
+        return PLANTILLA_PAGINA.format(
+            titulo=libro["titulo"], raiz="../../", migas=migas, categorias=self._categorias_html("../../"),
+            contenido=PLANTILLA_DETALLE.format(**libro)
+        )
+
+
+class ServidorCatalogo:
+    """
+    Servidor HTTP local que sirve un Catalogo.
+
+    Permite inyectar latencia, errores 500 y respuestas 429 con Retry-After,
+    y guarda la latencia de cada request (lado servidor) para los percentiles.
+    """
+
+    RUTAS = [
+        (re.compile(r"^/catalogue/page-(\d+)\.html$"), "catalogo"),
+        (re.compile(r"^/catalogue/category/books/[^/]+_(\d+)/(?:index|page-(\d+))\.html$"), "categoria"),
+        (re.compile(r"^/catalogue/[^/]+_(\d+)/index\.html$"), "detalle"),
+        (re.compile(r"^/media/cache/.+\.jpg$"), "imagen"),
+        (re.compile(r"^/(?:index\.html)?$"), "inicio"),
+    ]
+
+    def __init__(self, catalogo, latencia=0.0, tasa_error=0.0, tasa_429=0.0, puerto=0, host="127.0.0.1"):
+        self.catalogo = catalogo
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.tasa_429 = tasa_429
+        self.latencias = []
+        self.contadores = {}
+        self._lock = threading.Lock()
+        self._aleatorio = random.Random(1234)
+
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                servidor._atender(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, puerto), Manejador)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/"
+        self._hilo = threading.Thread(target=self.httpd.serve_forever, name="servidor-catalogo", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _contar(self, clave, latencia=None):
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + 1
+            if latencia is not None:
+                self.latencias.append(latencia)
+
+    def _resolver(self, ruta):
+        for patron, tipo in self.RUTAS:
+            coincidencia = patron.match(ruta)
+            if not coincidencia:
+                continue
+            if tipo == "catalogo":
+                return tipo, self.catalogo.pagina_catalogo(int(coincidencia.group(1)))
+            if tipo == "categoria":
+                pagina = int(coincidencia.group(2) or 1)
+                return tipo, self.catalogo.pagina_categoria(int(coincidencia.group(1)) - 2, pagina)
+            if tipo == "detalle":
+                return tipo, self.catalogo.pagina_detalle(int(coincidencia.group(1)))
+            if tipo == "imagen":
+                return tipo, hashlib.sha256(ruta.encode()).digest() * 64
+            return tipo, self.catalogo.pagina_catalogo(1)
+        return "desconocida", None
+
+    def _atender(self, peticion):
+        inicio = time.perf_counter()
+
+        with self._lock:
+            azar = self._aleatorio.random()
+
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        if azar < self.tasa_429:
+            self._responder(peticion, 429, b"Too Many Requests", {"Retry-After": "1"})
+            self._contar("429", time.perf_counter() - inicio)
+            return
+
+        if azar < self.tasa_429 + self.tasa_error:
+            self._responder(peticion, 500, b"Internal Server Error")
+            self._contar("500", time.perf_counter() - inicio)
+            return
+
+        tipo, cuerpo = self._resolver(peticion.path.split("?")[0])
+        if cuerpo is None:
+            self._responder(peticion, 404, b"Not Found")
+            self._contar("404", time.perf_counter() - inicio)
+            return
+
+        if isinstance(cuerpo, str):
+            # Igual que el sitio real: UTF-8 sin charset en la cabecera
+            cuerpo = cuerpo.encode("utf-8")
+            content_type = "text/html"
+        else:
+            content_type = "image/jpeg"
+
+        etag = '"' + hashlib.md5(cuerpo).hexdigest() + '"'
+        if peticion.headers.get("If-None-Match") == etag:
+            self._responder(peticion, 304, b"", {"ETag": etag})
+            self._contar("304", time.perf_counter() - inicio)
+            return
+
+        self._responder(peticion, 200, cuerpo, {"Content-Type": content_type, "ETag": etag})
+        self._contar(tipo, time.perf_counter() - inicio)
+
+    @staticmethod
+    def _responder(peticion, estado, cuerpo, cabeceras=None):
+        peticion.send_response(estado)
+        for clave, valor in (cabeceras or {}).items():
+            peticion.send_header(clave, valor)
+        peticion.send_header("Content-Length", str(len(cuerpo)))
+        peticion.end_headers()
+        peticion.wfile.write(cuerpo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sitio local compatible con Books to Scrape")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--paginas", type=int, default=50)
+    parser.add_argument("--libros-por-pagina", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--tasa-error", type=float, default=0)
+    parser.add_argument("--tasa-429", type=float, default=0)
+    args = parser.parse_args()
+
+    catalogo = Catalogo(args.paginas, args.libros_por_pagina)
+    servidor = ServidorCatalogo(
+        catalogo, args.latencia_ms / 1000, args.tasa_error, args.tasa_429, puerto=args.puerto
+    ).iniciar()
+
+    print(f"🌐 Sirviendo {catalogo.total} libros en {args.paginas} páginas en {servidor.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
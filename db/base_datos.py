@@ -1,10 +1,26 @@
 import sqlite3
 import os
+import json
+import time
+import hashlib
+import threading
 from utils.logger import log
+from utils.metricas import metricas
+from utils.vistos import ConjuntoVistos
+from db.migraciones import migrar, VERSION_ESQUEMA
 
 # Ruta a la base de datos SQLite (tomada desde variable de entorno)
 RUTA_BD = os.getenv("RUTA_BD", "data/libros.db")
 
+# Filas acumuladas antes de volcar un lote a la BD
+BD_TAMANO_LOTE = int(os.getenv("BD_TAMANO_LOTE", 200))
+
+# Segundos máximos que un lote puede quedar sin volcar
+BD_INTERVALO_LOTE = float(os.getenv("BD_INTERVALO_LOTE", 5))
+
+# Acumulado de todos los escritores del proceso (lo leen los benchmarks)
+ESTADISTICAS_ESCRITURA = {"lotes": 0, "filas": 0, "segundos": 0.0}
+
 
 # ------------------------------------------------
 # CONEXIÓN A LA BASE DE DATOS
@@ -15,75 +31,26 @@ def conectar():
 
 
 # ------------------------------------------------
-# VERIFICAR SI UN LIBRO YA EXISTE EN LA BD
-# ------------------------------------------------
-def existe_libro(titulo):
-    conn = None
-    try:
-        conn = conectar()
-        cur = conn.cursor()
-
-        log("INFO", f"Verificando existencia del libro: {titulo}")
-        print(f"\n🔍 Verificando existencia: {titulo}")
-
-        # Consulta simple para comprobar si el título ya está registrado
-        cur.execute("SELECT 1 FROM libros WHERE titulo = ? LIMIT 1", (titulo,))
-        existe = cur.fetchone() is not None
-
-        msg = "YA existe" if existe else "NO existe"
-        log("INFO", f"El libro {msg} en la BD: {titulo}")
-
-        return existe
-
-    except Exception as e:
-        # Manejo de errores durante la verificación
-        log("ERROR", f"Error al verificar existencia: {e}")
-        print(f"❌ Error verificando libro {titulo}: {e}")
-        return False
-
-    finally:
-        # Se cierra siempre la conexión
-        if conn:
-            conn.close()
-
-
-# ------------------------------------------------
-# CREACIÓN DE TABLAS SI NO EXISTEN
+# CREACIÓN / MIGRACIÓN DEL ESQUEMA
 # ------------------------------------------------
 def crear_tablas():
+    """
+    Crea las tablas si no existen y aplica las migraciones pendientes
+    (db/migraciones.py), de modo que una BD antigua se actualiza en el sitio.
+    """
     conn = None
     try:
         conn = conectar()
-        cur = conn.cursor()
-
-        # Comprueba si la tabla libros ya existe
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='libros';")
-        if cur.fetchone():
-            log("INFO", "La tabla 'libros' ya existe. No se creó nuevamente.")
-            return
+        aplicadas = migrar(conn)
 
-        # Creación de la tabla con todos los campos necesarios
-        cur.execute("""
-            CREATE TABLE libros (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                titulo TEXT UNIQUE,
-                precio DECIMAL(10,2),
-                disponibilidad TEXT,
-                rating INTEGER,
-                url_imagen TEXT,
-                descripcion TEXT,
-                upc TEXT,
-                categoria TEXT,
-                fecha_extraccion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        conn.commit()
-        log("INFO", "Tabla 'libros' creada correctamente.")
+        if aplicadas:
+            log("INFO", f"Esquema actualizado a la versión {VERSION_ESQUEMA}")
+        else:
+            log("INFO", f"El esquema ya está en la versión {VERSION_ESQUEMA}. No se modificó.")
 
     except Exception as e:
-        # Registra cualquier error durante la creación
-        log("ERROR", f"Error al crear tabla: {e}")
+        # Registra cualquier error durante la creación o la migración
+        log("ERROR", f"Error al crear / migrar tablas: {e}")
 
     finally:
         if conn:
@@ -91,83 +58,468 @@ def crear_tablas():
 
 
 # ------------------------------------------------
-# GUARDAR LIBRO EN LA BD (EVITA DUPLICADOS)
+# ESCRITOR POR LOTES (UNA CONEXIÓN POR EJECUCIÓN)
 # ------------------------------------------------
-def guardar_libro(libro):
-    conn = None
-    try:
-        titulo = libro.get("titulo", "")
 
-        # A veces BS4 trae caracteres raros; se normaliza el precio aquí
-        libro["precio"] = libro.get("precio", "").replace("Â", "€")
-
-        log("INFO", f"Intentando guardar libro: {titulo}")
-
-        # Verifica primero si ya existe el libro
-        if existe_libro(titulo):
-            log("INFO", f"Omitido por duplicado: {titulo}")
-            print(f"⏩ Se omite (duplicado): {titulo}")
+# Toda escritura que cambia una fila de libros anota cuándo (con milisegundos)
+# y una revisión creciente: las escrituras en SQLite se serializan, así que
+# cada transacción confirmada tiene revisiones mayores que todas las
+# anteriores. Las exportaciones incrementales usan la revisión como marca.
+SQL_AHORA = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+SQL_NUEVA_REVISION = "(SELECT COALESCE(MAX(revision), 0) + 1 FROM libros)"
+
+# Inserta el libro o, si su URL ya existe, refresca sus datos de listado.
+# El WHERE evita reescribir filas cuyos campos no han cambiado.
+#
+# ?7 es la fecha de los datos si no son de ahora (el reprocesado de un WARC
+# pasa la de la respuesta archivada): se anota como fecha del cambio y una
+# copia más antigua que el último cambio del listado en la BD no lo pisa.
+SQL_UPSERT_LIBRO = f"""
+    INSERT INTO libros (url, titulo, precio_centimos, disponibilidad, rating, url_imagen,
+                        actualizado_en, revision, listado_cambio)
+    VALUES (?, ?, ?, ?, ?, ?, COALESCE(?7, {SQL_AHORA}), {SQL_NUEVA_REVISION}, COALESCE(?7, {SQL_AHORA}))
+    ON CONFLICT(url) DO UPDATE SET
+        titulo = excluded.titulo,
+        precio_centimos = excluded.precio_centimos,
+        disponibilidad = excluded.disponibilidad,
+        rating = excluded.rating,
+        url_imagen = excluded.url_imagen,
+        -- Si cambia la portada, la descargada deja de valer
+        imagen_ruta = CASE WHEN url_imagen IS excluded.url_imagen THEN imagen_ruta END,
+        imagen_hash = CASE WHEN url_imagen IS excluded.url_imagen THEN imagen_hash END,
+        actualizado_en = excluded.actualizado_en,
+        revision = excluded.revision,
+        listado_cambio = excluded.listado_cambio
+    WHERE (titulo IS NOT excluded.titulo
+       OR precio_centimos IS NOT excluded.precio_centimos
+       OR disponibilidad IS NOT excluded.disponibilidad
+       OR rating IS NOT excluded.rating
+       OR url_imagen IS NOT excluded.url_imagen)
+      AND (?7 IS NULL OR COALESCE(listado_cambio, actualizado_en, '') <= ?7)
+"""
+
+# Filas migradas de versiones antiguas (sin URL): se les asigna la URL por título
+SQL_ADOPTAR_LIBRO = "UPDATE OR IGNORE libros SET url = ? WHERE url IS NULL AND titulo = ?"
+
+SQL_ASEGURAR_CATEGORIA = """
+    INSERT OR IGNORE INTO categorias (nombre)
+    SELECT :categoria WHERE :categoria <> ''
+"""
+
+# :fecha, como ?7 en SQL_UPSERT_LIBRO, frente a la última lectura del detalle
+SQL_ACTUALIZAR_DETALLE = f"""
+    UPDATE libros
+    SET descripcion = :descripcion, upc = :upc,
+        categoria_id = (SELECT id FROM categorias WHERE nombre = :categoria),
+        actualizado_en = COALESCE(:fecha, {SQL_AHORA}), revision = {SQL_NUEVA_REVISION}
+    WHERE url = :url
+      AND (descripcion IS NOT :descripcion OR upc IS NOT :upc
+           OR categoria_id IS NOT (SELECT id FROM categorias WHERE nombre = :categoria))
+      AND (:fecha IS NULL OR COALESCE(detalle_fecha, '') <= :fecha)
+"""
+
+# Cuándo se leyó el detalle, haya cambiado o no: no es un dato del libro,
+# así que no mueve la revisión (no sale en las exportaciones incrementales)
+SQL_MARCAR_DETALLE = f"""
+    UPDATE libros SET detalle_fecha = COALESCE(:fecha, {SQL_AHORA})
+    WHERE url = :url AND (:fecha IS NULL OR COALESCE(detalle_fecha, '') <= :fecha)
+"""
+
+# Los N mejores candidatos para visitar su detalle: cada candidato se busca
+# por URL y solo esas filas se ordenan
+SQL_PLANIFICAR_DETALLE = """
+    SELECT url, (upc IS NULL OR descripcion IS NULL) AS incompleto, detalle_fecha
+    FROM libros
+    WHERE url IS NOT NULL AND url IN (SELECT url FROM temp.candidatos_detalle)
+    ORDER BY (upc IS NULL OR descripcion IS NULL) DESC, detalle_fecha, listado_cambio DESC
+    LIMIT ?
+"""
+
+# Libros con URL a los que aún les falta el UPC o la descripción; recorre
+# solo idx_libros_sin_detalle, no la tabla
+SQL_SIN_DETALLE = """
+    SELECT COUNT(*) FROM libros
+    WHERE url IS NOT NULL AND (upc IS NULL OR descripcion IS NULL)
+"""
+
+# Categoría vista en el listado de una categoría (modo descubrimiento)
+SQL_CATEGORIZAR = f"""
+    UPDATE libros
+    SET categoria_id = (SELECT id FROM categorias WHERE nombre = :categoria),
+        actualizado_en = {SQL_AHORA}, revision = {SQL_NUEVA_REVISION}
+    WHERE url = :url
+      AND categoria_id IS NOT (SELECT id FROM categorias WHERE nombre = :categoria)
+"""
+
+# Anota la portada descargada en todos los libros que la usan
+SQL_GUARDAR_IMAGEN = f"""
+    UPDATE libros SET imagen_ruta = ?, imagen_hash = ?,
+        actualizado_en = {SQL_AHORA}, revision = {SQL_NUEVA_REVISION}
+    WHERE url_imagen = ? AND imagen_hash IS NOT ?
+"""
+
+SQL_GUARDAR_HUELLA = """
+    INSERT INTO huellas (url, huella, enlaces, fecha)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(url) DO UPDATE SET
+        huella = excluded.huella,
+        enlaces = excluded.enlaces,
+        fecha = excluded.fecha
+"""
+
+
+def calcular_huella(html):
+    """Huella corta del contenido de una página (blake2b de 128 bits)."""
+    return hashlib.blake2b(html.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EscritorLibros:
+    """
+    Persistencia por lotes para una ejecución completa del scraper.
+
+    - Mantiene una única conexión abierta en modo WAL.
+    - Acumula libros y detalles en memoria y los vuelca con executemany
+      dentro de una transacción cuando se alcanzan BD_TAMANO_LOTE filas
+      o pasan BD_INTERVALO_LOTE segundos.
+    - Usa INSERT ... ON CONFLICT(url) DO UPDATE en lugar de consultar
+      antes si el libro existe; la clave es la URL del detalle.
+    - Carga al abrir las URLs ya guardadas en un ConjuntoVistos
+      (utils/vistos.py): saber si un libro es nuevo cuesta O(1) en memoria.
+      El mismo tipo de estructura descarta los enlaces de detalle repetidos
+      antes de encolarlos (enlaces_nuevos).
+    - Cada transacción anota en `ejecucion_escritura` la ejecución del
+      historial (la variable EJECUCION_ID que fija db/historial.ejecucion),
+      de donde la leen los disparadores del historial.
+
+    Se usa como context manager para garantizar el último volcado:
+
+        with EscritorLibros() as escritor:
+            escritor.guardar(libro)
+            escritor.actualizar(enlace, descripcion, upc, categoria)
+    """
+
+    def __init__(self, ruta=RUTA_BD, tamano_lote=BD_TAMANO_LOTE, intervalo=BD_INTERVALO_LOTE, ejecucion_id=None):
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+
+        # Se lee al abrir, no al importar: la ejecución empieza después
+        if ejecucion_id is None and os.getenv("EJECUCION_ID"):
+            ejecucion_id = int(os.getenv("EJECUCION_ID"))
+        self.ejecucion_id = ejecucion_id
+
+        # check_same_thread=False: el acceso se serializa con self._lock
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        self._libros = []
+        self._adopciones = []
+        self._detalles = []
+        self._categorias = []
+        self._marcas_detalle = []
+        self._huellas_nuevas = []
+        self._imagenes = []
+        self._ultimo_volcado = time.monotonic()
+        self._volcado_fallido = False
+        self._lock = threading.Lock()
+
+        # Huellas de la ejecución anterior, cargadas una sola vez
+        self._huellas = dict(self.conn.execute("SELECT url, huella FROM huellas"))
+
+        # Solo hace falta adoptar filas por título si quedan filas migradas sin URL
+        self._adoptar = self.conn.execute("SELECT EXISTS(SELECT 1 FROM libros WHERE url IS NULL)").fetchone()[0]
+        self.filas_modificadas = 0
+
+        # URLs de libros ya guardados y enlaces de detalle ya encolados en esta ejecución
+        total = self.conn.execute("SELECT COUNT(*) FROM libros WHERE url IS NOT NULL").fetchone()[0]
+        urls = (fila[0] for fila in self.conn.execute("SELECT url FROM libros WHERE url IS NOT NULL"))
+        self.vistos = ConjuntoVistos("libros", urls, total, consulta=self._url_en_bd)
+        self.enlaces_vistos = ConjuntoVistos("enlaces de detalle")
+        self.libros_nuevos = 0
+
+        # Libros sin detalle al planificar, para medir el avance de la cobertura
+        self._sin_detalle_inicial = None
+
+        log("INFO", f"Escritor de BD abierto en {ruta} (lote={tamano_lote}, intervalo={intervalo}s, "
+                    f"ejecución={ejecucion_id})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def guardar(self, libro, fecha=None):
+        """
+        Encola un Libro para insertarlo o refrescarlo en el próximo lote.
+
+        `fecha` ('AAAA-MM-DD HH:MM:SS.SSS', UTC) es la de los datos cuando
+        no son de ahora: no se aplican si el listado cambió después en la BD.
+        """
+        log("DEBUG", f"Libro encolado para guardar: {libro.titulo}")
+
+        # Se guarda ya como tupla de parámetros: el lote no retiene los objetos
+        parametros = libro.a_parametros() + (fecha,)
+
+        with self._lock:
+            self._libros.append(parametros)
+
+            # Una URL nueva puede ser una fila migrada sin URL que hay que adoptar
+            if self.vistos.agregar(libro.url):
+                self.libros_nuevos += 1
+                if self._adoptar:
+                    self._adopciones.append((libro.url, libro.titulo))
+
+            self._volcar_si_toca()
+
+    def enlaces_nuevos(self, enlaces):
+        """Filtra los enlaces de detalle ya encolados en esta ejecución."""
+        with self._lock:
+            return self.enlaces_vistos.nuevas(enlaces)
+
+    def _url_en_bd(self, url):
+        """Confirma un positivo del filtro de Bloom (se llama con self._lock tomado)."""
+        return self.conn.execute("SELECT 1 FROM libros WHERE url = ?", (url,)).fetchone() is not None
+
+    def actualizar(self, url, descripcion="", upc="", categoria="", fecha=None):
+        """
+        Encola la actualización de detalles del libro cuya página de detalle es `url`.
+
+        Con `fecha` (como en guardar) no se aplica si el detalle se leyó después.
+        """
+        log("DEBUG", f"Detalle encolado para actualizar: {url}")
+
+        with self._lock:
+            self._detalles.append({
+                "url": url,
+                "descripcion": descripcion,
+                "upc": upc,
+                "categoria": categoria,
+                "fecha": fecha
+            })
+            self._volcar_si_toca()
+
+    def marcar_detalle(self, url):
+        """Anota que el detalle de `url` se leyó y no había cambiado (modo incremental)."""
+        with self._lock:
+            self._marcas_detalle.append({"url": url, "fecha": None})
+            self._volcar_si_toca()
+
+    def planificar_detalle(self, candidatos, n):
+        """
+        Elige las `n` páginas de detalle más valiosas entre `candidatos`.
+
+        Orden:
+            1. Libros sin UPC o sin descripción.
+            2. Detalle leído hace más tiempo (o nunca).
+            3. Listado cambiado más recientemente.
+
+        Así cada ejecución dedica el presupuesto de detalle a lo que falta
+        y a lo más desactualizado, en lugar de a una muestra al azar que
+        puede repetir libros ya completos. Vuelca antes lo pendiente para
+        que los libros recién vistos estén en la tabla.
+        """
+        with self._lock:
+            self._volcar()
+
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS candidatos_detalle (url TEXT PRIMARY KEY)")
+            with self.conn:
+                self.conn.execute("DELETE FROM temp.candidatos_detalle")
+                self.conn.executemany("INSERT OR IGNORE INTO temp.candidatos_detalle VALUES (?)",
+                                      ((url,) for url in candidatos))
+                filas = self.conn.execute(SQL_PLANIFICAR_DETALLE, (n,)).fetchall()
+                self.conn.execute("DELETE FROM temp.candidatos_detalle")
+
+            # La cobertura se cuenta al empezar y en cerrar(), no en cada página
+            if self._sin_detalle_inicial is None:
+                self._sin_detalle_inicial = self.conn.execute(SQL_SIN_DETALLE).fetchone()[0]
+                metricas.fijar("libros_sin_detalle", self._sin_detalle_inicial)
+                print(f"\n📈 {self._sin_detalle_inicial} libros sin detalle en la BD al empezar")
+
+        incompletos = sum(1 for _, incompleto, _ in filas if incompleto)
+        nunca = sum(1 for _, _, fecha in filas if fecha is None)
+
+        print(f"\n🗓️  Detalle planificado: {len(filas)} de {len(candidatos)} candidatos "
+              f"({incompletos} sin UPC/descripción, {nunca} nunca visitados)")
+        log("INFO", f"Detalle planificado: {len(filas)} de {len(candidatos)} candidatos, "
+                    f"{incompletos} incompletos, {nunca} nunca visitados")
+        return [url for url, _, _ in filas]
+
+    def categorizar(self, url, categoria):
+        """Encola la categoría de un libro visto en el listado de esa categoría."""
+        with self._lock:
+            self._categorias.append({"url": url, "categoria": categoria})
+            self._volcar_si_toca()
+
+    # ------------------------------------------------
+    # PORTADAS DESCARGADAS
+    # ------------------------------------------------
+    def imagenes_descargadas(self):
+        """{url_imagen: (imagen_ruta, imagen_hash)} de las portadas ya descargadas."""
+        with self._lock:
+            filas = self.conn.execute("""
+                SELECT url_imagen, imagen_ruta, imagen_hash FROM libros
+                WHERE imagen_hash IS NOT NULL
+            """).fetchall()
+        return {url: (ruta, huella) for url, ruta, huella in filas}
+
+    def registrar_imagen(self, url_imagen, ruta, huella):
+        """Encola la ruta local y el hash de una portada para los libros que la usan."""
+        with self._lock:
+            self._imagenes.append((ruta, huella, url_imagen, huella))
+            self._volcar_si_toca()
+
+    # ------------------------------------------------
+    # HUELLAS DE CONTENIDO (MODO INCREMENTAL)
+    # ------------------------------------------------
+    def comparar_huella(self, url, html):
+        """
+        Calcula la huella de `html` y la compara con la guardada para `url`.
+
+        Devuelve (sin_cambios, huella).
+        """
+        huella = calcular_huella(html)
+        return self._huellas.get(url) == huella, huella
+
+    def huella_vigente(self, url, huella):
+        """Si `huella` es la de la última copia de `url` cuyos datos llegaron a la BD."""
+        return self._huellas.get(url) == huella
+
+    def enlaces_huella(self, url):
+        """Enlaces de detalle guardados junto a la huella de una página de catálogo."""
+        with self._lock:
+            fila = self.conn.execute("SELECT enlaces FROM huellas WHERE url = ?", (url,)).fetchone()
+        return json.loads(fila[0]) if fila and fila[0] else []
+
+    def registrar_huella(self, url, huella, enlaces=None):
+        """
+        Encola la huella de una página ya procesada.
+
+        Se vuelca en la misma transacción que sus libros, así una página
+        solo queda marcada como "sin cambios" si sus datos llegaron a la BD.
+        """
+        with self._lock:
+            self._huellas[url] = huella
+            self._huellas_nuevas.append((url, huella, json.dumps(enlaces) if enlaces is not None else None))
+            self._volcar_si_toca()
+
+    def volcar(self):
+        """
+        Escribe en la BD todo lo pendiente en una sola transacción.
+
+        Si la escritura falla, el lote sigue pendiente y la excepción se
+        relanza: quien necesite saber que los datos ya están en disco
+        (los trabajadores, antes de confirmar sus URLs) puede comprobarlo.
+        """
+        with self._lock:
+            self._volcar(relanzar=True)
+
+    def cerrar(self):
+        """Vuelca lo pendiente y cierra la conexión; relanza si el último volcado falla."""
+        with self._lock:
+            try:
+                self._volcar(relanzar=True)
+                sin_detalle = None
+                if self._sin_detalle_inicial is not None:
+                    sin_detalle = self.conn.execute(SQL_SIN_DETALLE).fetchone()[0]
+            finally:
+                self.conn.close()
+
+        # Avance de la cobertura de detalle en esta ejecución
+        if sin_detalle is not None:
+            metricas.fijar("libros_sin_detalle", sin_detalle)
+            print(f"\n📈 Libros sin detalle: {self._sin_detalle_inicial} → {sin_detalle}")
+            log("INFO", f"Libros sin detalle: {self._sin_detalle_inicial} → {sin_detalle}")
+
+        # Tamaño y falsos positivos de las estructuras de deduplicación
+        print(f"\n🧮 {self.libros_nuevos} libros nuevos")
+        for vistos in (self.vistos, self.enlaces_vistos):
+            vistos.publicar()
+            print(f"   {vistos.resumen()}")
+            log("INFO", f"Vistos {vistos.resumen()}")
+
+        log("INFO", "Escritor de BD cerrado")
+
+    def _volcar_si_toca(self):
+        # Tras un volcado fallido solo se reintenta por tiempo, no con cada fila nueva
+        pendientes = len(self._libros) + len(self._detalles) + len(self._categorias)
+        lleno = pendientes >= self.tamano_lote and not self._volcado_fallido
+        if lleno or time.monotonic() - self._ultimo_volcado >= self.intervalo:
+            self._volcar()
+
+    def _volcar(self, relanzar=False):
+        self._ultimo_volcado = time.monotonic()
+        if not (self._libros or self._detalles or self._categorias or self._marcas_detalle
+                or self._huellas_nuevas or self._imagenes):
             return
 
-        conn = conectar()
-        cur = conn.cursor()
-
-        # Inserta los datos básicos
-        cur.execute("""
-            INSERT INTO libros (titulo, precio, disponibilidad, rating, url_imagen)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            titulo,
-            libro.get("precio", "0.00"),
-            libro.get("disponibilidad", ""),
-            libro.get("rating", 0),
-            libro.get("imagen_url", "")
-        ))
-
-        conn.commit()
-
-        log("INFO", f"Libro guardado correctamente: {titulo}")
-        print(f"💾 Guardado en DB: {titulo}")
-
-    except Exception as e:
-        # Manejo de errores en la inserción
-        log("ERROR", f"Error al guardar libro: {e}")
-        print(f"❌ Error al guardar {titulo}: {e}")
-
-    finally:
-        if conn:
-            conn.close()
-
-
-# ------------------------------------------------
-# ACTUALIZAR DETALLES DEL LIBRO (DESCRIPCIÓN, UPC, CATEGORÍA)
-# ------------------------------------------------
-def actualizar_libro(titulo, descripcion="", upc="", categoria=""):
-    conn = None
-    try:
-        log("INFO", f"Actualizando libro: {titulo}")
-
-        conn = conectar()
-        cur = conn.cursor()
-
-        # Actualiza los campos de detalle
-        cur.execute("""
-            UPDATE libros
-            SET descripcion = ?, upc = ?, categoria = ?
-            WHERE titulo = ?
-        """, (descripcion, upc, categoria, titulo))
-
-        conn.commit()
-
-        # rowcount indica si afectó alguna fila
-        if cur.rowcount == 0:
-            log("WARNING", f"No se encontró el libro para actualizar: {titulo}")
-        else:
-            log("INFO", f"Libro actualizado: {titulo}")
-
-    except Exception as e:
-        log("ERROR", f"Error al actualizar libro: {e}")
-
-    finally:
-        if conn:
-            conn.close()
+        libros, self._libros = self._libros, []
+        adopciones, self._adopciones = self._adopciones, []
+        detalles, self._detalles = self._detalles, []
+        categorias, self._categorias = self._categorias, []
+        marcas_pendientes, self._marcas_detalle = self._marcas_detalle, []
+        marcas = marcas_pendientes + [{"url": detalle["url"], "fecha": detalle["fecha"]} for detalle in detalles]
+        huellas, self._huellas_nuevas = self._huellas_nuevas, []
+        imagenes, self._imagenes = self._imagenes, []
+
+        try:
+            inicio = time.perf_counter()
+
+            # Los libros van primero: un detalle puede referirse a un libro
+            # que todavía estaba en el mismo lote
+            with self.conn:
+                # Primera escritura: toma el bloqueo de escritura, así nadie más ve la ejecución
+                self.conn.execute("INSERT INTO ejecucion_escritura (ejecucion_id) VALUES (?)", (self.ejecucion_id,))
+                self.conn.executemany(SQL_ADOPTAR_LIBRO, adopciones)
+                self.conn.executemany(SQL_ASEGURAR_CATEGORIA, detalles)
+                self.conn.executemany(SQL_ASEGURAR_CATEGORIA, categorias)
+
+                # Solo cuentan las filas de libros realmente escritas; rowcount,
+                # a diferencia de total_changes, no suma las de los disparadores
+                modificadas = sum(
+                    self.conn.executemany(sql, filas).rowcount
+                    for sql, filas in ((SQL_UPSERT_LIBRO, libros), (SQL_ACTUALIZAR_DETALLE, detalles),
+                                       (SQL_CATEGORIZAR, categorias))
+                )
+
+                self.conn.executemany(SQL_MARCAR_DETALLE, marcas)
+
+                self.conn.executemany(SQL_GUARDAR_IMAGEN, imagenes)
+                self.conn.executemany(SQL_GUARDAR_HUELLA, huellas)
+                self.conn.execute("DELETE FROM ejecucion_escritura")
+
+            self.filas_modificadas += modificadas
+            self._volcado_fallido = False
+
+            duracion = time.perf_counter() - inicio
+            ESTADISTICAS_ESCRITURA["lotes"] += 1
+            ESTADISTICAS_ESCRITURA["filas"] += len(libros) + len(detalles)
+            ESTADISTICAS_ESCRITURA["segundos"] += duracion
+
+            metricas.observar("bd", duracion, operacion="lote")
+            metricas.contar("bd_filas", len(libros), operacion="guardar")
+            metricas.contar("bd_filas", len(detalles), operacion="actualizar")
+            metricas.contar("bd_filas_modificadas", modificadas)
+
+            log("INFO", f"Lote volcado: {len(libros)} libros, {len(detalles)} detalles, {modificadas} filas modificadas")
+            print(f"💾 Lote guardado en DB: {len(libros)} libros, {len(detalles)} detalles ({modificadas} filas modificadas)")
+
+        except Exception as e:
+            # Manejo de errores en el volcado
+            log("ERROR", f"Error al volcar lote ({len(libros)} libros, {len(detalles)} detalles): {e}")
+            metricas.contar("bd_errores", operacion="lote")
+            print(f"❌ Error al guardar lote en DB: {e}")
+
+            # El lote vuelve a los búferes, delante de lo encolado después,
+            # para reintentarlo en el próximo volcado
+            self._libros = libros + self._libros
+            self._adopciones = adopciones + self._adopciones
+            self._detalles = detalles + self._detalles
+            self._categorias = categorias + self._categorias
+            self._marcas_detalle = marcas_pendientes + self._marcas_detalle
+            self._huellas_nuevas = huellas + self._huellas_nuevas
+            self._imagenes = imagenes + self._imagenes
+            self._volcado_fallido = True
+
+            if relanzar:
+                raise
@@ -0,0 +1,98 @@
+import re
+import sqlite3
+from db.base_datos import conectar
+from utils.logger import log
+
+# ------------------------------------------------
+# BÚSQUEDA DE TEXTO COMPLETO (FTS5)
+# ------------------------------------------------
+# `libros_fts` (migración 8) indexa título, descripción y categoría de cada
+# libro; los disparadores lo actualizan con cada escritura. Una búsqueda
+# recorre solo las listas de documentos de sus términos en el índice
+# invertido, en lugar de leer todas las descripciones como LIKE '%...%'.
+#
+# Consulta simple: las palabras se buscan todas (AND), sin distinguir
+# mayúsculas ni acentos, y la última también como prefijo ("poe" → poemas).
+# Con avanzada=True el texto se pasa tal cual con la sintaxis de FTS5:
+# frases "entre comillas", OR, NOT, NEAR(), prefijos* y columna:término.
+
+# Marcas con las que se resaltan los términos encontrados
+RESALTADO = ("[", "]")
+
+# Palabras sueltas (letras y números de cualquier alfabeto)
+_PALABRA = re.compile(r"\w+")
+
+
+def consulta_simple(texto):
+    """Convierte texto libre en una consulta FTS5 segura: "a" "b" "c"*."""
+    palabras = _PALABRA.findall(texto)
+    if not palabras:
+        return None
+    terminos = [f'"{palabra}"' for palabra in palabras]
+    terminos[-1] += "*"
+    return " ".join(terminos)
+
+
+def buscar(texto, limite=20, categoria=None, avanzada=False):
+    """
+    Libros que coinciden con `texto`, del más al menos relevante (BM25).
+
+    Cada resultado trae el título con los términos resaltados y un
+    fragmento de la columna donde mejor coincide. Lanza ValueError si la
+    consulta avanzada no es válida.
+    """
+    consulta = texto if avanzada else consulta_simple(texto)
+    if not consulta:
+        return []
+
+    condiciones = ["libros_fts MATCH :consulta"]
+    if categoria is not None:
+        condiciones.append("l.categoria_id = (SELECT id FROM categorias WHERE nombre = :categoria)")
+
+    apertura, cierre = RESALTADO
+    sql = f"""
+        SELECT l.url, l.titulo, l.precio_centimos / 100.0 AS precio, l.disponibilidad, l.rating,
+               c.nombre AS categoria,
+               highlight(libros_fts, 0, '{apertura}', '{cierre}') AS titulo_resaltado,
+               snippet(libros_fts, -1, '{apertura}', '{cierre}', '…', 16) AS fragmento,
+               libros_fts.rank AS puntuacion
+        FROM libros_fts
+        JOIN libros l ON l.id = libros_fts.rowid
+        LEFT JOIN categorias c ON c.id = l.categoria_id
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY libros_fts.rank
+        LIMIT :limite
+    """
+
+    conn = conectar()
+    try:
+        cur = conn.execute(sql, {"consulta": consulta, "categoria": categoria, "limite": limite})
+        columnas = [d[0] for d in cur.description]
+        return [dict(zip(columnas, fila)) for fila in cur]
+    except sqlite3.OperationalError as e:
+        # Errores de sintaxis de FTS5 en una consulta avanzada
+        log("WARNING", f"Consulta de búsqueda no válida {consulta!r}: {e}")
+        raise ValueError(f"Consulta no válida: {e}") from e
+    finally:
+        conn.close()
+
+
+def reconstruir_indice():
+    """
+    Vuelve a indexar todos los libros y compacta el índice.
+
+    No hace falta en el uso normal (los disparadores lo mantienen); sirve
+    tras cargar filas con los disparadores desactivados o si el índice y
+    la tabla dejaran de coincidir. Devuelve el número de libros indexados.
+    """
+    conn = conectar()
+    try:
+        with conn:
+            conn.execute("INSERT INTO libros_fts (libros_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO libros_fts (libros_fts) VALUES ('optimize')")
+        total = conn.execute("SELECT COUNT(*) FROM libros").fetchone()[0]
+    finally:
+        conn.close()
+
+    log("INFO", f"Índice de búsqueda reconstruido: {total} libros")
+    return total
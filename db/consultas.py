@@ -0,0 +1,114 @@
+from db.base_datos import conectar
+from utils.logger import log
+
+# ------------------------------------------------
+# CONSULTAS DE ANÁLISIS SOBRE EL ESQUEMA NORMALIZADO
+# ------------------------------------------------
+# Cada consulta está escrita para apoyarse en un índice de db/migraciones.py:
+#
+#   libro_por_url            → UNIQUE(url)
+#   libros_por_upc           → idx_libros_upc
+#   libros_por_categoria     → categorias.nombre UNIQUE + idx_libros_categoria_precio
+#   libros_por_precio        → idx_libros_precio (o idx_libros_categoria_precio con categoría)
+#   resumen_categorias       → idx_libros_categoria_precio (índice cubriente)
+#
+# Los precios se reciben y devuelven en unidades de moneda (51.77); en la BD
+# se guardan en céntimos enteros.
+
+_COLUMNAS = """
+    l.id, l.url, l.titulo, l.precio_centimos / 100.0 AS precio, l.disponibilidad,
+    l.rating, l.url_imagen, l.descripcion, l.upc, c.nombre AS categoria, l.fecha_extraccion
+"""
+
+
+def _a_centimos(precio):
+    return None if precio is None else int(round(precio * 100))
+
+
+def _consultar(sql, parametros=()):
+    """Ejecuta una consulta y devuelve las filas como diccionarios."""
+    conn = conectar()
+    try:
+        cur = conn.execute(sql, parametros)
+        columnas = [d[0] for d in cur.description]
+        return [dict(zip(columnas, fila)) for fila in cur]
+    except Exception as e:
+        log("ERROR", f"Error en consulta: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def libro_por_url(url):
+    """Libro cuya página de detalle es `url`, o None."""
+    filas = _consultar(f"""
+        SELECT {_COLUMNAS}
+        FROM libros l LEFT JOIN categorias c ON c.id = l.categoria_id
+        WHERE l.url = ?
+    """, (url,))
+    return filas[0] if filas else None
+
+
+def libros_por_upc(upc):
+    """Libros con el UPC indicado (normalmente uno)."""
+    return _consultar(f"""
+        SELECT {_COLUMNAS}
+        FROM libros l LEFT JOIN categorias c ON c.id = l.categoria_id
+        WHERE l.upc = ?
+    """, (upc,))
+
+
+def libros_por_categoria(categoria, limite=100):
+    """Libros de una categoría ordenados por precio ascendente."""
+    return _consultar(f"""
+        SELECT {_COLUMNAS}
+        FROM categorias c JOIN libros l ON l.categoria_id = c.id
+        WHERE c.nombre = ?
+        ORDER BY l.precio_centimos
+        LIMIT ?
+    """, (categoria, limite))
+
+
+def libros_por_precio(minimo=None, maximo=None, categoria=None, limite=100):
+    """
+    Libros con precio entre `minimo` y `maximo` (ambos incluidos; None = sin límite),
+    opcionalmente dentro de una categoría, ordenados por precio.
+    """
+    condiciones = ["l.precio_centimos BETWEEN ? AND ?"]
+    parametros = [
+        _a_centimos(minimo) if minimo is not None else -1,
+        _a_centimos(maximo) if maximo is not None else 2 ** 62,
+    ]
+
+    if categoria is not None:
+        # Con la categoría fijada, idx_libros_categoria_precio resuelve filtro y orden
+        condiciones.append("l.categoria_id = (SELECT id FROM categorias WHERE nombre = ?)")
+        parametros.append(categoria)
+
+    return _consultar(f"""
+        SELECT {_COLUMNAS}
+        FROM libros l LEFT JOIN categorias c ON c.id = l.categoria_id
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY l.precio_centimos
+        LIMIT ?
+    """, (*parametros, limite))
+
+
+def resumen_categorias():
+    """Número de libros y precio mínimo / medio / máximo por categoría."""
+    return _consultar("""
+        SELECT c.nombre AS categoria,
+               r.libros,
+               r.minimo / 100.0 AS precio_minimo,
+               ROUND(r.medio / 100.0, 2) AS precio_medio,
+               r.maximo / 100.0 AS precio_maximo
+        FROM (
+            SELECT categoria_id, COUNT(*) AS libros, MIN(precio_centimos) AS minimo,
+                   AVG(precio_centimos) AS medio, MAX(precio_centimos) AS maximo
+            FROM libros
+            WHERE categoria_id IS NOT NULL
+            GROUP BY categoria_id
+        ) r
+        JOIN categorias c ON c.id = r.categoria_id
+        ORDER BY r.libros DESC, c.nombre
+    """)
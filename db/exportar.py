@@ -0,0 +1,240 @@
+import io
+import os
+import csv
+import gzip
+import json
+from datetime import datetime
+from db.base_datos import conectar
+from utils.logger import log
+
+# ------------------------------------------------
+# EXPORTACIÓN EN STREAMING DE LA TABLA LIBROS
+# ------------------------------------------------
+# Las filas se leen con fetchmany en lotes de tamaño fijo y se escriben al
+# destino según llegan, así la memoria no depende del tamaño de la tabla.
+#
+#   CSV / JSONL: texto, opcionalmente comprimido con gzip (.gz) o zstd (.zst)
+#   Parquet:     columnar con pyarrow, un row group por lote
+#
+# En modo incremental solo se exportan las filas con `revision` mayor que
+# la marca de agua guardada en la tabla `exportaciones` para ese flujo. El
+# flujo se nombra explícitamente y no depende del archivo de destino: cada
+# delta puede ir a un archivo distinto (cambios-2025-01-31.csv) sin volver
+# a exportar la tabla entera ni sobrescribir el delta anterior.
+
+TAMANO_LOTE_EXPORTACION = int(os.getenv("TAMANO_LOTE_EXPORTACION", 5000))
+
+FORMATOS = ("csv", "jsonl", "parquet")
+COMPRESIONES = ("gzip", "zstd")
+
+# (columna exportada, expresión SQL, tipo pyarrow)
+COLUMNAS = [
+    ("id", "l.id", "int64"),
+    ("url", "l.url", "string"),
+    ("titulo", "l.titulo", "string"),
+    ("precio", "l.precio_centimos / 100.0", "float64"),
+    ("precio_centimos", "l.precio_centimos", "int64"),
+    ("disponibilidad", "l.disponibilidad", "string"),
+    ("rating", "l.rating", "int64"),
+    ("categoria", "c.nombre", "string"),
+    ("upc", "l.upc", "string"),
+    ("descripcion", "l.descripcion", "string"),
+    ("url_imagen", "l.url_imagen", "string"),
+    ("imagen_ruta", "l.imagen_ruta", "string"),
+    ("imagen_hash", "l.imagen_hash", "string"),
+    ("fecha_extraccion", "l.fecha_extraccion", "string"),
+    ("actualizado_en", "l.actualizado_en", "string"),
+    ("revision", "l.revision", "int64"),
+]
+NOMBRES = [nombre for nombre, _, _ in COLUMNAS]
+
+
+def _inferir(destino, formato, compresion):
+    """Deduce formato y compresión de la extensión si no se indican."""
+    base, extension = os.path.splitext(destino.lower())
+    if compresion is None:
+        compresion = {".gz": "gzip", ".zst": "zstd"}.get(extension)
+        if compresion:
+            extension = os.path.splitext(base)[1]
+    if formato is None:
+        formato = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".parquet": "parquet"}.get(extension, "csv")
+
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato} (use {', '.join(FORMATOS)})")
+    if compresion is not None and compresion not in COMPRESIONES:
+        raise ValueError(f"Compresión no soportada: {compresion} (use {', '.join(COMPRESIONES)})")
+    return formato, compresion
+
+
+def _abrir_texto(ruta, compresion):
+    """Abre `ruta` para escribir texto, comprimido en streaming si se pide."""
+    if compresion == "gzip":
+        return gzip.open(ruta, "wt", encoding="utf-8", newline="")
+    if compresion == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("La compresión zstd requiere el paquete 'zstandard' (pip install zstandard)")
+        crudo = zstandard.ZstdCompressor().stream_writer(open(ruta, "wb"))
+        return io.TextIOWrapper(crudo, encoding="utf-8", newline="")
+    return open(ruta, "w", encoding="utf-8", newline="")
+
+
+# ------------------------------------------------
+# ESCRITORES POR FORMATO
+# ------------------------------------------------
+class _EscritorCSV:
+    def __init__(self, ruta, compresion):
+        self.archivo = _abrir_texto(ruta, compresion)
+        self.csv = csv.writer(self.archivo)
+        self.csv.writerow(NOMBRES)
+
+    def escribir(self, filas):
+        self.csv.writerows(filas)
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+class _EscritorJSONL:
+    def __init__(self, ruta, compresion):
+        self.archivo = _abrir_texto(ruta, compresion)
+
+    def escribir(self, filas):
+        self.archivo.writelines(
+            json.dumps(dict(zip(NOMBRES, fila)), ensure_ascii=False) + "\n" for fila in filas
+        )
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+class _EscritorParquet:
+    def __init__(self, ruta, compresion):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("La exportación a Parquet requiere el paquete 'pyarrow' (pip install pyarrow)")
+
+        self.pa = pa
+        self.esquema = pa.schema([(nombre, getattr(pa, tipo)()) for nombre, _, tipo in COLUMNAS])
+        # En Parquet la compresión va por columna dentro del propio archivo
+        self.escritor = pq.ParquetWriter(ruta, self.esquema, compression=compresion or "snappy")
+
+    def escribir(self, filas):
+        columnas = list(zip(*filas))
+        lote = self.pa.Table.from_arrays(
+            [self.pa.array(valores, type=campo.type) for valores, campo in zip(columnas, self.esquema)],
+            schema=self.esquema,
+        )
+        self.escritor.write_table(lote)
+
+    def cerrar(self):
+        self.escritor.close()
+
+
+ESCRITORES = {"csv": _EscritorCSV, "jsonl": _EscritorJSONL, "parquet": _EscritorParquet}
+
+
+# ------------------------------------------------
+# EXPORTACIÓN
+# ------------------------------------------------
+def exportar(destino, formato=None, compresion=None, categoria=None, desde=None,
+             incremental=False, nombre=None, tamano_lote=TAMANO_LOTE_EXPORTACION):
+    """
+    Exporta la tabla libros a `destino` en streaming y devuelve las filas escritas.
+
+    - formato: csv / jsonl / parquet (por defecto, según la extensión).
+    - compresion: gzip / zstd (por defecto, .gz / .zst en la extensión).
+    - categoria: solo libros de esa categoría.
+    - desde: solo libros actualizados en o después de esa fecha ("2025-01-31" o
+      "2025-01-31 12:00:00").
+    - incremental: solo las filas cambiadas desde la última exportación del
+      flujo `nombre`, obligatorio en este modo. Cada combinación de filtros
+      necesita su propio flujo.
+
+    El archivo se escribe en <destino>.tmp y se renombra al terminar; la marca
+    de agua solo avanza si la exportación se completa.
+    """
+    formato, compresion = _inferir(destino, formato, compresion)
+    if incremental and not nombre:
+        raise ValueError("La exportación incremental necesita el nombre de su flujo (--nombre)")
+
+    condiciones, parametros = [], []
+    if categoria is not None:
+        condiciones.append("l.categoria_id = (SELECT id FROM categorias WHERE nombre = ?)")
+        parametros.append(categoria)
+    if desde is not None:
+        condiciones.append("l.actualizado_en >= ?")
+        parametros.append(desde)
+
+    conn = conectar()
+    temporal = destino + ".tmp"
+    escritor = None
+
+    try:
+        # Una transacción de lectura: todos los lotes ven la misma instantánea
+        conn.execute("BEGIN")
+
+        marca = 0
+        if incremental:
+            fila = conn.execute("SELECT revision FROM exportaciones WHERE nombre = ?", (nombre,)).fetchone()
+            marca = fila[0] if fila else 0
+            condiciones.append("l.revision > ?")
+            parametros.append(marca)
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        cursor = conn.execute(f"""
+            SELECT {', '.join(expresion for _, expresion, _ in COLUMNAS)}
+            FROM libros l LEFT JOIN categorias c ON c.id = l.categoria_id
+            {where}
+            ORDER BY l.revision
+        """, parametros)
+
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        escritor = ESCRITORES[formato](temporal, compresion)
+
+        total = 0
+        revision_maxima = marca
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                break
+            escritor.escribir(filas)
+            total += len(filas)
+            revision_maxima = max(revision_maxima, filas[-1][-1] or 0)
+
+        escritor.cerrar()
+        escritor = None
+        conn.rollback()
+
+        os.replace(temporal, destino)
+
+        if incremental:
+            with conn:
+                conn.execute("""
+                    INSERT INTO exportaciones (nombre, revision, filas, fecha)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(nombre) DO UPDATE SET
+                        revision = excluded.revision, filas = excluded.filas, fecha = excluded.fecha
+                """, (nombre, revision_maxima, total, datetime.now().isoformat(timespec="seconds")))
+
+        flujo = f", flujo {nombre}" if incremental else ""
+        log("INFO", f"Exportación {formato} en {destino}: {total} filas (marca {marca} → {revision_maxima}{flujo})")
+        print(f"📤 Exportadas {total} filas a {destino} ({formato}{', ' + compresion if compresion else ''})")
+        return total
+
+    except Exception as e:
+        log("ERROR", f"Error exportando a {destino}: {e}")
+        if escritor is not None:
+            try:
+                escritor.cerrar()
+            except Exception:
+                pass
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+    finally:
+        conn.close()
@@ -0,0 +1,93 @@
+import re
+from db.base_datos import conectar
+from utils.logger import log
+from utils.metricas import metricas
+
+# ------------------------------------------------
+# URLS FALLIDAS (COLA DE MENSAJES MUERTOS)
+# ------------------------------------------------
+# El cliente HTTP (utils/cliente_http.py) anota aquí cada URL que sigue
+# fallando tras agotar sus reintentos: errores de red y respuestas
+# CODIGOS_REINTENTABLES. Los errores definitivos (404, 410, 403...) no
+# entran, porque reintentarlos no los arreglaría. `main.py reintentar` las
+# pasa a la frontera de rastreo y las procesa con los trabajadores, sin
+# repetir el rastreo completo.
+
+SQL_REGISTRAR_FALLIDO = """
+    INSERT INTO fallidos (url, estado, error, intentos, primera_fecha, ultima_fecha)
+    VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))
+    ON CONFLICT(url) DO UPDATE SET
+        estado = excluded.estado,
+        error = excluded.error,
+        intentos = excluded.intentos,
+        veces = veces + 1,
+        ultima_fecha = excluded.ultima_fecha
+"""
+
+_PAGINA_CATALOGO = re.compile(r"/catalogue/page-(\d+)\.html$")
+
+
+def registrar_fallido(url, estado=None, error=None, intentos=1):
+    """Anota `url` como fallida; nunca lanza, para no tapar el error original."""
+    metricas.contar("http_fallidos", estado=estado or "error")
+    log("ERROR", f"URL fallida tras {intentos} intento(s): {url} ({estado or error})")
+
+    conn = None
+    try:
+        conn = conectar()
+        with conn:
+            conn.execute(SQL_REGISTRAR_FALLIDO, (url, estado, error, intentos))
+    except Exception as e:
+        log("ERROR", f"No se pudo registrar la URL fallida {url}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def listar_fallidos():
+    """Filas de la tabla fallidos como diccionarios, las más recientes primero."""
+    conn = conectar()
+    try:
+        cur = conn.execute("SELECT * FROM fallidos ORDER BY ultima_fecha DESC")
+        columnas = [d[0] for d in cur.description]
+        return [dict(zip(columnas, fila)) for fila in cur]
+    finally:
+        conn.close()
+
+
+def clasificar(url):
+    """("listado", página) para una página de catálogo, ("detalle", None) en otro caso."""
+    coincidencia = _PAGINA_CATALOGO.search(url)
+    return ("listado", int(coincidencia.group(1))) if coincidencia else ("detalle", None)
+
+
+def reencolar_fallidos(frontera):
+    """
+    Pasa las URLs fallidas a la frontera (de nuevo pendientes) y las quita de `fallidos`.
+
+    Si vuelven a fallar, el cliente HTTP las anotará otra vez. Devuelve
+    cuántas URLs se reencolaron.
+    """
+    from db.frontera import PRIORIDAD_LISTADO, PRIORIDAD_DETALLE
+
+    urls = [fila["url"] for fila in listar_fallidos()]
+    listados, detalles = [], []
+    for url in urls:
+        tipo, pagina = clasificar(url)
+        if tipo == "listado":
+            listados.append((url, pagina))
+        else:
+            detalles.append(url)
+
+    frontera.agregar(listados, "listado", PRIORIDAD_LISTADO, reabrir=True)
+    frontera.agregar(detalles, "detalle", PRIORIDAD_DETALLE, reabrir=True)
+
+    conn = conectar()
+    try:
+        with conn:
+            conn.executemany("DELETE FROM fallidos WHERE url = ?", [(url,) for url in urls])
+    finally:
+        conn.close()
+
+    log("INFO", f"{len(urls)} URLs fallidas reencoladas ({len(listados)} catálogos, {len(detalles)} detalles)")
+    return len(urls)
@@ -0,0 +1,223 @@
+import os
+import time
+import socket
+import sqlite3
+from db.base_datos import RUTA_BD
+from utils.logger import log
+from utils.metricas import metricas
+
+# ------------------------------------------------
+# FRONTERA DE RASTREO COMPARTIDA
+# ------------------------------------------------
+# Cola persistente de URLs (páginas de catálogo y de detalle) que varios
+# procesos trabajadores, en una o varias máquinas, se reparten:
+#
+#   pendiente ──reclamar──▶ en_curso ──confirmar──▶ hecha
+#                             │  ▲
+#                   liberar / │  │ concesión caducada
+#                             ▼  │
+#                          pendiente  (o fallida al agotar los intentos)
+#
+# Reclamar concede las URLs al trabajador durante FRONTERA_CONCESION
+# segundos. Si el trabajador muere sin confirmar ni liberar, la concesión
+# caduca y el siguiente `reclamar` de cualquier trabajador las recupera.
+#
+# Los trabajadores solo usan los métodos públicos de Frontera (agregar,
+# reclamar, renovar, confirmar, liberar, resumen), así que puede sustituirse
+# por un servicio de colas con la misma interfaz sin tocar scrapers/trabajador.py.
+# Con varias máquinas sobre la misma BD, los relojes deben estar sincronizados.
+
+# Segundos que un trabajador tiene una URL antes de que otro pueda reclamarla
+FRONTERA_CONCESION = float(os.getenv("FRONTERA_CONCESION", 120))
+
+# Intentos antes de dar una URL por fallida
+FRONTERA_MAX_INTENTOS = int(os.getenv("FRONTERA_MAX_INTENTOS", 3))
+
+# Prioridades: los catálogos primero, porque descubren los detalles
+PRIORIDAD_LISTADO = 10
+PRIORIDAD_DETALLE = 0
+
+SQL_AHORA = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def nombre_trabajador():
+    """Identificador único del proceso: <host>:<pid>."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Frontera:
+    """
+    Frontera de rastreo en SQLite, compartida por todos los procesos que abren la misma BD.
+
+    Cada operación de cambio de estado es una transacción BEGIN IMMEDIATE
+    corta, de modo que dos trabajadores nunca reciben la misma URL.
+    """
+
+    def __init__(self, ruta=RUTA_BD, trabajador=None, concesion=FRONTERA_CONCESION,
+                 max_intentos=FRONTERA_MAX_INTENTOS):
+        self.trabajador = trabajador or nombre_trabajador()
+        self.concesion = concesion
+        self.max_intentos = max_intentos
+
+        # Transacciones explícitas; timeout alto porque varios procesos compiten por el lock
+        self.conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self.conn.close()
+
+    def _transaccion(self, funcion, *args):
+        """Ejecuta `funcion(*args)` dentro de BEGIN IMMEDIATE y devuelve su resultado."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = funcion(*args)
+            self.conn.execute("COMMIT")
+            return resultado
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # ------------------------------------------------
+    # ALTA DE URLS
+    # ------------------------------------------------
+    def agregar(self, urls, tipo, prioridad=0, reabrir=False):
+        """
+        Añade URLs a la frontera y devuelve cuántas quedaron pendientes.
+
+        `urls` es una lista de URLs o de pares (url, pagina). Una URL que ya
+        está en la frontera no se duplica; con `reabrir=True` las ya hechas o
+        fallidas vuelven a pendiente (nueva ronda de rastreo).
+        """
+        filas = [(u, tipo, None, prioridad) if isinstance(u, str) else (u[0], tipo, u[1], prioridad) for u in urls]
+        if not filas:
+            return 0
+
+        conflicto = f"""
+            DO UPDATE SET estado = 'pendiente', intentos = 0, error = NULL,
+                          prioridad = excluded.prioridad, actualizado_en = {SQL_AHORA}
+            WHERE estado IN ('hecha', 'fallida')
+        """ if reabrir else "DO NOTHING"
+
+        def insertar():
+            antes = self.conn.total_changes
+            self.conn.executemany(f"""
+                INSERT INTO frontera (url, tipo, pagina, prioridad, actualizado_en)
+                VALUES (?, ?, ?, ?, {SQL_AHORA})
+                ON CONFLICT(url) {conflicto}
+            """, filas)
+            return self.conn.total_changes - antes
+
+        nuevas = self._transaccion(insertar)
+        metricas.contar("frontera", nuevas, operacion="agregar", tipo=tipo)
+        return nuevas
+
+    # ------------------------------------------------
+    # CONCESIONES
+    # ------------------------------------------------
+    def reclamar(self, n):
+        """
+        Concede hasta `n` URLs pendientes a este trabajador, por prioridad.
+
+        Antes recupera las concesiones caducadas de cualquier trabajador.
+        Devuelve una lista de tuplas (url, tipo, pagina).
+        """
+        ahora = time.time()
+
+        def reclamar_lote():
+            self._recuperar_caducadas(ahora)
+            return self.conn.execute(f"""
+                UPDATE frontera
+                SET estado = 'en_curso', trabajador = ?, concesion_hasta = ?,
+                    intentos = intentos + 1, actualizado_en = {SQL_AHORA}
+                WHERE url IN (
+                    SELECT url FROM frontera
+                    WHERE estado = 'pendiente'
+                    ORDER BY prioridad DESC, rowid
+                    LIMIT ?
+                )
+                RETURNING url, tipo, pagina
+            """, (self.trabajador, ahora + self.concesion, n)).fetchall()
+
+        with metricas.medir("frontera", operacion="reclamar"):
+            lote = self._transaccion(reclamar_lote)
+
+        metricas.contar("frontera", len(lote), operacion="reclamadas")
+        return lote
+
+    def _recuperar_caducadas(self, ahora):
+        """Devuelve a pendiente (o a fallida) las URLs cuya concesión caducó."""
+        caducadas = self.conn.execute(f"""
+            UPDATE frontera
+            SET estado = CASE WHEN intentos >= ? THEN 'fallida' ELSE 'pendiente' END,
+                error = COALESCE(error, 'concesión caducada'),
+                trabajador = NULL, concesion_hasta = NULL, actualizado_en = {SQL_AHORA}
+            WHERE estado = 'en_curso' AND concesion_hasta < ?
+            RETURNING url
+        """, (self.max_intentos, ahora)).fetchall()
+
+        if caducadas:
+            metricas.contar("frontera", len(caducadas), operacion="caducadas")
+            log("WARNING", f"{len(caducadas)} concesiones caducadas recuperadas (p. ej. {caducadas[0][0]})")
+
+    def renovar(self, urls):
+        """Amplía la concesión de URLs que este trabajador sigue procesando."""
+        if not urls:
+            return
+        hasta = time.time() + self.concesion
+        self._transaccion(self.conn.executemany, """
+            UPDATE frontera SET concesion_hasta = ?
+            WHERE url = ? AND estado = 'en_curso' AND trabajador = ?
+        """, [(hasta, url, self.trabajador) for url in urls])
+
+    def confirmar(self, urls):
+        """
+        Marca como hechas las URLs procesadas (ack).
+
+        Solo afecta a las que este trabajador sigue teniendo concedidas: si
+        la concesión caducó y otro la reclamó, el resultado de ese otro manda.
+        """
+        if not urls:
+            return
+        self._transaccion(self.conn.executemany, f"""
+            UPDATE frontera
+            SET estado = 'hecha', trabajador = NULL, concesion_hasta = NULL,
+                error = NULL, actualizado_en = {SQL_AHORA}
+            WHERE url = ? AND estado = 'en_curso' AND trabajador = ?
+        """, [(url, self.trabajador) for url in urls])
+        metricas.contar("frontera", len(urls), operacion="confirmadas")
+
+    def liberar(self, urls, error=None):
+        """
+        Devuelve URLs a la frontera sin procesar (nack), para este u otro trabajador.
+
+        Con `error`, la URL pasa a fallida al agotar FRONTERA_MAX_INTENTOS.
+        """
+        if not urls:
+            return
+        self._transaccion(self.conn.executemany, f"""
+            UPDATE frontera
+            SET estado = CASE WHEN ? IS NOT NULL AND intentos >= ? THEN 'fallida' ELSE 'pendiente' END,
+                error = ?, trabajador = NULL, concesion_hasta = NULL, actualizado_en = {SQL_AHORA}
+            WHERE url = ? AND estado = 'en_curso' AND trabajador = ?
+        """, [(error, self.max_intentos, error, url, self.trabajador) for url in urls])
+        metricas.contar("frontera", len(urls), operacion="liberadas")
+
+    # ------------------------------------------------
+    # ESTADO
+    # ------------------------------------------------
+    def resumen(self):
+        """{estado: número de URLs}."""
+        return dict(self.conn.execute("SELECT estado, COUNT(*) FROM frontera GROUP BY estado"))
+
+    def activa(self):
+        """True mientras quede trabajo pendiente o en curso en algún trabajador."""
+        return self.conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM frontera WHERE estado IN ('pendiente', 'en_curso'))"
+        ).fetchone()[0] == 1
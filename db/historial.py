@@ -0,0 +1,240 @@
+import os
+import socket
+from contextlib import contextmanager
+from db.base_datos import conectar
+from db.consultas import _consultar
+from utils.logger import log
+
+# ------------------------------------------------
+# HISTORIAL DE PRECIOS Y DISPONIBILIDAD
+# ------------------------------------------------
+# Los disparadores de la migración 7 anotan en `historial` una fila cada vez
+# que cambia el precio, la disponibilidad o el rating de un libro, con la
+# ejecución que EscritorLibros anota en cada transacción (EJECUCION_ID).
+# Cada consulta se apoya en un índice, de modo que su coste depende del
+# tamaño del catálogo o de los cambios pedidos, no del total de filas
+# acumuladas:
+#
+#   historial_libro     → clave (libro_id, fecha): un rango contiguo
+#   catalogo_en         → clave (libro_id, fecha): una búsqueda por libro
+#   mayores_cambios     → idx_historial_fecha para los libros que cambiaron,
+#                         y la clave para su estado en cada extremo
+#   cambios_ejecucion   → idx_historial_ejecucion
+#
+# Las fechas se comparan como texto 'AAAA-MM-DD HH:MM:SS.SSS'; una fecha
+# sin hora se toma como el final de ese día.
+
+_COLUMNAS_HISTORIAL = """
+    h.fecha, h.ejecucion_id, h.precio_centimos / 100.0 AS precio, h.disponibilidad, h.rating
+"""
+
+# Estado de cada libro en la fecha :fecha (su última fila con fecha <= :fecha)
+_ESTADO_EN = """
+    historial {alias} ON {alias}.libro_id = l.id AND {alias}.fecha = (
+        SELECT MAX(fecha) FROM historial WHERE libro_id = l.id AND fecha <= :{fecha}
+    )
+"""
+
+
+def _limite_fecha(fecha):
+    """'2026-10-01' → '2026-10-01 23:59:59.999'; con hora se deja tal cual."""
+    fecha = fecha.strip()
+    return f"{fecha} 23:59:59.999" if len(fecha) == 10 else fecha
+
+
+# ------------------------------------------------
+# EJECUCIONES
+# ------------------------------------------------
+def _proceso_vivo(pid):
+    """Si el proceso `pid` de esta máquina sigue existiendo."""
+    if os.name == "nt":
+        # En Windows os.kill terminaría el proceso: se supone vivo
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, pero es de otro usuario
+        pass
+    return True
+
+
+def abandonar_ejecuciones(conn):
+    """
+    Marca como 'abandonada' cada ejecución 'en_curso' de esta máquina cuyo
+    proceso ya no existe (muerto por SIGKILL, falta de memoria...), con los
+    cambios que llegó a registrar. Las de otras máquinas no se tocan: no
+    hay forma de saber desde aquí si siguen vivas. Devuelve cuántas marcó.
+    """
+    muertas = [
+        (ejecucion_id,)
+        for ejecucion_id, pid in conn.execute(
+            "SELECT id, pid FROM ejecuciones WHERE estado = 'en_curso' AND maquina = ?", (socket.gethostname(),)
+        )
+        if pid is None or not _proceso_vivo(pid)
+    ]
+    with conn:
+        conn.executemany("""
+            UPDATE ejecuciones
+            SET estado = 'abandonada',
+                fin = COALESCE((SELECT MAX(fecha) FROM historial WHERE ejecucion_id = ejecuciones.id), inicio),
+                cambios = (SELECT COUNT(*) FROM historial WHERE ejecucion_id = ejecuciones.id)
+            WHERE id = ?
+        """, muertas)
+
+    if muertas:
+        print(f"⚠️ {len(muertas)} ejecuciones interrumpidas marcadas como abandonadas")
+        log("WARNING", f"Ejecuciones abandonadas: {[fila[0] for fila in muertas]}")
+    return len(muertas)
+
+
+def iniciar_ejecucion(motor):
+    """Registra el inicio de un rastreo y devuelve su id; antes cierra las abandonadas."""
+    conn = conectar()
+    try:
+        abandonar_ejecuciones(conn)
+        with conn:
+            cur = conn.execute("""
+                INSERT INTO ejecuciones (motor, inicio, maquina, pid)
+                VALUES (?, strftime('%Y-%m-%d %H:%M:%f', 'now'), ?, ?)
+            """, (motor, socket.gethostname(), os.getpid()))
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def terminar_ejecucion(ejecucion_id, estado="ok"):
+    """Cierra la ejecución y anota cuántos cambios registró; los devuelve."""
+    conn = conectar()
+    try:
+        with conn:
+            conn.execute("""
+                UPDATE ejecuciones
+                SET fin = strftime('%Y-%m-%d %H:%M:%f', 'now'), estado = ?,
+                    cambios = (SELECT COUNT(*) FROM historial WHERE ejecucion_id = ?)
+                WHERE id = ?
+            """, (estado, ejecucion_id, ejecucion_id))
+        return conn.execute("SELECT cambios FROM ejecuciones WHERE id = ?", (ejecucion_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+@contextmanager
+def ejecucion(motor):
+    """
+    Envuelve un rastreo en una fila de `ejecuciones`:
+
+        with ejecucion("bs4"):
+            scraper_bs4()
+
+    Si el rastreo lanza una excepción, la ejecución queda como 'error'.
+    Su id va en la variable de entorno EJECUCION_ID, que leen los
+    EscritorLibros de este proceso y de los procesos trabajadores que lance.
+    """
+    ejecucion_id = iniciar_ejecucion(motor)
+    log("INFO", f"Ejecución {ejecucion_id} iniciada ({motor})")
+
+    anterior = os.environ.get("EJECUCION_ID")
+    os.environ["EJECUCION_ID"] = str(ejecucion_id)
+
+    estado = "error"
+    try:
+        yield ejecucion_id
+        estado = "ok"
+    finally:
+        if anterior is None:
+            os.environ.pop("EJECUCION_ID", None)
+        else:
+            os.environ["EJECUCION_ID"] = anterior
+        cambios = terminar_ejecucion(ejecucion_id, estado)
+        print(f"🕰️  Ejecución {ejecucion_id}: {cambios} cambios de precio / disponibilidad / rating")
+        log("INFO", f"Ejecución {ejecucion_id} terminada ({estado}): {cambios} cambios")
+
+
+def listar_ejecuciones(limite=20):
+    """Últimas ejecuciones, la más reciente primero."""
+    return _consultar("SELECT * FROM ejecuciones ORDER BY id DESC LIMIT ?", (limite,))
+
+
+def _fin_ejecucion(ejecucion_id):
+    """Fecha hasta la que llega una ejecución (ahora, si sigue en curso)."""
+    filas = _consultar("""
+        SELECT COALESCE(fin, strftime('%Y-%m-%d %H:%M:%f', 'now')) AS fin
+        FROM ejecuciones WHERE id = ?
+    """, (ejecucion_id,))
+    if not filas:
+        raise ValueError(f"No existe la ejecución {ejecucion_id}")
+    return filas[0]["fin"]
+
+
+# ------------------------------------------------
+# CONSULTAS
+# ------------------------------------------------
+def historial_libro(url):
+    """Cambios del libro cuya página de detalle es `url`, del más antiguo al más reciente."""
+    return _consultar(f"""
+        SELECT {_COLUMNAS_HISTORIAL}
+        FROM libros l JOIN historial h ON h.libro_id = l.id
+        WHERE l.url = ?
+        ORDER BY h.fecha
+    """, (url,))
+
+
+def catalogo_en(fecha=None, ejecucion_id=None, limite=None):
+    """
+    El catálogo tal como estaba en `fecha`, o al terminar la ejecución
+    `ejecucion_id`: precio, disponibilidad y rating de cada libro que ya existía.
+    """
+    if ejecucion_id is not None:
+        fecha = _fin_ejecucion(ejecucion_id)
+    elif fecha is None:
+        raise ValueError("Hay que indicar una fecha o una ejecución")
+
+    return _consultar(f"""
+        SELECT l.url, l.titulo, {_COLUMNAS_HISTORIAL}
+        FROM libros l
+        JOIN {_ESTADO_EN.format(alias="h", fecha="fecha")}
+        ORDER BY l.titulo
+        LIMIT :limite
+    """, {"fecha": _limite_fecha(fecha), "limite": -1 if limite is None else limite})
+
+
+def mayores_cambios(ejecucion_a, ejecucion_b, limite=20):
+    """
+    Libros cuyo precio más cambió entre el final de la ejecución
+    `ejecucion_a` y el de `ejecucion_b`, ordenados por diferencia absoluta.
+
+    Solo se examinan los libros con alguna fila de historial entre ambas
+    fechas (idx_historial_fecha), no el catálogo completo.
+    """
+    return _consultar(f"""
+        WITH cambiados AS (
+            SELECT DISTINCT libro_id FROM historial
+            WHERE fecha > :antes AND fecha <= :despues
+        )
+        SELECT l.url, l.titulo,
+               a.precio_centimos / 100.0 AS precio_antes,
+               b.precio_centimos / 100.0 AS precio_despues,
+               (b.precio_centimos - a.precio_centimos) / 100.0 AS diferencia,
+               -- Precio 0 (listado sin precio): no hay porcentaje
+               ROUND(100.0 * (b.precio_centimos - a.precio_centimos) / NULLIF(a.precio_centimos, 0), 2) AS porcentaje,
+               a.disponibilidad AS disponibilidad_antes, b.disponibilidad AS disponibilidad_despues
+        FROM cambiados
+        JOIN libros l ON l.id = cambiados.libro_id
+        JOIN {_ESTADO_EN.format(alias="a", fecha="antes")}
+        JOIN {_ESTADO_EN.format(alias="b", fecha="despues")}
+        WHERE a.precio_centimos IS NOT b.precio_centimos
+        ORDER BY ABS(b.precio_centimos - a.precio_centimos) DESC, l.titulo
+        LIMIT :limite
+    """, {"antes": _fin_ejecucion(ejecucion_a), "despues": _fin_ejecucion(ejecucion_b), "limite": limite})
+
+
+def cambios_ejecucion(ejecucion_id):
+    """Filas de historial que registró una ejecución."""
+    return _consultar(f"""
+        SELECT l.url, l.titulo, {_COLUMNAS_HISTORIAL}
+        FROM historial h JOIN libros l ON l.id = h.libro_id
+        WHERE h.ejecucion_id = ?
+        ORDER BY h.fecha
+    """, (ejecucion_id,))
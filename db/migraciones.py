@@ -0,0 +1,439 @@
+from models.libro_modelo import precio_a_centimos
+from utils.logger import log
+
+# ------------------------------------------------
+# MIGRACIONES VERSIONADAS DEL ESQUEMA
+# ------------------------------------------------
+# La versión del esquema se guarda en PRAGMA user_version. Cada migración
+# se aplica una sola vez, en orden y dentro de su propia transacción, así
+# una base de datos antigua (data/libros.db) se actualiza en el sitio sin
+# perder datos la primera vez que se abre con el código nuevo.
+#
+# Para cambiar el esquema se añade una función al final de MIGRACIONES;
+# nunca se modifican las que ya están publicadas.
+
+
+def _centimos(valor):
+    """Convierte el precio guardado por versiones antiguas ("€51.77", 51.77) a céntimos."""
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return int(round(valor * 100))
+    return precio_a_centimos(str(valor))
+
+
+def _v1_esquema_inicial(conn):
+    """Tablas originales: libros (clave por título) y huellas del modo incremental."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS libros (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titulo TEXT UNIQUE,
+            precio DECIMAL(10,2),
+            disponibilidad TEXT,
+            rating INTEGER,
+            url_imagen TEXT,
+            descripcion TEXT,
+            upc TEXT,
+            categoria TEXT,
+            fecha_extraccion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS huellas (
+            url TEXT PRIMARY KEY,
+            huella TEXT,
+            enlaces TEXT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _v2_esquema_normalizado(conn):
+    """
+    Esquema normalizado:
+
+    - `categorias` como tabla de consulta y `libros.categoria_id` apuntando a ella.
+    - Precio en céntimos enteros (`precio_centimos`).
+    - Clave estable `url` (URL del detalle) en lugar del título. Las filas
+      antiguas quedan con url NULL y el escritor las adopta por título la
+      próxima vez que aparecen en el catálogo.
+    - Índices para las consultas por UPC, categoría y rango de precio.
+
+    SQLite no permite quitar el UNIQUE de `titulo`, por eso la tabla se
+    reconstruye copiando las filas.
+    """
+    conn.create_function("centimos", 1, _centimos, deterministic=True)
+
+    conn.execute("""
+        CREATE TABLE categorias (
+            id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL UNIQUE
+        )
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO categorias (nombre)
+        SELECT DISTINCT categoria FROM libros
+        WHERE categoria IS NOT NULL AND categoria <> ''
+    """)
+
+    conn.execute("""
+        CREATE TABLE libros_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT UNIQUE,
+            titulo TEXT NOT NULL,
+            precio_centimos INTEGER,
+            disponibilidad TEXT,
+            rating INTEGER,
+            url_imagen TEXT,
+            descripcion TEXT,
+            upc TEXT,
+            categoria_id INTEGER REFERENCES categorias(id),
+            fecha_extraccion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        INSERT INTO libros_nueva (
+            id, url, titulo, precio_centimos, disponibilidad, rating,
+            url_imagen, descripcion, upc, categoria_id, fecha_extraccion
+        )
+        SELECT l.id, NULL, l.titulo, centimos(l.precio), l.disponibilidad, l.rating,
+               l.url_imagen, l.descripcion, l.upc, c.id, l.fecha_extraccion
+        FROM libros l
+        LEFT JOIN categorias c ON c.nombre = l.categoria
+    """)
+    conn.execute("DROP TABLE libros")
+    conn.execute("ALTER TABLE libros_nueva RENAME TO libros")
+
+    conn.execute("CREATE INDEX idx_libros_titulo ON libros(titulo)")
+    conn.execute("CREATE INDEX idx_libros_upc ON libros(upc)")
+    conn.execute("CREATE INDEX idx_libros_categoria_precio ON libros(categoria_id, precio_centimos)")
+    conn.execute("CREATE INDEX idx_libros_precio ON libros(precio_centimos)")
+
+    # Vista con los nombres y formatos de antes, para consultas manuales
+    conn.execute("""
+        CREATE VIEW vista_libros AS
+        SELECT l.id, l.url, l.titulo, l.precio_centimos / 100.0 AS precio, l.disponibilidad,
+               l.rating, l.url_imagen, l.descripcion, l.upc, c.nombre AS categoria,
+               l.fecha_extraccion
+        FROM libros l
+        LEFT JOIN categorias c ON c.id = l.categoria_id
+    """)
+
+
+def _v3_portadas(conn):
+    """Ruta local y hash de contenido de la portada descargada."""
+    conn.execute("ALTER TABLE libros ADD COLUMN imagen_ruta TEXT")
+    conn.execute("ALTER TABLE libros ADD COLUMN imagen_hash TEXT")
+    conn.execute("CREATE INDEX idx_libros_url_imagen ON libros(url_imagen)")
+
+
+def _v4_marcas_de_cambio(conn):
+    """
+    Cuándo cambió cada libro por última vez (`actualizado_en`) y una
+    revisión creciente (`revision`) para las exportaciones incrementales.
+    También la tabla de marcas de agua de cada exportación.
+    """
+    conn.execute("ALTER TABLE libros ADD COLUMN actualizado_en TEXT")
+    conn.execute("ALTER TABLE libros ADD COLUMN revision INTEGER")
+    conn.execute("UPDATE libros SET actualizado_en = fecha_extraccion, revision = id")
+    conn.execute("CREATE INDEX idx_libros_actualizado ON libros(actualizado_en)")
+    conn.execute("CREATE INDEX idx_libros_revision ON libros(revision)")
+
+    conn.execute("""
+        CREATE TABLE exportaciones (
+            nombre TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL,
+            filas INTEGER,
+            fecha TEXT
+        )
+    """)
+
+
+def _v5_frontera(conn):
+    """
+    Frontera de rastreo compartida entre procesos trabajadores (db/frontera.py):
+    URLs de catálogo y de detalle con estado, prioridad y fin de la concesión.
+    """
+    conn.execute("""
+        CREATE TABLE frontera (
+            url TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            pagina INTEGER,
+            prioridad INTEGER NOT NULL DEFAULT 0,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            intentos INTEGER NOT NULL DEFAULT 0,
+            trabajador TEXT,
+            concesion_hasta REAL,
+            error TEXT,
+            actualizado_en TEXT
+        )
+    """)
+    # Índices parciales: reclamar solo recorre las pendientes, en orden de
+    # prioridad, y recuperar concesiones caducadas solo las que están en curso
+    conn.execute("""
+        CREATE INDEX idx_frontera_pendientes ON frontera(prioridad DESC)
+        WHERE estado = 'pendiente'
+    """)
+    conn.execute("""
+        CREATE INDEX idx_frontera_en_curso ON frontera(concesion_hasta)
+        WHERE estado = 'en_curso'
+    """)
+
+
+def _v6_fallidos(conn):
+    """URLs que fallaron tras agotar los reintentos (cola de mensajes muertos)."""
+    conn.execute("""
+        CREATE TABLE fallidos (
+            url TEXT PRIMARY KEY,
+            estado INTEGER,
+            error TEXT,
+            intentos INTEGER NOT NULL DEFAULT 1,
+            veces INTEGER NOT NULL DEFAULT 1,
+            primera_fecha TEXT,
+            ultima_fecha TEXT
+        )
+    """)
+
+
+# Fila de historial con el estado de NEW; la ejecución es la que fijó la
+# transacción que escribe (NULL en escrituras fuera de un rastreo)
+_SQL_INSTANTANEA = """
+    INSERT OR REPLACE INTO historial (libro_id, fecha, ejecucion_id, precio_centimos, disponibilidad, rating)
+    VALUES (
+        NEW.id,
+        COALESCE(NEW.actualizado_en, strftime('%Y-%m-%d %H:%M:%f', 'now')),
+        (SELECT ejecucion_id FROM ejecucion_escritura),
+        NEW.precio_centimos, NEW.disponibilidad, NEW.rating
+    );
+"""
+
+
+def _v7_historial(conn):
+    """
+    Historial de precio, disponibilidad y rating (db/historial.py).
+
+    - `ejecuciones`: una fila por rastreo, con inicio, fin, estado y el
+      proceso que la lanzó (para marcar como abandonadas las que murieron).
+    - `historial`: una instantánea por cambio, no por ejecución. La clave
+      (libro_id, fecha) agrupa en disco las filas de cada libro (WITHOUT
+      ROWID), así "el estado de un libro en la fecha T" es una sola
+      búsqueda en el árbol por muchas filas que acumule la tabla.
+    - Disparadores sobre `libros`: sirven para cualquier escritura
+      (escritor por lotes, funciones antiguas, consultas manuales) y solo
+      insertan si cambia alguno de los tres campos.
+    - `ejecucion_escritura`: la ejecución a la que se atribuyen los cambios.
+      EscritorLibros la escribe al empezar cada transacción y la borra antes
+      de confirmar; como SQLite solo admite un escritor a la vez, ninguna
+      otra conexión la ve, así que varios rastreos simultáneos no se mezclan
+      y las escrituras manuales quedan sin ejecución.
+
+    Cada libro existente recibe una instantánea inicial con su estado actual.
+    """
+    conn.execute("""
+        CREATE TABLE ejecuciones (
+            id INTEGER PRIMARY KEY,
+            motor TEXT,
+            inicio TEXT NOT NULL,
+            fin TEXT,
+            estado TEXT NOT NULL DEFAULT 'en_curso',
+            cambios INTEGER,
+            maquina TEXT,
+            pid INTEGER
+        )
+    """)
+    conn.execute("CREATE TABLE ejecucion_escritura (ejecucion_id INTEGER)")
+    conn.execute("""
+        CREATE TABLE historial (
+            libro_id INTEGER NOT NULL REFERENCES libros(id),
+            fecha TEXT NOT NULL,
+            ejecucion_id INTEGER REFERENCES ejecuciones(id),
+            precio_centimos INTEGER,
+            disponibilidad TEXT,
+            rating INTEGER,
+            PRIMARY KEY (libro_id, fecha)
+        ) WITHOUT ROWID
+    """)
+    # Cambios de una ejecución y libros que cambiaron entre dos fechas
+    conn.execute("CREATE INDEX idx_historial_ejecucion ON historial(ejecucion_id)")
+    conn.execute("CREATE INDEX idx_historial_fecha ON historial(fecha)")
+
+    conn.execute(f"""
+        CREATE TRIGGER trg_historial_alta AFTER INSERT ON libros
+        BEGIN {_SQL_INSTANTANEA} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_historial_cambio
+        AFTER UPDATE OF precio_centimos, disponibilidad, rating ON libros
+        WHEN OLD.precio_centimos IS NOT NEW.precio_centimos
+          OR OLD.disponibilidad IS NOT NEW.disponibilidad
+          OR OLD.rating IS NOT NEW.rating
+        BEGIN {_SQL_INSTANTANEA} END
+    """)
+
+    conn.execute("""
+        INSERT INTO historial (libro_id, fecha, precio_centimos, disponibilidad, rating)
+        SELECT id, COALESCE(actualizado_en, fecha_extraccion, strftime('%Y-%m-%d %H:%M:%f', 'now')),
+               precio_centimos, disponibilidad, rating
+        FROM libros
+    """)
+
+
+# Valores que libros_fts tiene indexados para una fila (OLD) o que debe indexar (NEW)
+_SQL_FTS_BORRAR = """
+    INSERT INTO libros_fts (libros_fts, rowid, titulo, descripcion, categoria)
+    VALUES ('delete', OLD.id, OLD.titulo, OLD.descripcion,
+            (SELECT nombre FROM categorias WHERE id = OLD.categoria_id));
+"""
+_SQL_FTS_INSERTAR = """
+    INSERT INTO libros_fts (rowid, titulo, descripcion, categoria)
+    VALUES (NEW.id, NEW.titulo, NEW.descripcion,
+            (SELECT nombre FROM categorias WHERE id = NEW.categoria_id));
+"""
+
+
+def _v8_busqueda(conn):
+    """
+    Índice de texto completo FTS5 sobre título, descripción y categoría (db/busqueda.py).
+
+    Es una tabla de contenido externo sobre `vista_libros`: guarda solo el
+    índice invertido y lee el texto de la vista cuando hace falta un
+    fragmento, así las descripciones no se duplican. Los disparadores lo
+    mantienen al día fila a fila y solo cuando cambia alguno de los tres
+    campos (no cuando cambia el precio). Las filas existentes se indexan
+    de una vez con 'rebuild'.
+    """
+    conn.execute("""
+        CREATE VIRTUAL TABLE libros_fts USING fts5(
+            titulo, descripcion, categoria,
+            content = 'vista_libros', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    # Orden por defecto (ORDER BY rank): un acierto en el título pesa más
+    # que en la categoría, y ésta más que en la descripción
+    conn.execute("INSERT INTO libros_fts (libros_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 4.0)')")
+
+    conn.execute(f"""
+        CREATE TRIGGER trg_fts_alta AFTER INSERT ON libros
+        BEGIN {_SQL_FTS_INSERTAR} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_fts_cambio AFTER UPDATE OF titulo, descripcion, categoria_id ON libros
+        WHEN OLD.titulo IS NOT NEW.titulo
+          OR OLD.descripcion IS NOT NEW.descripcion
+          OR OLD.categoria_id IS NOT NEW.categoria_id
+        BEGIN {_SQL_FTS_BORRAR} {_SQL_FTS_INSERTAR} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_fts_baja AFTER DELETE ON libros
+        BEGIN {_SQL_FTS_BORRAR} END
+    """)
+
+    conn.execute("INSERT INTO libros_fts (libros_fts) VALUES ('rebuild')")
+
+
+def _v9_planificador_detalle(conn):
+    """
+    Datos para elegir qué páginas de detalle visitar (EscritorLibros.planificar_detalle):
+
+    - `detalle_fecha`: última vez que se leyó la página de detalle del libro.
+    - `listado_cambio`: última vez que cambió lo que se ve en el listado
+      (título, precio, disponibilidad, rating, portada).
+
+    - Un índice parcial con los libros a los que les falta el UPC o la
+      descripción: contar la cobertura de detalle recorre solo esos, no la
+      tabla. Para ordenar, los candidatos (los libros vistos en el listado)
+      se buscan por URL en la clave única y se ordenan solo esas filas.
+    """
+    conn.execute("ALTER TABLE libros ADD COLUMN detalle_fecha TEXT")
+    conn.execute("ALTER TABLE libros ADD COLUMN listado_cambio TEXT")
+    conn.execute("""
+        UPDATE libros SET
+            listado_cambio = actualizado_en,
+            detalle_fecha = CASE WHEN upc IS NOT NULL OR descripcion IS NOT NULL THEN actualizado_en END
+    """)
+    conn.execute("""
+        CREATE INDEX idx_libros_sin_detalle ON libros(url)
+        WHERE upc IS NULL OR descripcion IS NULL
+    """)
+
+
+def _v10_rutas_motor(conn):
+    """
+    Decisiones del motor híbrido por patrón de URL (scrapers.scraper_hibrido):
+    si las páginas de ese patrón se piden con HTTP o con un navegador, y los
+    contadores con los que se tomó la decisión.
+    """
+    conn.execute("""
+        CREATE TABLE rutas_motor (
+            patron          TEXT PRIMARY KEY,
+            motor           TEXT NOT NULL CHECK (motor IN ('http', 'navegador')),
+            fallos_seguidos INTEGER NOT NULL DEFAULT 0,
+            paginas         INTEGER NOT NULL DEFAULT 0,
+            escaladas       INTEGER NOT NULL DEFAULT 0,
+            actualizado_en  TEXT
+        ) WITHOUT ROWID
+    """)
+
+
+# (versión, descripción, función) en orden estrictamente creciente
+MIGRACIONES = [
+    (1, "Esquema inicial (libros, huellas)", _v1_esquema_inicial),
+    (2, "Categorías, precio en céntimos, clave por URL e índices", _v2_esquema_normalizado),
+    (3, "Portadas descargadas (imagen_ruta, imagen_hash)", _v3_portadas),
+    (4, "Marcas de cambio (actualizado_en, revision) y exportaciones", _v4_marcas_de_cambio),
+    (5, "Frontera de rastreo con concesiones (frontera)", _v5_frontera),
+    (6, "URLs fallidas para reintentar (fallidos)", _v6_fallidos),
+    (7, "Historial de cambios por ejecución (historial, ejecuciones)", _v7_historial),
+    (8, "Búsqueda de texto completo FTS5 (libros_fts)", _v8_busqueda),
+    (9, "Planificador de detalles (detalle_fecha, listado_cambio)", _v9_planificador_detalle),
+    (10, "Rutas del motor híbrido por patrón de URL (rutas_motor)", _v10_rutas_motor),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def version_actual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(conn):
+    """
+    Lleva la base de datos a VERSION_ESQUEMA aplicando las migraciones pendientes.
+
+    Cada migración corre en una transacción BEGIN IMMEDIATE y vuelve a leer
+    la versión dentro de ella, de modo que varios procesos que arrancan a la
+    vez no aplican dos veces la misma migración.
+
+    Devuelve la lista de versiones aplicadas.
+    """
+    aplicadas = []
+    nivel_anterior = conn.isolation_level
+    conn.isolation_level = None  # transacciones explícitas (también para el DDL)
+
+    try:
+        for version, descripcion, funcion in MIGRACIONES:
+            if version <= version_actual(conn):
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if version <= version_actual(conn):
+                    conn.execute("ROLLBACK")
+                    continue
+
+                funcion(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            aplicadas.append(version)
+            log("INFO", f"Migración {version} aplicada: {descripcion}")
+            print(f"🛠️  Migración {version} aplicada: {descripcion}")
+    finally:
+        conn.isolation_level = nivel_anterior
+
+    return aplicadas
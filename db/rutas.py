@@ -0,0 +1,47 @@
+from db.base_datos import conectar
+from db.consultas import _consultar
+from utils.logger import log
+
+# ------------------------------------------------
+# RUTAS DEL MOTOR HÍBRIDO
+# ------------------------------------------------
+# Qué motor necesita cada patrón de URL (scrapers/scraper_hibrido.py). Se
+# guarda al terminar cada rastreo para que el siguiente empiece con lo
+# aprendido: los patrones que ya se sabe que necesitan navegador no pagan
+# otra vez la descarga HTTP inútil antes de escalar.
+
+SQL_GUARDAR_RUTA = """
+    INSERT INTO rutas_motor (patron, motor, fallos_seguidos, paginas, escaladas, actualizado_en)
+    VALUES (:patron, :motor, :fallos_seguidos, :paginas, :escaladas, datetime('now'))
+    ON CONFLICT(patron) DO UPDATE SET
+        motor = excluded.motor,
+        fallos_seguidos = excluded.fallos_seguidos,
+        paginas = excluded.paginas,
+        escaladas = excluded.escaladas,
+        actualizado_en = excluded.actualizado_en
+"""
+
+
+def cargar_rutas():
+    """{patron: fila} con las rutas aprendidas en rastreos anteriores."""
+    return {fila["patron"]: fila for fila in _consultar("SELECT * FROM rutas_motor")}
+
+
+def guardar_rutas(rutas):
+    """Guarda las rutas [{patron, motor, fallos_seguidos, paginas, escaladas}] en una transacción."""
+    if not rutas:
+        return
+
+    conn = conectar()
+    try:
+        with conn:
+            conn.executemany(SQL_GUARDAR_RUTA, rutas)
+    finally:
+        conn.close()
+
+    log("INFO", f"{len(rutas)} rutas del motor híbrido guardadas")
+
+
+def listar_rutas():
+    """Rutas aprendidas, primero las que van al navegador."""
+    return _consultar("SELECT * FROM rutas_motor ORDER BY motor = 'http', paginas DESC")
@@ -1,46 +1,266 @@
 import os
-from dotenv import load_dotenv
-from utils.logger import iniciar_logger, log
-from scrapers.scraper_bs4 import scraper_bs4
-from scrapers.scraper_selenium import scraper_selenium
-from db.base_datos import crear_tablas
-from utils.helpers import crear_env_si_no_existe
+import sys
+import argparse
+from importlib import import_module
 
-# Cargar variables de entorno desde .env
-load_dotenv()
+# ---------------------------------------------------------
+# MOTORES DISPONIBLES (SE IMPORTAN SOLO AL USARSE)
+# ---------------------------------------------------------
+# Importar un motor arrastra sus dependencias (Selenium, aiohttp, el pool de
+# procesos...), así que main.py no importa ninguno al arrancar: solo el que
+# se va a ejecutar, y después de aplicar las opciones de la línea de
+# comandos, porque cada módulo lee su configuración del entorno al importarse.
 
-def menu(): 
+MOTORES = {
+    "bs4": ("scrapers.scraper_bs4", "scraper_bs4", "Scraping con BeautifulSoup"),
+    "selenium": ("scrapers.scraper_selenium", "scraper_selenium", "Scraping con Selenium"),
+    "async": ("scrapers.scraper_async", "scraper_async", "Scraping asíncrono (BeautifulSoup + aiohttp)"),
+    "pipeline": (
+        "scrapers.scraper_pipeline", "scraper_pipeline",
+        "Scraping por pipeline (descarga / parseo multiproceso / escritura)"
+    ),
+    "hibrido": (
+        "scrapers.scraper_hibrido", "scraper_hibrido",
+        "Scraping híbrido (HTTP, Selenium solo para las páginas que lo necesitan)"
+    ),
+}
+
+# Motores que saben seguir los enlaces "next" (DESCUBRIR=1)
+MOTORES_DESCUBRIMIENTO = ("bs4", "async")
+
+
+def ejecutar_motor(nombre):
+    """Importa el motor indicado y lo ejecuta como una ejecución del historial."""
+    from db.historial import ejecucion
+
+    modulo, funcion, _ = MOTORES[nombre]
+    with ejecucion(nombre):
+        getattr(import_module(modulo), funcion)()
+
+
+def menu():
     """Muestra un menú simple para seleccionar el tipo de scraping."""
-    
+    from utils.logger import log
+
     print("\n==============================")
     print("     SCRAPER DE LIBROS")
     print("==============================")
-    print("1. Scraping con BeautifulSoup")
-    print("2. Scraping con Selenium")
+    for numero, (_, _, descripcion) in enumerate(MOTORES.values(), start=1):
+        print(f"{numero}. {descripcion}")
     print("==============================\n")
 
     opcion = input("Seleccione una opción: ").strip()
+    nombres = list(MOTORES)
 
     # Ejecuta según la opción seleccionada
-    if opcion == "1":
-        log("INFO", "Usuario seleccionó BeautifulSoup")
-        scraper_bs4()
- 
-    elif opcion == "2":
-        log("INFO", "Usuario seleccionó Selenium")
-        scraper_selenium()
- 
-    else:
-        log("ERROR", f"Opción inválida ingresada: {opcion}")
-        print("❌ Opción no válida. Intente de nuevo.\n")
+    if opcion.isdigit() and 1 <= int(opcion) <= len(nombres):
+        nombre = nombres[int(opcion) - 1]
+        log("INFO", f"Usuario seleccionó {nombre}")
+        ejecutar_motor(nombre)
+        return True
 
-if __name__ == "__main__":
-    print("Inicializando sistema...\n")
+    log("ERROR", f"Opción inválida ingresada: {opcion}")
+    print("❌ Opción no válida. Intente de nuevo.\n")
+    return False
 
-    # Crear .env con datos predeterminados si no existe
-    crear_env_si_no_existe()
 
-    # Crear archivo de log si no existe
+# ---------------------------------------------------------
+# LÍNEA DE COMANDOS
+# ---------------------------------------------------------
+def rango_paginas(texto):
+    """Convierte "5" en (1, 5) y "3-8" en (3, 8)."""
+    try:
+        desde, _, hasta = texto.partition("-")
+        inicio, fin = (int(desde), int(hasta)) if hasta else (1, int(desde))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"rango de páginas inválido: {texto!r} (use N o DESDE-HASTA)")
+    if inicio < 1 or fin < inicio:
+        raise argparse.ArgumentTypeError(f"rango de páginas inválido: {texto!r}")
+    return inicio, fin
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Scraper de libros. Sin argumentos muestra el menú interactivo.",
+    )
+    subcomandos = parser.add_subparsers(dest="comando")
+
+    # Opciones comunes a todo lo que rastrea el sitio (scrape y trabajador)
+    rastreo = argparse.ArgumentParser(add_help=False)
+    rastreo.add_argument("--paginas", type=rango_paginas, metavar="N|DESDE-HASTA",
+                         help="Páginas del catálogo: las N primeras o un rango (N_PAGINA / PAGINA_INICIO)")
+    rastreo.add_argument("--bd", metavar="RUTA", help="Archivo SQLite de destino (RUTA_BD)")
+    rastreo.add_argument("--incremental", action="store_true", help="Omite páginas sin cambios (INCREMENTAL=1)")
+    rastreo.add_argument("--sin-cache", action="store_true", help="Desactiva la caché HTTP (CACHE_HTTP=0)")
+    rastreo.add_argument("--imagenes", action="store_true", help="Descarga las portadas (DESCARGAR_IMAGENES=1)")
+    rastreo.add_argument("--archivar", action="store_true",
+                         help="Guarda cada respuesta en bruto en archivos WARC para reprocesarla (ARCHIVAR_WARC=1)")
+    rastreo.add_argument("--parser", choices=["html.parser", "lxml", "selectolax"], help="Backend de parseo (PARSER_HTML)")
+    rastreo.add_argument("--metricas-puerto", type=int, metavar="PUERTO",
+                         help="Expone /metrics durante la ejecución (METRICAS_PUERTO)")
+    rastreo.add_argument("--log-nivel", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Nivel de logs (LOG_NIVEL)")
+
+    scrape = subcomandos.add_parser("scrape", parents=[rastreo], help="Ejecuta un motor de scraping sin interacción")
+    scrape.add_argument("motor", choices=MOTORES, help="Motor a ejecutar")
+    scrape.add_argument("--detalle", type=int, metavar="N",
+                        help="Libros cuyo detalle se visita (LIBROS_NAVEGA_DETALLE)")
+    scrape.add_argument("--concurrencia", type=int, metavar="N",
+                        help="Requests simultáneos de los motores async y pipeline (CONCURRENCIA)")
+    scrape.add_argument("--navegadores", type=int, metavar="N",
+                        help="Navegadores headless de los motores selenium e hibrido (SELENIUM_NAVEGADORES / HIBRIDO_NAVEGADORES)")
+    scrape.add_argument("--descubrir", action="store_true",
+                        help="Sigue los enlaces \"next\" hasta el final del catálogo, motores bs4 y async (DESCUBRIR=1)")
+    scrape.add_argument("--categorias", metavar="LISTA",
+                        help="Con --descubrir, recorre las categorías de la barra lateral: \"*\" o "
+                             "\"Travel,Poetry\" (DESCUBRIR_CATEGORIAS)")
+    scrape.add_argument("--max-paginas", type=int, metavar="N",
+                        help="Con --descubrir, tope de páginas de listado (DESCUBRIR_MAX_PAGINAS)")
+
+    trabajador = subcomandos.add_parser(
+        "trabajador", parents=[rastreo],
+        help="Procesa la frontera de rastreo compartida (varios procesos o máquinas)",
+    )
+    trabajador.add_argument("--procesos", type=int, default=1, metavar="N",
+                            help="Trabajadores en esta máquina; reparten el presupuesto de ritmo")
+    trabajador.add_argument("--sin-sembrar", action="store_true",
+                            help="No añade las páginas de catálogo: se une a una frontera ya sembrada")
+    trabajador.add_argument("--reclamar", type=int, metavar="N", help="URLs reclamadas por lote (FRONTERA_LOTE)")
+    trabajador.add_argument("--concesion", type=float, metavar="SEGUNDOS",
+                            help="Duración de la concesión de cada lote (FRONTERA_CONCESION)")
+
+    reintentar = subcomandos.add_parser(
+        "reintentar", parents=[rastreo],
+        help="Vuelve a procesar las URLs que fallaron tras agotar los reintentos (tabla fallidos)",
+    )
+    reintentar.add_argument("--procesos", type=int, default=1, metavar="N", help="Trabajadores en esta máquina")
+    reintentar.add_argument("--listar", action="store_true", help="Solo muestra las URLs fallidas")
+
+    reprocesar = subcomandos.add_parser(
+        "reprocesar", help="Vuelve a extraer los libros de las respuestas archivadas en WARC, sin red",
+    )
+    reprocesar.add_argument("archivos", nargs="*", metavar="ARCHIVO",
+                            help="Archivos .warc.gz o carpetas (por defecto RUTA_WARC)")
+    reprocesar.add_argument("--procesos", type=int, metavar="N", help="Procesos de parseo (REPROCESAR_PROCESOS)")
+    reprocesar.add_argument("--lote", type=int, metavar="N", help="Páginas por tarea de parseo (REPROCESAR_LOTE)")
+    reprocesar.add_argument("--parser", choices=["html.parser", "lxml", "selectolax"], help="Backend de parseo (PARSER_HTML)")
+    reprocesar.add_argument("--bd", metavar="RUTA", help="Archivo SQLite de destino (RUTA_BD)")
+
+    exportar = subcomandos.add_parser("exportar", help="Exporta la tabla libros a CSV, JSONL o Parquet")
+    exportar.add_argument("destino", help="Archivo de salida; la extensión fija formato y compresión (libros.csv.gz)")
+    exportar.add_argument("--formato", choices=["csv", "jsonl", "parquet"], help="Formato, si no se deduce del nombre")
+    exportar.add_argument("--compresion", choices=["gzip", "zstd"], help="Compresión, si no se deduce del nombre")
+    exportar.add_argument("--categoria", help="Solo libros de esta categoría")
+    exportar.add_argument("--desde", metavar="FECHA", help="Solo libros actualizados desde FECHA (AAAA-MM-DD[ HH:MM:SS])")
+    exportar.add_argument("--incremental", action="store_true",
+                          help="Solo las filas cambiadas desde la última exportación del flujo --nombre")
+    exportar.add_argument("--nombre", metavar="FLUJO",
+                          help="Flujo incremental cuya marca de agua se usa y avanza (obligatorio con --incremental)")
+    exportar.add_argument("--lote", type=int, metavar="N", help="Filas leídas por lote (TAMANO_LOTE_EXPORTACION)")
+    exportar.add_argument("--bd", metavar="RUTA", help="Archivo SQLite de origen (RUTA_BD)")
+
+    historial = subcomandos.add_parser("historial", help="Cambios de precio y disponibilidad entre ejecuciones")
+    historial.add_argument("--bd", metavar="RUTA", help="Archivo SQLite de origen (RUTA_BD)")
+    consultas = historial.add_subparsers(dest="consulta", required=True)
+    consultas.add_parser("ejecuciones", help="Últimas ejecuciones y cuántos cambios registró cada una")
+    libro = consultas.add_parser("libro", help="Cambios de un libro")
+    libro.add_argument("url", help="URL de la página de detalle del libro")
+    catalogo = consultas.add_parser("catalogo", help="El catálogo tal como estaba en una fecha o ejecución")
+    momento = catalogo.add_mutually_exclusive_group(required=True)
+    momento.add_argument("--en", metavar="FECHA", help="AAAA-MM-DD[ HH:MM:SS]; sin hora, al final del día")
+    momento.add_argument("--ejecucion", type=int, metavar="ID", help="Al terminar esta ejecución")
+    catalogo.add_argument("--limite", type=int, metavar="N", help="Máximo de libros a mostrar")
+    cambios = consultas.add_parser("cambios", help="Mayores cambios de precio entre dos ejecuciones")
+    cambios.add_argument("desde", type=int, metavar="EJECUCION_A")
+    cambios.add_argument("hasta", type=int, metavar="EJECUCION_B")
+    cambios.add_argument("--limite", type=int, default=20, metavar="N")
+
+    buscar = subcomandos.add_parser("buscar", help="Búsqueda de texto completo en títulos, descripciones y categorías")
+    buscar.add_argument("texto", nargs="*", help="Palabras a buscar (la última también como prefijo)")
+    buscar.add_argument("--limite", type=int, default=20, metavar="N", help="Máximo de resultados")
+    buscar.add_argument("--categoria", help="Solo libros de esta categoría")
+    buscar.add_argument("--avanzada", action="store_true",
+                        help="El texto usa la sintaxis de FTS5: \"frases\", OR, NOT, prefijo*, titulo:palabra")
+    buscar.add_argument("--reconstruir", action="store_true", help="Vuelve a indexar todos los libros antes de buscar")
+    buscar.add_argument("--bd", metavar="RUTA", help="Archivo SQLite de origen (RUTA_BD)")
+
+    subcomandos.add_parser("menu", help="Menú interactivo (opción por defecto)")
+
+    return parser
+
+
+def aplicar_opciones(args):
+    """
+    Traslada las opciones a variables de entorno.
+
+    Se hace antes de importar cualquier módulo del proyecto, que leen su
+    configuración con os.getenv al importarse. Las opciones tienen prioridad
+    sobre el .env, porque load_dotenv no sobrescribe variables ya definidas.
+    """
+    entorno = {}
+
+    # Común a los subcomandos que acceden a la base de datos
+    if getattr(args, "bd", None):
+        entorno["RUTA_BD"] = args.bd
+
+    if args.comando in ("scrape", "trabajador", "reintentar"):
+        if args.paginas:
+            entorno["PAGINA_INICIO"], entorno["N_PAGINA"] = args.paginas
+        if args.incremental:
+            entorno["INCREMENTAL"] = 1
+        if args.sin_cache:
+            entorno["CACHE_HTTP"] = 0
+        if args.imagenes:
+            entorno["DESCARGAR_IMAGENES"] = 1
+        if args.archivar:
+            entorno["ARCHIVAR_WARC"] = 1
+        if args.parser:
+            entorno["PARSER_HTML"] = args.parser
+        if args.metricas_puerto is not None:
+            entorno["METRICAS_PUERTO"] = args.metricas_puerto
+        if args.log_nivel:
+            entorno["LOG_NIVEL"] = args.log_nivel
+
+    if args.comando == "scrape":
+        if args.detalle is not None:
+            entorno["LIBROS_NAVEGA_DETALLE"] = args.detalle
+        if args.concurrencia is not None:
+            entorno["CONCURRENCIA"] = args.concurrencia
+        if args.navegadores is not None:
+            entorno["SELENIUM_NAVEGADORES"] = entorno["HIBRIDO_NAVEGADORES"] = args.navegadores
+        if args.descubrir:
+            entorno["DESCUBRIR"] = 1
+        if args.categorias:
+            entorno["DESCUBRIR_CATEGORIAS"] = args.categorias
+        if args.max_paginas is not None:
+            entorno["DESCUBRIR_MAX_PAGINAS"] = args.max_paginas
+
+    if args.comando == "trabajador":
+        if args.reclamar is not None:
+            entorno["FRONTERA_LOTE"] = args.reclamar
+        if args.concesion is not None:
+            entorno["FRONTERA_CONCESION"] = args.concesion
+
+    if args.comando == "reprocesar":
+        if args.procesos is not None:
+            entorno["REPROCESAR_PROCESOS"] = args.procesos
+        if args.lote is not None:
+            entorno["REPROCESAR_LOTE"] = args.lote
+        if args.parser:
+            entorno["PARSER_HTML"] = args.parser
+
+    if args.comando == "exportar" and args.lote is not None:
+        entorno["TAMANO_LOTE_EXPORTACION"] = args.lote
+
+    os.environ.update({clave: str(valor) for clave, valor in entorno.items()})
+
+
+def inicializar():
+    """Prepara .env, logger y tablas; común al menú y a los subcomandos."""
+    from utils.logger import iniciar_logger
+    from db.base_datos import crear_tablas
+
+    # Logger iniciado
     iniciar_logger()
     print("✔ Logger iniciado.")
 
@@ -48,7 +268,157 @@ if __name__ == "__main__":
     crear_tablas()
     print("✔ Tablas verificadas / creadas.")
 
-    # Llamar al menú principal
-    menu()
+    # Endpoint de métricas para seguir ejecuciones largas (opcional)
+    from utils.metricas import metricas, METRICAS_PUERTO
+    if METRICAS_PUERTO:
+        metricas.servir(METRICAS_PUERTO)
+
+    return metricas
+
+
+def mostrar_historial(args):
+    """Imprime la consulta de historial pedida en `main.py historial ...`."""
+    from db import historial
+
+    if args.consulta == "ejecuciones":
+        for fila in historial.listar_ejecuciones():
+            print(f"{fila['id']:>5}  {fila['motor'] or '-':<12} {fila['inicio']}  →  {fila['fin'] or '(en curso)':<23} "
+                  f"{fila['estado']:<9} {fila['cambios'] if fila['cambios'] is not None else '-':>6} cambios")
+
+    elif args.consulta == "libro":
+        filas = historial.historial_libro(args.url)
+        if not filas:
+            print(f"⚠️ Sin historial para {args.url}")
+        for fila in filas:
+            print(f"{fila['fecha']}  ejecución {fila['ejecucion_id'] or '-':>5}  "
+                  f"{fila['precio']:>8.2f}  {fila['disponibilidad'] or '-':<12} {fila['rating']}★")
+
+    elif args.consulta == "catalogo":
+        filas = historial.catalogo_en(fecha=args.en, ejecucion_id=args.ejecucion, limite=args.limite)
+        for fila in filas:
+            print(f"{fila['precio']:>8.2f}  {fila['disponibilidad'] or '-':<12} {fila['rating']}★  {fila['titulo']}")
+        print(f"\n📚 {len(filas)} libros")
+
+    elif args.consulta == "cambios":
+        filas = historial.mayores_cambios(args.desde, args.hasta, args.limite)
+        if not filas:
+            print(f"Sin cambios de precio entre las ejecuciones {args.desde} y {args.hasta}")
+        for fila in filas:
+            porcentaje = "—" if fila["porcentaje"] is None else f"{fila['porcentaje']:+.2f} %"
+            print(f"{fila['diferencia']:>+8.2f} ({porcentaje:>9})  "
+                  f"{fila['precio_antes']:.2f} → {fila['precio_despues']:.2f}  {fila['titulo']}")
+
+
+def mostrar_busqueda(args):
+    """Imprime los resultados de `main.py buscar ...`."""
+    import time
+    from db.busqueda import buscar, reconstruir_indice
+
+    if args.reconstruir:
+        print(f"🔄 Índice de búsqueda reconstruido: {reconstruir_indice()} libros")
+    if not args.texto:
+        return
+
+    texto = " ".join(args.texto)
+    inicio = time.perf_counter()
+    resultados = buscar(texto, limite=args.limite, categoria=args.categoria, avanzada=args.avanzada)
+    duracion = (time.perf_counter() - inicio) * 1000
+
+    for posicion, fila in enumerate(resultados, start=1):
+        print(f"\n{posicion:>3}. {fila['titulo_resaltado']}  ({fila['precio']:.2f}, {fila['categoria'] or 'sin categoría'})")
+        print(f"     {fila['fragmento']}")
+        if fila["url"]:
+            print(f"     {fila['url']}")
+    print(f"\n🔎 {len(resultados)} resultados para {texto!r} en {duracion:.1f} ms")
+
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+
+    if args.comando == "scrape" and args.motor not in MOTORES_DESCUBRIMIENTO:
+        if args.descubrir or args.categorias or args.max_paginas is not None:
+            parser.error(f"el modo descubrimiento solo está disponible en los motores {', '.join(MOTORES_DESCUBRIMIENTO)}")
+    if args.comando == "scrape" and (args.categorias or args.max_paginas is not None) and not args.descubrir:
+        parser.error("--categorias y --max-paginas requieren --descubrir")
+    if args.comando == "exportar" and args.incremental and not args.nombre:
+        parser.error("--incremental requiere --nombre con el flujo cuya marca de agua se usa")
 
-   
+    print("Inicializando sistema...\n")
+
+    # Crear .env con datos predeterminados si no existe
+    from utils.helpers import crear_env_si_no_existe
+    crear_env_si_no_existe()
+
+    if args.comando:
+        aplicar_opciones(args)
+
+    # Cargar variables de entorno desde .env (sin pisar las opciones)
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    metricas = inicializar()
+
+    if args.comando == "exportar":
+        from db.exportar import exportar
+        try:
+            exportar(
+                args.destino, formato=args.formato, compresion=args.compresion, categoria=args.categoria,
+                desde=args.desde, incremental=args.incremental, nombre=args.nombre,
+            )
+        except (ValueError, RuntimeError) as e:
+            # Formato no soportado o dependencia opcional no instalada
+            print(f"❌ {e}")
+            return 1
+        return 0
+
+    if args.comando == "buscar":
+        try:
+            mostrar_busqueda(args)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        return 0
+
+    if args.comando == "historial":
+        try:
+            mostrar_historial(args)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        return 0
+
+    if args.comando == "scrape":
+        ejecutar_motor(args.motor)
+        exito = True
+    elif args.comando == "trabajador":
+        from scrapers.trabajador import lanzar_trabajadores
+        from db.historial import ejecucion
+        with ejecucion("trabajador"):
+            exito = lanzar_trabajadores(args.procesos, sembrar_frontera=not args.sin_sembrar)
+    elif args.comando == "reintentar":
+        from scrapers.trabajador import reintentar_fallidos
+        from db.historial import ejecucion
+        if args.listar:
+            exito = reintentar_fallidos(solo_listar=True)
+        else:
+            with ejecucion("reintentar"):
+                exito = reintentar_fallidos(args.procesos)
+    elif args.comando == "reprocesar":
+        from scrapers.reprocesar import reprocesar
+        from db.historial import ejecucion
+        with ejecucion("reprocesar"):
+            reprocesar(args.archivos)
+        exito = True
+    else:
+        # Llamar al menú principal
+        exito = menu()
+
+    # Resumen de tiempos por fase y volcado JSON / Prometheus
+    metricas.informe()
+
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,119 @@
-def crear_libro(titulo, precio, disponibilidad, rating, imagen_url):
-    # Crea y devuelve un diccionario que representa un libro
-    return {
-        "titulo": titulo,               # Título del libro
-        "precio": precio,               # Precio del libro
-        "disponibilidad": disponibilidad, # Disponibilidad (ej. "En stock")
-        "rating": rating,               # Calificación (ej. 1–5 estrellas)
-        "imagen_url": imagen_url,       # URL de la imagen de portada
-        
-        # Campos adicionales para completar más adelante
-        "descripcion": None,            # Descripción del libro
-        "upc": None,                    # UPC o código identificador
-        "categoria": None               # Categoría a la que pertenece
-    }
+from enum import IntEnum
+
+
+class Disponibilidad(IntEnum):
+    """Disponibilidad normalizada de un libro."""
+
+    DESCONOCIDA = 0
+    EN_STOCK = 1
+    AGOTADO = 2
+
+    @classmethod
+    def desde_texto(cls, texto):
+        """Convierte textos como "In stock (22 available)" o "Out of stock"."""
+        if not texto:
+            return cls.DESCONOCIDA
+
+        texto = texto.strip().lower()
+        if texto.startswith(("out of stock", "agotado", "sin stock")):
+            return cls.AGOTADO
+        if texto.startswith(("in stock", "en stock", "disponible")):
+            return cls.EN_STOCK
+        return cls.DESCONOCIDA
+
+    @property
+    def texto(self):
+        """Texto que se guarda en la columna `disponibilidad`."""
+        return _TEXTOS_DISPONIBILIDAD[self]
+
+
+_TEXTOS_DISPONIBILIDAD = {
+    Disponibilidad.DESCONOCIDA: "Desconocida",
+    Disponibilidad.EN_STOCK: "In stock",
+    Disponibilidad.AGOTADO: "Out of stock",
+}
+
+
+def precio_a_centimos(texto):
+    """
+    Convierte un precio en texto a céntimos enteros.
+
+    Ignora símbolos de moneda y restos de codificación ("Â£51.77" → 5177);
+    si no hay ningún número devuelve 0.
+    """
+    if not texto:
+        return 0
+
+    limpio = "".join(c for c in texto if c.isdigit() or c == ".")
+    entero, _, decimales = limpio.partition(".")
+    if not entero and not decimales:
+        return 0
+
+    return int(entero or 0) * 100 + int((decimales + "00")[:2])
+
+
+class Libro:
+    """
+    Registro compacto de un libro extraído del listado.
+
+    La clave estable del libro en la BD es `url`, la URL de su página de detalle.
+
+    Usa __slots__ (sin diccionario por instancia) y guarda los campos ya
+    normalizados: el precio en céntimos, el rating como entero y la
+    disponibilidad como Disponibilidad. La descripción, el UPC y la
+    categoría no forman parte del registro: llegan después desde la página
+    de detalle y se escriben con EscritorLibros.actualizar().
+    """
+
+    __slots__ = ("url", "titulo", "precio_centimos", "disponibilidad", "rating", "imagen_url")
+
+    def __init__(self, url, titulo, precio_centimos, disponibilidad, rating, imagen_url):
+        self.url = url                            # URL de la página de detalle (clave)
+        self.titulo = titulo                      # Título del libro
+        self.precio_centimos = precio_centimos    # Precio en céntimos (51.77 → 5177)
+        self.disponibilidad = disponibilidad      # Disponibilidad normalizada
+        self.rating = rating                      # Calificación de 0 a 5 estrellas
+        self.imagen_url = imagen_url              # URL de la imagen de portada
+
+    @property
+    def precio(self):
+        """Precio en unidades de moneda (5177 → 51.77)."""
+        return self.precio_centimos / 100
+
+    def a_parametros(self):
+        """
+        Tupla de parámetros para SQL_UPSERT_LIBRO:
+        (url, titulo, precio_centimos, disponibilidad, rating, url_imagen).
+        EscritorLibros.guardar le añade la fecha de los datos.
+        """
+        return (self.url, self.titulo, self.precio_centimos, self.disponibilidad.texto, self.rating, self.imagen_url)
+
+    def __eq__(self, otro):
+        if not isinstance(otro, Libro):
+            return NotImplemented
+        return all(getattr(self, campo) == getattr(otro, campo) for campo in self.__slots__)
+
+    def __repr__(self):
+        return (
+            f"Libro({self.url!r}, {self.titulo!r}, {self.precio_centimos / 100:.2f}, "
+            f"{self.disponibilidad.name}, {self.rating}, {self.imagen_url!r})"
+        )
+
+
+def crear_libro(titulo, precio, disponibilidad, rating, imagen_url, url):
+    """
+    Crea un Libro a partir de los textos extraídos del HTML.
+
+    `url` es la URL absoluta de la página de detalle, que identifica al libro.
+
+    El precio y la disponibilidad se interpretan una sola vez aquí; a partir
+    de este punto el resto del proyecto trabaja con valores ya normalizados.
+    """
+    return Libro(
+        url,
+        titulo,
+        precio_a_centimos(precio),
+        Disponibilidad.desde_texto(disponibilidad),
+        int(rating or 0),
+        imagen_url or "",
+    )
@@ -0,0 +1,238 @@
+import os
+import re
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from scrapers.parsers import extraer_siguiente, extraer_categorias
+from utils.metricas import metricas
+from utils.logger import log
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL DESCUBRIMIENTO A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# URL principal del sitio a scrapear
+BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
+
+# Página de catálogo por la que empieza el recorrido
+PAGINA_INICIO = int(os.getenv("PAGINA_INICIO", 1))
+
+# Modo descubrimiento: sigue los enlaces "next" en lugar de construir
+# catalogue/page-N.html hasta N_PAGINA
+DESCUBRIR = os.getenv("DESCUBRIR", "0") == "1"
+
+# Recorre las categorías de la barra lateral en vez del catálogo general:
+# vacío = no, "*" = todas, o una lista separada por comas ("Travel,Poetry")
+DESCUBRIR_CATEGORIAS = os.getenv("DESCUBRIR_CATEGORIAS", "")
+
+# Tope de páginas de listado a recorrer (0 = hasta que el sitio se acabe)
+DESCUBRIR_MAX_PAGINAS = int(os.getenv("DESCUBRIR_MAX_PAGINAS", 0))
+
+_NUMERO_PAGINA = re.compile(r"page-(\d+)\.html$")
+
+
+def numero_pagina(url):
+    """Número de página de una URL de listado (las index.html son la 1)."""
+    coincidencia = _NUMERO_PAGINA.search(url)
+    return int(coincidencia.group(1)) if coincidencia else 1
+
+
+def seleccionar_categorias(categorias, filtro=DESCUBRIR_CATEGORIAS):
+    """Filtra las categorías [(nombre, url)] según DESCUBRIR_CATEGORIAS."""
+    if filtro.strip() == "*":
+        return categorias
+
+    buscadas = {nombre.strip().lower() for nombre in filtro.split(",") if nombre.strip()}
+    elegidas = [(nombre, url) for nombre, url in categorias if nombre.lower() in buscadas]
+
+    faltan = buscadas - {nombre.lower() for nombre, _ in elegidas}
+    if faltan:
+        print(f"⚠️ Categorías no encontradas en el sitio: {', '.join(sorted(faltan))}")
+        log("WARNING", f"Categorías no encontradas en la barra lateral: {sorted(faltan)}")
+
+    return elegidas
+
+
+def _cadenas(url, html, categorias):
+    """
+    Listados que hay que recorrer: el catálogo general desde `url`, o el
+    índice de cada categoría elegida de su barra lateral.
+
+    Devuelve [(url, html_ya_descargado_o_None, categoria)].
+    """
+    if not categorias:
+        return [(url, html, None)]
+
+    elegidas = seleccionar_categorias(extraer_categorias(html, url), categorias)
+    print(f"🧭 {len(elegidas)} categorías a recorrer")
+    log("INFO", f"Descubrimiento por categorías: {[nombre for nombre, _ in elegidas]}")
+    return [(url_categoria, None, nombre) for nombre, url_categoria in elegidas]
+
+
+class _Recorrido:
+    """
+    Reparte el tope de páginas entre los listados y evita ciclos entre los
+    enlaces "next".
+
+    Cada página reserva su hueco antes de descargarse, también la primera
+    de cada listado y las adelantadas, así varios listados recorridos a la
+    vez no pueden pasarse del tope. reservar() no cede el control, de modo
+    que en asyncio comprobar y reservar es una sola operación.
+    """
+
+    def __init__(self, max_paginas):
+        self.max_paginas = max_paginas
+        self.paginas = 0
+        self.reservadas = 0
+        self.visitadas = set()
+        self._tope_avisado = False
+
+    def reservar(self):
+        """Reserva el hueco de la próxima página; False si ya no quedan."""
+        if self.max_paginas and self.reservadas >= self.max_paginas:
+            if not self._tope_avisado:
+                self._tope_avisado = True
+                log("INFO", f"Tope de {self.max_paginas} páginas alcanzado")
+            return False
+        self.reservadas += 1
+        return True
+
+    def liberar(self):
+        """Devuelve el hueco de una página que no se pudo descargar."""
+        self.reservadas -= 1
+
+    def anotar(self, url, html):
+        """Registra la página y devuelve la URL de la siguiente (o None si hay que parar)."""
+        self.paginas += 1
+        self.visitadas.add(url)
+        metricas.contar("descubrimiento_paginas")
+
+        siguiente = extraer_siguiente(html, url)
+        if siguiente is None:
+            log("INFO", f"Fin del listado en {url}")
+            return None
+        if siguiente in self.visitadas:
+            log("WARNING", f"El enlace siguiente de {url} vuelve a {siguiente}; se corta el recorrido")
+            return None
+        return siguiente
+
+
+def _fin(recorrido):
+    print(f"\n🧭 Descubrimiento terminado: {recorrido.paginas} páginas de listado")
+    log("INFO", f"Descubrimiento terminado: {recorrido.paginas} páginas de listado")
+
+
+# ---------------------------------------------------------
+# RECORRIDO SÍNCRONO (MOTOR BS4)
+# ---------------------------------------------------------
+def recorrer(descargar, inicio=None, categorias=DESCUBRIR_CATEGORIAS, max_paginas=DESCUBRIR_MAX_PAGINAS):
+    """
+    Generador de (url, html, categoria) con cada página de listado descubierta.
+
+    `descargar(url)` devuelve el HTML o None. En cuanto se ve el enlace
+    "next" de una página, la siguiente se pide en un hilo aparte: su
+    descarga se solapa con el parseo y el guardado que hace el llamante
+    antes de pedir el próximo elemento. El recorrido de cada listado
+    termina cuando una página no tiene "next" o no se puede descargar.
+    """
+    inicio = inicio or f"{BASE}catalogue/page-{PAGINA_INICIO}.html"
+    recorrido = _Recorrido(max_paginas)
+
+    html = descargar(inicio)
+    if html is None:
+        print(f"❌ No se pudo descargar la página de inicio {inicio}")
+        log("ERROR", f"Descubrimiento sin página de inicio: {inicio}")
+        return
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") as prefetch:
+        for url, html, categoria in _cadenas(inicio, html, categorias):
+            futuro = None
+
+            while url:
+                # Las páginas adelantadas ya reservaron su hueco al pedirse
+                if futuro is None and not recorrido.reservar():
+                    break
+
+                if html is None:
+                    if futuro is None:
+                        html = descargar(url)
+                    else:
+                        metricas.contar("prefetch", resultado="lista" if futuro.done() else "esperada")
+                        html = futuro.result()
+
+                if html is None:
+                    recorrido.liberar()
+                    print(f"⚠️ {url} no respondió; se corta este listado")
+                    log("WARNING", f"Descubrimiento cortado en {url}")
+                    break
+
+                siguiente = recorrido.anotar(url, html)
+                if siguiente and not recorrido.reservar():
+                    siguiente = None
+                futuro = prefetch.submit(descargar, siguiente) if siguiente else None
+
+                yield url, html, categoria
+                url, html = siguiente, None
+
+    _fin(recorrido)
+
+
+# ---------------------------------------------------------
+# RECORRIDO ASÍNCRONO (MOTOR ASYNC)
+# ---------------------------------------------------------
+async def recorrer_async(descargar, procesar, inicio=None,
+                         categorias=DESCUBRIR_CATEGORIAS, max_paginas=DESCUBRIR_MAX_PAGINAS):
+    """
+    Versión asyncio de recorrer().
+
+    `descargar(url)` es una corrutina que devuelve el HTML o None y
+    `procesar(url, html, categoria)` una función normal que parsea y guarda;
+    se ejecuta en un hilo para que el event loop siga atendiendo la
+    descarga adelantada de la página siguiente. Los listados de las
+    distintas categorías se recorren a la vez.
+    """
+    inicio = inicio or f"{BASE}catalogue/page-{PAGINA_INICIO}.html"
+    recorrido = _Recorrido(max_paginas)
+
+    html = await descargar(inicio)
+    if html is None:
+        print(f"❌ No se pudo descargar la página de inicio {inicio}")
+        log("ERROR", f"Descubrimiento sin página de inicio: {inicio}")
+        return
+
+    async def cadena(url, html, categoria):
+        tarea = None
+
+        try:
+            while url:
+                # Entre reservar() y la descarga no hay await: ningún otro
+                # listado puede quedarse con el mismo hueco
+                if tarea is None and not recorrido.reservar():
+                    return
+
+                if html is None:
+                    if tarea is None:
+                        html = await descargar(url)
+                    else:
+                        metricas.contar("prefetch", resultado="lista" if tarea.done() else "esperada")
+                        html = await tarea
+
+                if html is None:
+                    recorrido.liberar()
+                    print(f"⚠️ {url} no respondió; se corta este listado")
+                    log("WARNING", f"Descubrimiento cortado en {url}")
+                    return
+
+                siguiente = recorrido.anotar(url, html)
+                if siguiente and not recorrido.reservar():
+                    siguiente = None
+                tarea = asyncio.create_task(descargar(siguiente)) if siguiente else None
+
+                await asyncio.to_thread(procesar, url, html, categoria)
+                url, html = siguiente, None
+        finally:
+            # Si procesar() lanzó una excepción, la página adelantada ya no se usará
+            if tarea is not None and not tarea.done():
+                tarea.cancel()
+
+    await asyncio.gather(*(cadena(url, html, categoria) for url, html, categoria in _cadenas(inicio, html, categorias)))
+    _fin(recorrido)
@@ -0,0 +1,347 @@
+import os
+import re
+from html import unescape
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from models.libro_modelo import crear_libro
+from utils.helpers import obtener_rating
+from utils.logger import log
+from utils.metricas import metricas
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL PARSER A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# URL principal del sitio a scrapear (para construir URLs absolutas)
+BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
+
+# Backend de parseo: html.parser / lxml / selectolax
+PARSER_HTML = os.getenv("PARSER_HTML", "html.parser")
+
+# Solo se construye el árbol de los artículos del listado, no de toda la página
+_SOLO_ARTICULOS = SoupStrainer("article", class_="product_pod")
+
+# Para navegar basta con el enlace "next" y la barra lateral de categorías
+_SOLO_NAVEGACION = SoupStrainer(class_=["next", "side_categories"])
+
+# El enlace "next" se busca en el texto antes de parsear: así la descarga de
+# la página siguiente puede empezar sin esperar a construir el árbol
+_ENLACE_SIGUIENTE = re.compile(r'<li[^>]*class="[^"]*\bnext\b[^"]*"[^>]*>\s*<a[^>]*href="([^"]+)"')
+
+# Marcas que una página bien servida tiene que contener (motor híbrido): los
+# artículos del listado, y la descripción o la tabla de datos en el detalle.
+# Se buscan en el texto, sin parsear, para decidir antes si hace falta un navegador.
+SELECTORES_ESPERADOS = {
+    "listado": re.compile(r'<article[^>]*class="[^"]*\bproduct_pod\b'),
+    "detalle": re.compile(r'id="product_description"|<table[^>]*class="[^"]*\btable\b'),
+}
+
+# Avisos típicos de una página que solo se rellena con JavaScript
+_PIDE_JAVASCRIPT = re.compile(r"enable javascript|javascript (is )?required|activ[ae] javascript|<noscript", re.I)
+
+
+# ---------------------------------------------------------
+# BACKENDS
+# ---------------------------------------------------------
+# Cada backend devuelve los campos "en crudo" (texto tal cual aparece en el
+# HTML, o None si falta). El formateo común se hace en extraer_listado /
+# extraer_detalle, así todos los backends producen exactamente los mismos libros.
+#
+# listado(html) -> [(titulo, href, precio, disponibilidad, clases_rating, src_imagen), ...]
+# detalle(html) -> (titulo_h1, descripcion, upc, categorias_breadcrumb)
+# navegacion(html) -> (href_siguiente, [(nombre_categoria, href), ...])
+
+
+class BackendBeautifulSoup:
+    """Backend BeautifulSoup, con html.parser (sin dependencias) o lxml."""
+
+    def __init__(self, features="html.parser"):
+        self.nombre = features
+        self.features = features
+
+    def listado(self, html):
+        soup = BeautifulSoup(html, self.features, parse_only=_SOLO_ARTICULOS)
+        return [self._campos_articulo(articulo) for articulo in soup.find_all("article")]
+
+    @staticmethod
+    def _campos_articulo(articulo):
+        """Recorre el artículo una sola vez quedándose con la primera aparición de cada campo."""
+        h3 = precio = disponibilidad = p = img = None
+
+        for nodo in articulo.descendants:
+            if not isinstance(nodo, Tag):
+                continue
+
+            clases = nodo.get("class") or ()
+            if h3 is None and nodo.name == "h3":
+                h3 = nodo
+            elif p is None and nodo.name == "p":
+                p = nodo
+            elif img is None and nodo.name == "img":
+                img = nodo
+
+            if precio is None and "price_color" in clases:
+                precio = nodo
+            elif disponibilidad is None and "availability" in clases:
+                disponibilidad = nodo
+
+        enlace = h3.a if h3 is not None else None
+        return (
+            enlace.get("title") if enlace is not None else None,
+            enlace.get("href") if enlace is not None else None,
+            precio.text if precio is not None else None,
+            disponibilidad.text if disponibilidad is not None else None,
+            p.get("class") if p is not None else None,
+            img.get("src") if img is not None else None,
+        )
+
+    def detalle(self, html):
+        soup = BeautifulSoup(html, self.features)
+
+        descripcion_tag = soup.find(id="product_description")
+        parrafo = descripcion_tag.find_next("p") if descripcion_tag else None
+
+        tabla = soup.find("table")
+        celda = tabla.find("td") if tabla else None
+
+        breadcrumb = soup.find("ul", class_="breadcrumb")
+        migas = [a.text for a in breadcrumb.find_all("a")] if breadcrumb else []
+
+        return (
+            soup.h1.text if soup.h1 else "",
+            parrafo.text if parrafo is not None else None,
+            celda.text if celda is not None else None,
+            migas,
+        )
+
+    def navegacion(self, html):
+        soup = BeautifulSoup(html, self.features, parse_only=_SOLO_NAVEGACION)
+
+        siguiente = soup.select_one("li.next a")
+        # El primer nivel es la raíz "Books"; las categorías cuelgan de ella
+        categorias = [(a.text, a.get("href")) for a in soup.select("div.side_categories ul ul a")]
+
+        return siguiente.get("href") if siguiente is not None else None, categorias
+
+
+class BackendSelectolax:
+    """Backend rápido basado en selectolax (motor lexbor, escrito en C)."""
+
+    nombre = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def listado(self, html):
+        arbol = self._parser(html)
+        return [self._campos_articulo(articulo) for articulo in arbol.css("article.product_pod")]
+
+    @staticmethod
+    def _campos_articulo(articulo):
+        h3 = precio = disponibilidad = p = img = None
+
+        # traverse() incluye al propio artículo; se salta
+        for nodo in articulo.traverse():
+            if nodo is articulo or nodo.tag == "article":
+                continue
+
+            clases = (nodo.attributes.get("class") or "").split()
+            if h3 is None and nodo.tag == "h3":
+                h3 = nodo
+            elif p is None and nodo.tag == "p":
+                p = nodo
+            elif img is None and nodo.tag == "img":
+                img = nodo
+
+            if precio is None and "price_color" in clases:
+                precio = nodo
+            elif disponibilidad is None and "availability" in clases:
+                disponibilidad = nodo
+
+        enlace = h3.css_first("a") if h3 is not None else None
+        return (
+            enlace.attributes.get("title") if enlace is not None else None,
+            enlace.attributes.get("href") if enlace is not None else None,
+            precio.text() if precio is not None else None,
+            disponibilidad.text() if disponibilidad is not None else None,
+            (p.attributes.get("class") or "").split() if p is not None else None,
+            img.attributes.get("src") if img is not None else None,
+        )
+
+    def detalle(self, html):
+        arbol = self._parser(html)
+
+        h1 = arbol.css_first("h1")
+        parrafo = arbol.css_first("#product_description ~ p")
+        celda = arbol.css_first("table td")
+        migas = [a.text() for a in arbol.css("ul.breadcrumb a")]
+
+        return (
+            h1.text() if h1 is not None else "",
+            parrafo.text() if parrafo is not None else None,
+            celda.text() if celda is not None else None,
+            migas,
+        )
+
+    def navegacion(self, html):
+        arbol = self._parser(html)
+
+        siguiente = arbol.css_first("li.next a")
+        categorias = [(a.text(), a.attributes.get("href")) for a in arbol.css("div.side_categories ul ul a")]
+
+        return siguiente.attributes.get("href") if siguiente is not None else None, categorias
+
+
+_backends = {}
+
+
+def obtener_backend(nombre=PARSER_HTML):
+    """
+    Devuelve (y reutiliza) el backend indicado.
+
+    Si la librería del backend no está instalada se avisa en el log
+    y se usa html.parser, que no necesita dependencias extra.
+    """
+    if nombre in _backends:
+        return _backends[nombre]
+
+    try:
+        if nombre == "selectolax":
+            backend = BackendSelectolax()
+        elif nombre == "lxml":
+            import lxml  # noqa: F401  (solo se comprueba que esté instalado)
+            backend = BackendBeautifulSoup("lxml")
+        else:
+            backend = BackendBeautifulSoup("html.parser")
+
+    except ImportError as e:
+        log("WARNING", f"Parser '{nombre}' no disponible ({e}); se usa html.parser")
+        backend = BackendBeautifulSoup("html.parser")
+
+    _backends[nombre] = backend
+    return backend
+
+
+# ---------------------------------------------------------
+# EXTRACCIÓN COMÚN
+# ---------------------------------------------------------
+def extraer_listado(html, pagina, url=None):
+    """
+    Extrae los libros de una página de catálogo ya descargada.
+
+    Devuelve una lista de tuplas (libro, enlace) donde `libro` es el
+    Libro generado por crear_libro y `enlace` la URL absoluta
+    de su página de detalle.
+
+    Los enlaces del HTML son relativos a la página: `url` es la dirección
+    de la que se descargó (por defecto, una página de BASE/catalogue/;
+    las de categoría están más abajo en el árbol).
+    """
+    url = url or f"{BASE}catalogue/"
+
+    with metricas.medir("parseo", tipo="listado"):
+        articulos = obtener_backend().listado(html)
+    print(f"   ✔ {len(articulos)} libros encontrados")
+    log("DEBUG", f"{len(articulos)} libros encontrados en página {pagina}")
+
+    resultados = []
+
+    for titulo, href, precio_txt, disponibilidad_txt, clases_rating, src_imagen in articulos:
+
+        # Validación de título
+        if not titulo:
+            log("WARNING", "No se encontró título de un libro")
+            continue
+
+        # Rating obtenido desde clases CSS como "star-rating Three"
+        rating = obtener_rating(clases_rating[1]) if clases_rating and len(clases_rating) > 1 else 0
+
+        # URL completa de imagen
+        imagen_url = urljoin(url, src_imagen) if src_imagen else ""
+
+        # Enlace absoluto al detalle: es la clave del libro en la BD
+        if not href:
+            log("WARNING", f"No se encontró enlace de detalle para: {titulo}")
+            continue
+        enlace = urljoin(url, href)
+
+        log("INFO", f"Libro encontrado: {titulo}")
+
+        # El precio y la disponibilidad se normalizan dentro de crear_libro
+        libro = crear_libro(titulo, precio_txt, disponibilidad_txt, rating, imagen_url, enlace)
+        log("DEBUG", f"Precio={libro.precio:.2f}, Rating={rating}, URL={enlace}")
+
+        resultados.append((libro, enlace))
+
+    return resultados
+
+
+def extraer_detalle(html, enlace):
+    """
+    Extrae descripción, UPC, categoría y título de una página de detalle.
+
+    Devuelve una tupla (titulo_h1, descripcion, upc, categoria).
+    """
+    with metricas.medir("parseo", tipo="detalle"):
+        titulo_h1, descripcion, upc, migas = obtener_backend().detalle(html)
+
+    # Descripción del producto
+    if descripcion is None:
+        log("WARNING", f"No se encontró la descripción en {enlace}")
+        descripcion = ""
+
+    # UPC del libro (primer valor en tabla)
+    if upc is None:
+        log("WARNING", f"No se encontró UPC en {enlace}")
+        upc = ""
+
+    # Categoría dentro del breadcrumb (Home > Books > Categoría)
+    categoria = migas[-1] if len(migas) >= 3 else ""
+    if not categoria:
+        log("WARNING", f"No se encontró categoría en {enlace}")
+
+    # Título detallado
+    if not titulo_h1:
+        log("WARNING", f"No se encontró título en detalle {enlace}")
+
+    return titulo_h1, descripcion, upc, categoria
+
+
+# ---------------------------------------------------------
+# NAVEGACIÓN (MODO DESCUBRIMIENTO)
+# ---------------------------------------------------------
+def extraer_siguiente(html, url):
+    """
+    URL absoluta de la página siguiente del listado, o None si es la última.
+
+    Primero prueba con una expresión regular sobre el texto (casi gratis);
+    si no encaja, lo confirma el backend de parseo.
+    """
+    coincidencia = _ENLACE_SIGUIENTE.search(html)
+    if coincidencia:
+        return urljoin(url, unescape(coincidencia.group(1)))
+
+    href, _ = obtener_backend().navegacion(html)
+    return urljoin(url, href) if href else None
+
+
+def extraer_categorias(html, url):
+    """Categorías de la barra lateral como [(nombre, url_absoluta), ...]."""
+    with metricas.medir("parseo", tipo="navegacion"):
+        _, categorias = obtener_backend().navegacion(html)
+
+    return [(nombre.strip(), urljoin(url, href)) for nombre, href in categorias if href]
+
+
+# ---------------------------------------------------------
+# VALIDACIÓN (MOTOR HÍBRIDO)
+# ---------------------------------------------------------
+def contiene_esperado(html, tipo):
+    """True si el HTML de una página `tipo` ("listado" / "detalle") trae lo que se va a extraer."""
+    return SELECTORES_ESPERADOS[tipo].search(html) is not None
+
+
+def pide_javascript(html):
+    """True si la página avisa de que necesita JavaScript para mostrar su contenido."""
+    return _PIDE_JAVASCRIPT.search(html) is not None
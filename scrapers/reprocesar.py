@@ -0,0 +1,180 @@
+import os
+import time
+from datetime import datetime
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from db.base_datos import EscritorLibros, calcular_huella
+from scrapers.parsers import extraer_listado, extraer_detalle, contiene_esperado
+from scrapers.descubrimiento import numero_pagina
+from utils.archivo_warc import archivos_warc, leer_warc
+from utils.cache_http import decodificar
+from utils.metricas import metricas
+from utils.logger import log
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL REPROCESADO A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# Procesos de parseo; por defecto uno por núcleo
+REPROCESAR_PROCESOS = int(os.getenv("REPROCESAR_PROCESOS", os.cpu_count() or 2))
+
+# Páginas que se envían juntas a un proceso (menos viajes entre procesos)
+REPROCESAR_LOTE = int(os.getenv("REPROCESAR_LOTE", 50))
+
+
+def _parsear_lote(lote):
+    """
+    Trabajo de cada proceso: parsea un lote de páginas archivadas.
+
+    `lote` es [(url, cuerpo, content_type, fecha)]. El tipo de página se
+    deduce de su contenido (contiene_esperado), así valen también los
+    listados de categoría. Devuelve [(tipo, url, resultado, fecha, huella)]
+    en el mismo orden.
+    """
+    resultados = []
+    for url, cuerpo, content_type, fecha in lote:
+        huella = None
+        try:
+            html = decodificar(cuerpo, content_type)
+            huella = calcular_huella(html)
+            if contiene_esperado(html, "listado"):
+                resultados.append(("listado", url, extraer_listado(html, numero_pagina(url), url), fecha, huella))
+            elif contiene_esperado(html, "detalle"):
+                resultados.append(("detalle", url, extraer_detalle(html, url), fecha, huella))
+            else:
+                resultados.append(("sin_datos", url, None, fecha, huella))
+        except Exception as e:
+            resultados.append(("error", url, str(e), fecha, huella))
+    return resultados
+
+
+def _fecha_bd(fecha_warc):
+    """WARC-Date ('2026-10-18T11:57:58.123456Z') → formato de la BD ('2026-10-18 11:57:58.123'), en UTC."""
+    if not fecha_warc:
+        return None
+    try:
+        fecha = datetime.fromisoformat(fecha_warc.replace("Z", "+00:00"))
+    except ValueError:
+        log("WARNING", f"WARC-Date no válida: {fecha_warc!r}")
+        return None
+    return fecha.strftime("%Y-%m-%d %H:%M:%S.%f")[:23]
+
+
+def _ultimas_respuestas(archivos):
+    """
+    Primera pasada: posición (archivo, registro) de la última respuesta 200
+    de cada URL. Solo se leen las cabeceras, sin parsear HTML.
+    """
+    ultimas = {}
+    for indice, ruta in enumerate(archivos):
+        for posicion, registro in enumerate(leer_warc(ruta)):
+            if registro.estado == 200:
+                ultimas[registro.url] = (indice, posicion)
+    return ultimas
+
+
+def _paginas(archivos, ultimas, conteo):
+    """Segunda pasada: (url, cuerpo, content_type, fecha) de la última copia de cada URL."""
+    for indice, ruta in enumerate(archivos):
+        print(f"   📦 {ruta}")
+        log("INFO", f"Reprocesando {ruta}")
+
+        for posicion, registro in enumerate(leer_warc(ruta)):
+            if registro.estado != 200:
+                conteo["no_200"] += 1
+            elif ultimas.get(registro.url) != (indice, posicion):
+                conteo["antiguas"] += 1
+            else:
+                yield registro.url, registro.cuerpo, registro.cabeceras.get("content-type"), _fecha_bd(registro.fecha)
+
+
+def _lotes(paginas, tamano):
+    lote = []
+    for pagina in paginas:
+        lote.append(pagina)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _guardar(escritor, resultados, conteo):
+    """
+    Escribe los resultados de un lote a través del escritor (un único hilo).
+
+    Cada fila lleva la fecha de su respuesta archivada: el escritor no la
+    aplica si la BD tiene datos más recientes (rastreados sin archivar o
+    tras el WARC), así un archivo antiguo no hace retroceder la tabla.
+    Si la página es justo la última que llegó a la BD (misma huella), sus
+    datos salen de esta copia y se corrigen sin mirar la fecha: la BD se
+    escribió unos milisegundos después de archivarla.
+    """
+    for tipo, url, resultado, fecha, huella in resultados:
+        conteo[tipo] += 1
+        metricas.contar("reprocesar_paginas", tipo=tipo)
+
+        if huella is not None and escritor.huella_vigente(url, huella):
+            conteo["vigentes"] += 1
+            fecha = None
+
+        if tipo == "listado":
+            for libro, _ in resultado:
+                escritor.guardar(libro, fecha)
+        elif tipo == "detalle":
+            _, descripcion, upc, categoria = resultado
+            escritor.actualizar(url, descripcion, upc, categoria, fecha)
+        elif tipo == "error":
+            log("ERROR", f"Error reparseando {url}: {resultado}")
+
+
+def reprocesar(rutas=None, procesos=REPROCESAR_PROCESOS):
+    """
+    Vuelve a extraer los libros de las respuestas archivadas en WARC, sin red.
+
+    Sirve para corregir las filas existentes tras arreglar un error de
+    extracción, sin repetir el rastreo. De cada URL se usa solo su última
+    respuesta 200 (una primera pasada rápida lee solo las cabeceras), así
+    el historial no registra los precios antiguos de cada copia anterior.
+    Las páginas se parsean por lotes en `procesos` procesos, con como mucho
+    dos lotes por proceso en vuelo, y se escriben en orden desde este
+    proceso con EscritorLibros. Ninguna fila se sobrescribe con una copia
+    más antigua que sus datos en la BD. Devuelve el número de páginas
+    reprocesadas.
+    """
+    archivos = archivos_warc(rutas)
+    if not archivos:
+        print("⚠️ No hay archivos WARC que reprocesar (ARCHIVAR_WARC=1 los genera al rastrear)")
+        log("WARNING", f"Sin archivos WARC en {rutas or 'RUTA_WARC'}")
+        return 0
+
+    inicio = time.monotonic()
+    print(f"♻️  Reprocesando {len(archivos)} archivo(s) WARC con {procesos} procesos...")
+    log("INFO", f"Reprocesando {len(archivos)} archivos WARC con {procesos} procesos")
+
+    ultimas = _ultimas_respuestas(archivos)
+    print(f"   {len(ultimas)} URLs distintas con respuesta 200")
+
+    conteo = Counter()
+    with EscritorLibros() as escritor, ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        en_vuelo = deque()
+
+        # Los lotes se consumen en el orden en que se enviaron
+        for lote in _lotes(_paginas(archivos, ultimas, conteo), REPROCESAR_LOTE):
+            en_vuelo.append(ejecutor.submit(_parsear_lote, lote))
+            if len(en_vuelo) >= procesos * 2:
+                _guardar(escritor, en_vuelo.popleft().result(), conteo)
+
+        while en_vuelo:
+            _guardar(escritor, en_vuelo.popleft().result(), conteo)
+
+    duracion = time.monotonic() - inicio
+    paginas = conteo["listado"] + conteo["detalle"]
+    print(f"\n♻️  Reprocesado terminado: {paginas} páginas ({conteo['listado']} listados, "
+          f"{conteo['detalle']} detalles) en {duracion:.1f} s ({paginas / duracion if duracion else 0:.0f} páginas/s)")
+    print(f"   Omitidas: {conteo['antiguas']} copias antiguas, {conteo['no_200']} respuestas no 200, "
+          f"{conteo['sin_datos']} sin datos reconocibles, {conteo['error']} con error")
+    print(f"   {conteo['vigentes']} páginas son la última copia que llegó a la BD; las demás no pisan "
+          f"datos más recientes. {escritor.filas_modificadas} filas de libros corregidas")
+    log("INFO", f"Reprocesado: {dict(conteo)}, {escritor.filas_modificadas} filas modificadas en {duracion:.1f} s")
+    return paginas
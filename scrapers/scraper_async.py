@@ -0,0 +1,261 @@
+import os
+import time
+import asyncio
+import aiohttp
+from db.base_datos import EscritorLibros
+from scrapers.scraper_bs4 import guardar_listado, guardar_detalle
+from scrapers.descubrimiento import recorrer_async, numero_pagina, DESCUBRIR
+from utils.tiempos import esperar_async
+from utils.limitador import limitador
+from utils.cliente_http import (
+    circuito, espera_reintento, error_definitivo, CODIGOS_REINTENTABLES, HTTP_REINTENTOS, HTTP_TIMEOUT, HTTP_POOL,
+)
+from db.fallidos import registrar_fallido
+from utils.cache_http import CacheHTTP, CACHE_HTTP, decodificar
+from utils.metricas import metricas
+from utils.archivo_warc import archivo_warc
+from utils.imagenes import DescargadorImagenes
+from utils.logger import log
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL SCRAPER A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# URL principal del sitio a scrapear
+BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
+
+# Última página de catálogo a recorrer
+N_PAGINA = int(os.getenv("N_PAGINA", 4)) + 1
+
+# Primera página de catálogo a recorrer (permite reanudar o repartir rangos)
+PAGINA_INICIO = int(os.getenv("PAGINA_INICIO", 1))
+
+# Número de libros cuyos detalles serán consultados
+LIBROS_NAVEGA_DETALLE = int(os.getenv("LIBROS_NAVEGA_DETALLE", 5))
+
+# Número máximo de requests simultáneos en vuelo
+CONCURRENCIA = int(os.getenv("CONCURRENCIA", 5))
+
+
+async def descargar(session, semaforo, cache, url, condicional=True):
+    """
+    Descarga una URL respetando el límite de concurrencia.
+
+    Devuelve el texto de la página o None si la respuesta no es 200.
+    Si la caché HTTP tiene una copia vigente se devuelve sin tocar la red;
+    si está caducada se revalida con cabeceras condicionales (304), y si
+    la copia se expulsó antes de llegar el 304 se pide de nuevo sin ellas.
+    Antes de cada request se pide turno al circuito y al limitador
+    compartidos, y después se les informa del resultado.
+
+    Aplica la misma política que utils/cliente_http.obtener: reintentos con
+    backoff y jitter ante errores transitorios y, si se agotan, la URL se
+    anota en la tabla fallidos (los errores definitivos, no).
+    """
+    cabeceras = {}
+    if cache is not None and condicional:
+        cacheada, cabeceras = cache.buscar(url)
+        if cacheada is not None:
+            metricas.contar("cache", resultado="acierto")
+            return cacheada.text
+
+    for intento in range(HTTP_REINTENTOS + 1):
+        # Mientras el circuito del host esté abierto no se pide nada
+        while (espera := circuito.espera(url)) > 0:
+            await asyncio.sleep(espera)
+
+        estado = retry_after = None
+        async with semaforo:
+            # Espera su turno para no saturar el sitio
+            await esperar_async(url)
+            inicio = time.monotonic()
+
+            try:
+                async with session.get(url, headers=cabeceras) as respuesta:
+                    estado = respuesta.status
+                    retry_after = respuesta.headers.get("Retry-After")
+                    latencia = time.monotonic() - inicio
+                    limitador.registrar(url, estado=estado, latencia=latencia, retry_after=retry_after)
+                    metricas.observar("http", latencia, estado=estado)
+                    log("DEBUG", f"HTTP {estado} en {url}")
+
+                    # Copia en bruto para poder reparsear sin red (ARCHIVAR_WARC=1)
+                    if archivo_warc.activo:
+                        archivo_warc.archivar(url, estado, respuesta.reason, respuesta.headers, await respuesta.read())
+
+                    if estado not in CODIGOS_REINTENTABLES:
+                        circuito.exito(url)
+
+                    if estado == 304 and cache is not None:
+                        cacheada = cache.revalidada(url, respuesta.headers)
+                        if cacheada is not None:
+                            metricas.contar("cache", resultado="revalidada")
+                            return cacheada.text
+
+                    if estado == 200:
+                        cuerpo = await respuesta.read()
+                        if cache is not None:
+                            cache.guardar(url, cuerpo, respuesta.headers)
+                        return decodificar(cuerpo, respuesta.headers.get("Content-Type"))
+
+            except Exception as e:
+                limitador.registrar(url, error=True)
+                metricas.contar("http_errores")
+                circuito.fallo(url)
+
+                if intento < HTTP_REINTENTOS:
+                    await _reintentar(url, intento, type(e).__name__)
+                    continue
+
+                print(f"❌ Error descargando {url}: {e}")
+                log("ERROR", f"Error descargando {url}: {e}")
+                registrar_fallido(url, error=str(e), intentos=intento + 1)
+                return None
+
+        # 304 sin copia en caché (se expulsó entre buscar() y la respuesta)
+        if estado == 304 and cache is not None and condicional:
+            metricas.contar("cache", resultado="expulsada")
+            log("WARNING", f"304 sin copia en caché para {url}; se pide de nuevo sin condiciones")
+            return await descargar(session, semaforo, cache, url, condicional=False)
+
+        if estado in CODIGOS_REINTENTABLES:
+            circuito.fallo(url)
+            if intento < HTTP_REINTENTOS:
+                await _reintentar(url, intento, f"HTTP {estado}", retry_after)
+                continue
+
+        print(f"❌ Error HTTP {estado} en {url}")
+        log("ERROR", f"HTTP {estado} en {url}")
+        if estado in CODIGOS_REINTENTABLES:
+            registrar_fallido(url, estado=estado, intentos=intento + 1)
+        else:
+            error_definitivo(url, estado)
+        return None
+
+
+async def _reintentar(url, intento, motivo, retry_after=None):
+    """Espera el backoff del reintento sin ocupar un hueco del semáforo."""
+    espera = espera_reintento(intento, retry_after)
+    metricas.contar("http_reintentos", motivo=motivo)
+    log("WARNING", f"{motivo} en {url}; reintento {intento + 1} en {espera:.2f} s")
+    await asyncio.sleep(espera)
+
+
+def _guardar_pagina(escritor, imagenes, url, html, pagina, enlaces_detalle, categoria=None):
+    """guardar_listado() del motor bs4, sin que el error de una página pare las demás."""
+    try:
+        guardar_listado(escritor, imagenes, url, html, pagina, enlaces_detalle, categoria)
+    except Exception as e:
+        print(f"❌ Error en página {pagina}: {e}")
+        log("ERROR", f"Error procesando página {url}: {e}")
+
+
+async def procesar_pagina(session, semaforo, cache, escritor, imagenes, pagina, enlaces_detalle):
+    """Descarga una página del catálogo y guarda sus libros."""
+    url = f"{BASE}catalogue/page-{pagina}.html"
+    print(f"\n📄 Procesando página {pagina}: {url}")
+    log("INFO", f"Procesando página: {url}")
+
+    html = await descargar(session, semaforo, cache, url)
+    if html is None:
+        return
+
+    _guardar_pagina(escritor, imagenes, url, html, pagina, enlaces_detalle)
+
+
+async def descubrir_paginas(session, semaforo, cache, escritor, imagenes, enlaces_detalle):
+    """
+    Modo descubrimiento: sigue los enlaces "next" (o las categorías) hasta
+    el final del sitio. Cada página se pide en cuanto aparece su enlace y
+    se descarga mientras otro hilo parsea la anterior.
+    """
+    def procesar(url, html, categoria):
+        pagina = numero_pagina(url)
+        print(f"\n📄 Procesando {f'{categoria}, ' if categoria else ''}página {pagina}: {url}")
+        log("INFO", f"Procesando página: {url}")
+        _guardar_pagina(escritor, imagenes, url, html, pagina, enlaces_detalle, categoria)
+
+    await recorrer_async(lambda url: descargar(session, semaforo, cache, url), procesar)
+
+
+async def procesar_detalle(session, semaforo, cache, escritor, enlace):
+    """Descarga la página de detalle de un libro y actualiza su registro."""
+    print(f"\n➡️  Abriendo detalle: {enlace}")
+    log("INFO", f"Abriendo detalle: {enlace}")
+
+    html = await descargar(session, semaforo, cache, enlace)
+    if html is None:
+        return
+
+    try:
+        guardar_detalle(escritor, enlace, html)
+    except Exception as e:
+        print(f"❌ Error en detalle {enlace}: {e}")
+        log("ERROR", f"Error procesando detalle {enlace}: {e}")
+
+
+async def _scraper_async():
+    semaforo = asyncio.Semaphore(CONCURRENCIA)
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    # Pool explícito: conexiones keep-alive reutilizadas entre requests
+    conector = aiohttp.TCPConnector(limit=HTTP_POOL, limit_per_host=CONCURRENCIA, keepalive_timeout=30)
+    enlaces_detalle = []
+
+    # Caché en disco para no volver a descargar páginas sin cambios
+    cache = CacheHTTP() if CACHE_HTTP else None
+
+    # El escritor se usa desde el hilo del event loop y desde los hilos de
+    # portadas (DESCARGAR_IMAGENES=1), que descargan en paralelo al listado
+    with EscritorLibros() as escritor, DescargadorImagenes(escritor) as imagenes:
+        async with aiohttp.ClientSession(timeout=timeout, connector=conector) as session:
+
+            # ---------------------------------------------------------
+            # 📌 1. SCRAPING DE LISTADO DE LIBROS
+            # ---------------------------------------------------------
+            if DESCUBRIR:
+                await descubrir_paginas(session, semaforo, cache, escritor, imagenes, enlaces_detalle)
+            else:
+                await asyncio.gather(*(
+                    procesar_pagina(session, semaforo, cache, escritor, imagenes, pagina, enlaces_detalle)
+                    for pagina in range(PAGINA_INICIO, N_PAGINA)
+                ))
+
+            # ---------------------------------------------------------
+            # 📌 2. SCRAPING DE DETALLE DE LIBROS
+            # ---------------------------------------------------------
+            # Escoge los enlaces más valiosos: detalles que faltan o más antiguos
+            seleccion = escritor.planificar_detalle(enlaces_detalle, LIBROS_NAVEGA_DETALLE)
+            total_detalle = len(seleccion)
+
+            print(f"\n🔍 Procesando detalle de {total_detalle} libro{'s' if total_detalle != 1 else ''}...")
+            log("INFO", f"Iniciando scraping de detalle de {total_detalle} libros")
+
+            await asyncio.gather(*(
+                procesar_detalle(session, semaforo, cache, escritor, enlace)
+                for enlace in seleccion
+            ))
+
+    if cache is not None:
+        print(f"\n🗄️  Caché HTTP: {cache.resumen()}")
+        cache.cerrar()
+
+
+def scraper_async():
+    """
+    Scraper asíncrono utilizando asyncio + aiohttp.
+
+    Recorre las mismas fases que scraper_bs4 y reutiliza su extracción,
+    pero mantiene hasta CONCURRENCIA requests en vuelo a la vez, de modo
+    que el tiempo total lo marca la pausa de cortesía y no la latencia
+    de cada request.
+
+    Los libros se guardan con el mismo EscritorLibros por lotes que el
+    resto de motores.
+    """
+    print(f"➡️ Iniciando scraping asíncrono (concurrencia={CONCURRENCIA})...")
+    log("INFO", f"Iniciando scraping asíncrono con concurrencia {CONCURRENCIA}")
+
+    asyncio.run(_scraper_async())
+
+    print("\n🏁 Scraping asíncrono finalizado.")
+    log("INFO", "Scraping asíncrono finalizado")
@@ -1,12 +1,11 @@
 import os
-import requests
-from bs4 import BeautifulSoup
-from models.libro_modelo import crear_libro
-from db.base_datos import guardar_libro, actualizar_libro
-from utils.helpers import obtener_rating
-from utils.tiempos import esperar
+from db.base_datos import EscritorLibros
+from scrapers.parsers import extraer_listado, extraer_detalle
+from scrapers.descubrimiento import recorrer, numero_pagina, DESCUBRIR
+from utils.cliente_http import crear_sesion, obtener
+from utils.cache_http import CacheHTTP, CACHE_HTTP
+from utils.imagenes import DescargadorImagenes
 from utils.logger import log
-import random
 
 # ---------------------------------------------------------
 # CONFIGURACIÓN DEL SCRAPER A TRAVÉS DE VARIABLES DE ENTORNO
@@ -15,171 +14,181 @@ import random
 # URL principal del sitio a scrapear
 BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
 
-# Cantidad de páginas de catálogo a recorrer
+# Última página de catálogo a recorrer
 N_PAGINA = int(os.getenv("N_PAGINA", 4)) + 1
 
+# Primera página de catálogo a recorrer (permite reanudar o repartir rangos)
+PAGINA_INICIO = int(os.getenv("PAGINA_INICIO", 1))
+
 # Número de libros cuyos detalles serán consultados
 LIBROS_NAVEGA_DETALLE = int(os.getenv("LIBROS_NAVEGA_DETALLE", 5))
 
+# Modo incremental: omite las páginas cuyo contenido no cambió desde la última vez
+INCREMENTAL = os.getenv("INCREMENTAL", "0") == "1"
 
-def scraper_bs4():
-    """
-    Scraper utilizando Requests + BeautifulSoup.
 
-    Fase 1:
-        Recorre las páginas listadas en N_PAGINA,
-        extrae los datos básicos de cada libro y los guarda en la base de datos.
+def guardar_listado(escritor, imagenes, url, html, pagina, enlaces_detalle, categoria=None):
+    """Guarda los libros de una página de listado ya descargada y anota sus enlaces de detalle."""
+    sin_cambios, huella = escritor.comparar_huella(url, html)
 
-    Fase 2:
-        Selecciona aleatoriamente LIBROS_NAVEGA_DETALLE libros,
-        visita sus páginas individuales y extrae información adicional
-        como descripción, UPC y categoría.
-    """
+    # En modo incremental una página idéntica no se vuelve a parsear
+    if INCREMENTAL and sin_cambios:
+        print(f"   ⏩ Página {pagina} sin cambios, se omite")
+        log("INFO", f"Página sin cambios, se omite: {url}")
+        enlaces_detalle.extend(escritor.enlaces_nuevos(escritor.enlaces_huella(url)))
+        return
 
-    # Crea una sesión para reutilizar conexión HTTP
-    session = requests.Session()
-    enlaces_detalle = []
+    enlaces_pagina = []
 
-    print("➡️ Iniciando scraping con BeautifulSoup...")
-    log("INFO", "Iniciando scraping con BeautifulSoup")
+    # Crear y guardar cada libro en la base de datos
+    for libro, enlace in extraer_listado(html, pagina, url):
+        escritor.guardar(libro)
+        imagenes.encolar(libro)
 
-    # ---------------------------------------------------------
-    # 📌 1. SCRAPING DE LISTADO DE LIBROS
-    # ---------------------------------------------------------
-    for pagina in range(1, N_PAGINA):
-        url = f"{BASE}catalogue/page-{pagina}.html"
-        print(f"\n📄 Procesando página {pagina}: {url}")
-        log("INFO", f"Procesando página: {url}")
-
-        try:
-            # Realiza request a la página del catálogo
-            respuesta = session.get(url, timeout=10)
-            log("DEBUG", f"HTTP {respuesta.status_code} en página {pagina}")
-
-            # Si no responde 200, se omite
-            if respuesta.status_code != 200:
-                print(f"❌ Error HTTP {respuesta.status_code} en página {pagina}")
-                log("ERROR", f"HTTP {respuesta.status_code} en página {pagina}")
-                continue
-
-            # Parsear HTML
-            soup = BeautifulSoup(respuesta.text, "html.parser")
-
-            # Encuentra cada contenedor de libro
-            articulos = soup.select("article.product_pod")
-            print(f"   ✔ {len(articulos)} libros encontrados")
-            log("DEBUG", f"{len(articulos)} libros encontrados en página {pagina}")
-
-            # Procesar cada libro detectado
-            for articulo in articulos:
-
-                # ----------- EXTRACCIÓN SEGURA DE DATOS ------------
-                titulo_tag = getattr(articulo.h3.a, "get", lambda x: None)("title")
-                precio_tag = articulo.select_one(".price_color")
-                disponibilidad_tag = articulo.select_one(".availability")
-                rating_tag = articulo.p
-                imagen_tag = articulo.img
-                href_tag = getattr(articulo.h3.a, "get", lambda x: None)("href")
-
-                # Validación de título
-                if not titulo_tag:
-                    log("WARNING", "No se encontró título de un libro")
-                    continue
+        # En el listado de una categoría, la categoría se conoce sin abrir el detalle
+        if categoria:
+            escritor.categorizar(enlace, categoria)
 
-                # Datos base
-                titulo = titulo_tag
-                precio = precio_tag.text.replace("£", "") if precio_tag else "0.00"
-                disponibilidad = disponibilidad_tag.text.strip() if disponibilidad_tag else "Desconocida"
+        # Guardamos enlace para posterior scraping de detalle
+        enlaces_pagina.append(enlace)
 
-                # Rating obtenido desde clases CSS como "star-rating Three"
-                rating = obtener_rating(rating_tag["class"][1]) if rating_tag and rating_tag.has_attr("class") else 0
+    enlaces_detalle.extend(escritor.enlaces_nuevos(enlaces_pagina))
+    escritor.registrar_huella(url, huella, enlaces_pagina)
 
-                # URL completa de imagen
-                imagen_url = BASE + imagen_tag["src"].replace("../", "") if imagen_tag else ""
 
-                # Enlace absoluto al detalle
-                enlace = BASE + "catalogue/" + href_tag if href_tag else ""
+def guardar_detalle(escritor, url, html):
+    """Actualiza el libro con su página de detalle ya descargada (descripción, UPC y categoría)."""
+    sin_cambios, huella = escritor.comparar_huella(url, html)
 
-                log("INFO", f"Libro encontrado: {titulo}")
-                log("DEBUG", f"Precio={precio}, Rating={rating}, URL={enlace}")
+    # En modo incremental un detalle idéntico no se vuelve a parsear
+    if INCREMENTAL and sin_cambios:
+        print("   ⏩ Detalle sin cambios, se omite")
+        log("INFO", f"Detalle sin cambios, se omite: {url}")
+        escritor.marcar_detalle(url)
+        return
 
-                # Crear y guardar libro en la base de datos
-                libro = crear_libro(titulo, precio, disponibilidad, rating, imagen_url)
-                guardar_libro(libro)
+    titulo_h1, descripcion, upc, categoria = extraer_detalle(html, url)
 
-                # Guardamos enlace para posterior scraping de detalle
-                enlaces_detalle.append(enlace)
+    print(f"   ✏️ Actualizando libro: {titulo_h1}")
+    log("INFO", f"Actualizando libro: {titulo_h1}")
+    log("DEBUG", f"UPC={upc}, Categoría={categoria}")
 
-        except Exception as e:
-            print(f"❌ Error en página {pagina}: {e}")
-            log("ERROR", f"Error procesando página {pagina}: {e}")
+    # Actualiza el registro del libro
+    escritor.actualizar(url, descripcion, upc, categoria)
+    escritor.registrar_huella(url, huella)
 
-        # Espera para no saturar el sitio
-        esperar()
+    print("   ✔ Datos de detalle actualizados")
+    log("INFO", f"Detalle actualizado para {titulo_h1}")
 
-    # ---------------------------------------------------------
-    # 📌 2. SCRAPING DE DETALLE DE LIBROS
-    # ---------------------------------------------------------
 
-    total_detalle = min(LIBROS_NAVEGA_DETALLE, len(enlaces_detalle))
+def _descargar_html(session, cache, url):
+    """HTML de `url`, o None si no responde 200."""
+    try:
+        respuesta = obtener(session, url, cache)
+    except Exception as e:
+        print(f"❌ Error descargando {url}: {e}")
+        log("ERROR", f"Error descargando {url}: {e}")
+        return None
 
-    print(f"\n🔍 Procesando detalle aleatorio de {total_detalle} libro{'s' if total_detalle > 1 else ''}...")
-    log("INFO", f"Iniciando scraping de detalle de {total_detalle} libros")
+    if respuesta.status_code != 200:
+        print(f"❌ Error HTTP {respuesta.status_code} en {url}")
+        log("ERROR", f"HTTP {respuesta.status_code} en {url}")
+        return None
+    return respuesta.text
 
-    # Escoge enlaces aleatorios del total
-    enlaces_detalle = random.sample(enlaces_detalle, total_detalle)
 
-    for enlace in enlaces_detalle:
-        print(f"\n➡️  Abriendo detalle: {enlace}")
-        log("INFO", f"Abriendo detalle: {enlace}")
+def _paginas_catalogo(session, cache):
+    """(url, html, None) de las páginas PAGINA_INICIO..N_PAGINA; las que fallan se omiten."""
+    for pagina in range(PAGINA_INICIO, N_PAGINA):
+        url = f"{BASE}catalogue/page-{pagina}.html"
+        html = _descargar_html(session, cache, url)
+        if html is not None:
+            yield url, html, None
 
-        try:
-            respuesta = session.get(enlace, timeout=10)
-            if respuesta.status_code != 200:
-                print(f"❌ No se pudo cargar detalle ({respuesta.status_code})")
-                log("ERROR", f"No se pudo cargar detalle: {respuesta.status_code}")
-                continue
 
-            soup = BeautifulSoup(respuesta.text, "html.parser")
+def scraper_bs4():
+    """
+    Scraper utilizando Requests + BeautifulSoup.
 
-            # Descripción del producto
-            descripcion_tag = soup.select_one("#product_description")
-            descripcion = descripcion_tag.find_next("p").text if descripcion_tag else ""
-            if not descripcion_tag:
-                log("WARNING", f"No se encontró la descripción en {enlace}")
+    Fase 1:
+        Recorre las páginas listadas en N_PAGINA,
+        extrae los datos básicos de cada libro y los guarda en la base de datos.
+        Con DESCUBRIR=1 sigue en cambio los enlaces "next" (o las categorías
+        de la barra lateral) hasta el final del sitio, descargando cada
+        página mientras se parsea la anterior.
 
-            # UPC del libro (primer valor en tabla)
-            table_cells = soup.select("table tr td")
-            upc = table_cells[0].text if table_cells else ""
-            if not table_cells:
-                log("WARNING", f"No se encontró UPC en {enlace}")
+    Fase 2:
+        Elige LIBROS_NAVEGA_DETALLE libros con el planificador de detalle
+        (primero los que no tienen UPC o descripción, luego los de detalle
+        más antiguo), visita sus páginas individuales y extrae información
+        adicional como descripción, UPC y categoría.
+    """
 
-            # Categoría dentro del breadcrumb
-            breadcrumb = soup.select("ul.breadcrumb li a")
-            categoria = breadcrumb[-1].text if breadcrumb and len(breadcrumb) >= 3 else ""
-            if not breadcrumb or len(breadcrumb) < 3:
-                log("WARNING", f"No se encontró categoría en {enlace}")
+    # Crea una sesión para reutilizar conexiones HTTP (keep-alive)
+    session = crear_sesion()
+    enlaces_detalle = []
 
-            # Título detallado
-            titulo_h1 = soup.h1.text if soup.h1 else ""
-            if not titulo_h1:
-                log("WARNING", f"No se encontró título en detalle {enlace}")
+    # Caché en disco para no volver a descargar páginas sin cambios
+    cache = CacheHTTP() if CACHE_HTTP else None
 
-            print(f"   ✏️ Actualizando libro: {titulo_h1}")
-            log("INFO", f"Actualizando libro: {titulo_h1}")
-            log("DEBUG", f"UPC={upc}, Categoría={categoria}")
+    print("➡️ Iniciando scraping con BeautifulSoup...")
+    log("INFO", "Iniciando scraping con BeautifulSoup")
 
-            # Actualiza el registro del libro
-            actualizar_libro(titulo_h1, descripcion, upc, categoria)
+    # Un único escritor por ejecución: una conexión y volcados por lotes.
+    # Las portadas (DESCARGAR_IMAGENES=1) se descargan en paralelo al listado.
+    with EscritorLibros() as escritor, DescargadorImagenes(escritor) as imagenes:
+
+        # ---------------------------------------------------------
+        # 📌 1. SCRAPING DE LISTADO DE LIBROS
+        # ---------------------------------------------------------
+        if DESCUBRIR:
+            paginas = recorrer(lambda url: _descargar_html(session, cache, url))
+        else:
+            paginas = _paginas_catalogo(session, cache)
+
+        for url, html, categoria in paginas:
+            pagina = numero_pagina(url)
+            print(f"\n📄 Procesando {f'{categoria}, ' if categoria else ''}página {pagina}: {url}")
+            log("INFO", f"Procesando página: {url}")
+
+            try:
+                guardar_listado(escritor, imagenes, url, html, pagina, enlaces_detalle, categoria)
+
+            except Exception as e:
+                print(f"❌ Error en página {pagina}: {e}")
+                log("ERROR", f"Error procesando página {url}: {e}")
+
+        # ---------------------------------------------------------
+        # 📌 2. SCRAPING DE DETALLE DE LIBROS
+        # ---------------------------------------------------------
+
+        # Escoge los enlaces más valiosos: detalles que faltan o más antiguos
+        enlaces_detalle = escritor.planificar_detalle(enlaces_detalle, LIBROS_NAVEGA_DETALLE)
+        total_detalle = len(enlaces_detalle)
+
+        print(f"\n🔍 Procesando detalle de {total_detalle} libro{'s' if total_detalle != 1 else ''}...")
+        log("INFO", f"Iniciando scraping de detalle de {total_detalle} libros")
+
+        for enlace in enlaces_detalle:
+            print(f"\n➡️  Abriendo detalle: {enlace}")
+            log("INFO", f"Abriendo detalle: {enlace}")
+
+            try:
+                respuesta = obtener(session, enlace, cache)
+                if respuesta.status_code != 200:
+                    print(f"❌ No se pudo cargar detalle ({respuesta.status_code})")
+                    log("ERROR", f"No se pudo cargar detalle: {respuesta.status_code}")
+                    continue
 
-            print("   ✔ Datos de detalle actualizados")
-            log("INFO", f"Detalle actualizado para {titulo_h1}")
+                guardar_detalle(escritor, enlace, respuesta.text)
 
-            esperar()
+            except Exception as e:
+                print(f"❌ Error en detalle {enlace}: {e}")
+                log("ERROR", f"Error procesando detalle {enlace}: {e}")
 
-        except Exception as e:
-            print(f"❌ Error en detalle {enlace}: {e}")
-            log("ERROR", f"Error procesando detalle {enlace}: {e}")
+    if cache is not None:
+        print(f"\n🗄️  Caché HTTP: {cache.resumen()}")
+        cache.cerrar()
 
     print("\n🏁 Scraping BeautifulSoup finalizado.")
     log("INFO", "Scraping BeautifulSoup finalizado")
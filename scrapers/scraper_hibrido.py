@@ -0,0 +1,382 @@
+import os
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+from db.base_datos import EscritorLibros
+from db.rutas import cargar_rutas, guardar_rutas
+from scrapers.parsers import contiene_esperado, pide_javascript
+from scrapers.scraper_bs4 import guardar_listado, guardar_detalle
+from utils.cliente_http import crear_sesion, obtener
+from utils.cache_http import CacheHTTP, CACHE_HTTP
+from utils.imagenes import DescargadorImagenes
+from utils.metricas import metricas
+from utils.logger import log
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL MOTOR HÍBRIDO A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# URL principal del sitio a scrapear
+BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
+
+# Última página de catálogo a recorrer
+N_PAGINA = int(os.getenv("N_PAGINA", 4)) + 1
+
+# Primera página de catálogo a recorrer
+PAGINA_INICIO = int(os.getenv("PAGINA_INICIO", 1))
+
+# Número de libros cuyos detalles serán consultados
+LIBROS_NAVEGA_DETALLE = int(os.getenv("LIBROS_NAVEGA_DETALLE", 5))
+
+# Navegadores del pool de escalado (se arrancan solo si alguna página lo necesita)
+HIBRIDO_NAVEGADORES = int(os.getenv("HIBRIDO_NAVEGADORES", 1))
+
+# Escaladas seguidas de un mismo patrón de URL tras las que sus páginas
+# van directamente al navegador, sin intentar antes HTTP
+HIBRIDO_UMBRAL = int(os.getenv("HIBRIDO_UMBRAL", 2))
+
+# Cada cuántas páginas de un patrón enrutado al navegador se vuelve a
+# probar HTTP, por si el sitio dejó de necesitarlo (0 = nunca)
+HIBRIDO_SONDEO = int(os.getenv("HIBRIDO_SONDEO", 20))
+
+# Respuestas que un navegador real suele superar (bloqueos de clientes sin JavaScript)
+CODIGOS_ESCALABLES = {403}
+
+# Segmentos de ruta que cambian de una página a otra del mismo tipo
+_SEGMENTO_VARIABLE = re.compile(r"[\d_-]")
+_NUMEROS = re.compile(r"\d+")
+
+
+def patron_url(url):
+    """
+    Patrón con el que se recuerda la ruta de una URL:
+
+        .../catalogue/page-3.html                  → host/catalogue/page-N.html
+        .../catalogue/un-libro_1000/index.html     → host/catalogue/*/index.html
+    """
+    partes = urlsplit(url)
+    *directorios, archivo = partes.path.split("/")
+    directorios = ["*" if _SEGMENTO_VARIABLE.search(segmento) else segmento for segmento in directorios]
+    return partes.netloc + "/".join(directorios + [_NUMEROS.sub("N", archivo)])
+
+
+# ---------------------------------------------------------
+# ENRUTADOR: QUÉ MOTOR NECESITA CADA PATRÓN DE URL
+# ---------------------------------------------------------
+class Enrutador:
+    """
+    Recuerda, por patrón de URL, si sus páginas se sirven bien por HTTP o
+    necesitan navegador.
+
+    Todo patrón empieza por HTTP. Cuando HIBRIDO_UMBRAL páginas seguidas
+    tienen que escalarse, el patrón pasa al navegador y las siguientes ya
+    no pagan la descarga HTTP; cada HIBRIDO_SONDEO páginas se vuelve a
+    probar HTTP y, si sirve, el patrón regresa. Las rutas se cargan de la
+    tabla rutas_motor al empezar y se guardan al terminar.
+    """
+
+    def __init__(self, umbral=HIBRIDO_UMBRAL, sondeo=HIBRIDO_SONDEO):
+        self.umbral = umbral
+        self.sondeo = sondeo
+        self.rutas = cargar_rutas()
+
+    def _ruta(self, url):
+        patron = patron_url(url)
+        ruta = self.rutas.get(patron)
+        if ruta is None:
+            ruta = self.rutas[patron] = {
+                "patron": patron, "motor": "http", "fallos_seguidos": 0, "paginas": 0, "escaladas": 0,
+            }
+        return ruta
+
+    def elegir(self, url):
+        """"http" o "navegador" para la próxima página de `url`."""
+        ruta = self._ruta(url)
+        ruta["paginas"] += 1
+
+        if ruta["motor"] == "navegador" and not (self.sondeo and ruta["paginas"] % self.sondeo == 0):
+            return "navegador"
+        return "http"
+
+    def http_valido(self, url):
+        """La página se sirvió bien por HTTP."""
+        ruta = self._ruta(url)
+        ruta["fallos_seguidos"] = 0
+
+        if ruta["motor"] == "navegador":
+            ruta["motor"] = "http"
+            print(f"   🔀 {ruta['patron']} vuelve a HTTP")
+            log("INFO", f"Motor híbrido: {ruta['patron']} vuelve a HTTP")
+
+    def escalada(self, url, motivo):
+        """HTTP no sirvió la página y el navegador sí."""
+        ruta = self._ruta(url)
+        ruta["escaladas"] += 1
+        ruta["fallos_seguidos"] += 1
+
+        if ruta["motor"] == "http" and ruta["fallos_seguidos"] >= self.umbral:
+            ruta["motor"] = "navegador"
+            print(f"   🔀 {ruta['patron']} pasa al navegador ({motivo})")
+            log("INFO", f"Motor híbrido: {ruta['patron']} pasa al navegador tras "
+                        f"{ruta['fallos_seguidos']} escaladas ({motivo})")
+
+    def guardar(self):
+        guardar_rutas(list(self.rutas.values()))
+
+    def al_navegador(self):
+        return sorted(patron for patron, ruta in self.rutas.items() if ruta["motor"] == "navegador")
+
+
+# ---------------------------------------------------------
+# MOTOR HÍBRIDO
+# ---------------------------------------------------------
+class MotorHibrido:
+    """
+    Pide cada página por HTTP y solo la escala a un navegador si la
+    respuesta no trae lo que se va a extraer (contiene_esperado), avisa de
+    que necesita JavaScript o es un bloqueo CODIGOS_ESCALABLES.
+
+    El pool de navegadores se arranca con la primera escalada; si Selenium
+    o Chrome no están disponibles, esas páginas se omiten y el resto del
+    rastreo sigue por HTTP.
+    """
+
+    def __init__(self, escritor, imagenes, session, cache):
+        self.escritor = escritor
+        self.imagenes = imagenes
+        self.session = session
+        self.cache = cache
+        self.enrutador = Enrutador()
+        self.conteo = Counter()
+        self._pool = None
+        self._sin_navegador = False
+
+    # -----------------------------------------------------
+    # HTTP Y NAVEGADOR
+    # -----------------------------------------------------
+    def _http(self, url, tipo):
+        """
+        (html, None) si la página sirve tal cual; (None, motivo) si hay que
+        escalarla; (None, None) si falló sin remedio (404, error de red...).
+        """
+        try:
+            respuesta = obtener(self.session, url, self.cache)
+        except Exception as e:
+            print(f"❌ Error descargando {url}: {e}")
+            log("ERROR", f"Error descargando {url}: {e}")
+            return None, None
+
+        if respuesta.status_code in CODIGOS_ESCALABLES:
+            return None, f"http_{respuesta.status_code}"
+
+        if respuesta.status_code != 200:
+            print(f"❌ Error HTTP {respuesta.status_code} en {url}")
+            log("ERROR", f"HTTP {respuesta.status_code} en {url}")
+            return None, None
+
+        html = respuesta.text
+        if contiene_esperado(html, tipo):
+            return html, None
+        return None, "javascript" if pide_javascript(html) else "selectores"
+
+    def _navegador(self):
+        """Pool de navegadores, arrancado la primera vez que hace falta (None si no se puede)."""
+        if self._pool is None and not self._sin_navegador:
+            print(f"   🌐 Arrancando {HIBRIDO_NAVEGADORES} navegador(es) para las páginas escaladas...")
+            try:
+                from scrapers.scraper_selenium import PoolNavegadores
+                self._pool = PoolNavegadores(HIBRIDO_NAVEGADORES)
+            except Exception as e:
+                self._sin_navegador = True
+                print(f"❌ No se pudo arrancar el navegador: {e}")
+                print("   Las páginas que lo necesitan se omitirán; el resto sigue por HTTP")
+                log("ERROR", f"Motor híbrido sin navegador: {e}")
+        return self._pool
+
+    def _http_valido(self, url):
+        self.conteo["http"] += 1
+        metricas.contar("hibrido", motor="http", motivo="ok")
+        self.enrutador.http_valido(url)
+
+    def _escalar(self, url, motivo):
+        """
+        Cuenta la página como escalada y devuelve el pool de navegadores
+        (None si no hay navegador). `motivo` es "ruta" si el patrón ya
+        estaba enrutado al navegador.
+        """
+        self.conteo["navegador"] += 1
+        self.conteo[f"motivo:{motivo}"] += 1
+        metricas.contar("hibrido", motor="navegador", motivo=motivo)
+
+        if motivo != "ruta":
+            print(f"   ⤴️  Escalando al navegador ({motivo})")
+            log("INFO", f"Escalando {url} al navegador: {motivo}")
+
+        pool = self._navegador()
+        if pool is None:
+            self.conteo["omitidas"] += 1
+        return pool
+
+    def _navegador_valido(self, url, motivo):
+        # Solo las escaladas que el navegador resolvió cuentan para enrutar el patrón
+        if motivo != "ruta":
+            self.enrutador.escalada(url, motivo)
+
+    # -----------------------------------------------------
+    # PÁGINAS
+    # -----------------------------------------------------
+    def listado(self, url, pagina, enlaces_detalle):
+        """Guarda los libros de una página de catálogo y anota sus enlaces de detalle."""
+        motivo = "ruta"
+        if self.enrutador.elegir(url) == "http":
+            html, motivo = self._http(url, "listado")
+            if html is not None:
+                self._http_valido(url)
+                guardar_listado(self.escritor, self.imagenes, url, html, pagina, enlaces_detalle)
+                return
+            if motivo is None:
+                return
+
+        pool = self._escalar(url, motivo)
+        if pool is None:
+            return
+
+        resultados = pool.listado(url, pagina)
+        if not resultados:
+            self.conteo["omitidas"] += 1
+            print(f"⚠️ Tampoco el navegador encontró libros en {url}")
+            log("WARNING", f"Página de listado vacía también en el navegador: {url}")
+            return
+
+        self._navegador_valido(url, motivo)
+        enlaces_pagina = []
+        for libro, enlace in resultados:
+            self.escritor.guardar(libro)
+            self.imagenes.encolar(libro)
+            enlaces_pagina.append(enlace)
+        enlaces_detalle.extend(self.escritor.enlaces_nuevos(enlaces_pagina))
+
+    def detalle(self, url):
+        """Actualiza descripción, UPC y categoría del libro cuya página de detalle es `url`."""
+        motivo = "ruta"
+        if self.enrutador.elegir(url) == "http":
+            html, motivo = self._http(url, "detalle")
+            if html is not None:
+                self._http_valido(url)
+                guardar_detalle(self.escritor, url, html)
+                return
+            if motivo is None:
+                return
+
+        pool = self._escalar(url, motivo)
+        if pool is None:
+            return
+
+        titulo_h1, descripcion, upc, categoria = pool.detalle(url)
+        if not (upc or descripcion):
+            self.conteo["omitidas"] += 1
+            print(f"⚠️ Tampoco el navegador encontró el detalle de {url}")
+            log("WARNING", f"Detalle vacío también en el navegador: {url}")
+            return
+
+        self._navegador_valido(url, motivo)
+        self.escritor.actualizar(url, descripcion, upc, categoria)
+        print(f"   ✔ Detalle actualizado (navegador): {titulo_h1}")
+        log("INFO", f"Detalle actualizado con navegador para {titulo_h1}")
+
+    # -----------------------------------------------------
+    # CIERRE Y RESUMEN
+    # -----------------------------------------------------
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.cerrar()
+        self.enrutador.guardar()
+
+    def resumen(self):
+        """Imprime cuántas páginas sirvió HTTP, cuántas se escalaron y la tasa de escalado."""
+        http, navegador = self.conteo["http"], self.conteo["navegador"]
+        total = http + navegador
+        tasa = navegador / total if total else 0.0
+        metricas.fijar("hibrido_tasa_escalado", tasa)
+
+        print(f"\n🔀 Motor híbrido: {total} páginas, {http} por HTTP y {navegador} al navegador "
+              f"({tasa:.1%} escaladas)")
+        motivos = {clave.split(":", 1)[1]: n for clave, n in self.conteo.items() if clave.startswith("motivo:")}
+        if motivos:
+            print("   Motivos: " + ", ".join(f"{motivo} {n}" for motivo, n in sorted(motivos.items())))
+        if self.conteo["omitidas"]:
+            print(f"   ⚠️ {self.conteo['omitidas']} páginas escaladas no se pudieron obtener")
+        for patron in self.enrutador.al_navegador():
+            print(f"   🧭 {patron} → navegador")
+
+        log("INFO", f"Motor híbrido: {http} HTTP, {navegador} navegador ({tasa:.1%}), "
+                    f"motivos={motivos}, omitidas={self.conteo['omitidas']}")
+
+
+def scraper_hibrido():
+    """
+    Scraper híbrido: Requests + BeautifulSoup por defecto, Selenium solo
+    para las páginas que lo necesitan.
+
+    Fase 1:
+        Recorre las páginas PAGINA_INICIO..N_PAGINA del catálogo.
+
+    Fase 2:
+        Visita LIBROS_NAVEGA_DETALLE páginas de detalle elegidas por el
+        planificador de detalle.
+
+    Cada página se pide por HTTP y se comprueba que trae los artículos del
+    listado o la descripción / tabla del detalle; si no, se repite en un
+    navegador. Lo aprendido se recuerda por patrón de URL (rutas_motor) y
+    el resumen final da la tasa de escalado.
+    """
+    session = crear_sesion()
+    cache = CacheHTTP() if CACHE_HTTP else None
+    enlaces_detalle = []
+
+    print("➡️ Iniciando scraping híbrido (HTTP, navegador solo si hace falta)...")
+    log("INFO", "Iniciando scraping híbrido")
+
+    with EscritorLibros() as escritor, DescargadorImagenes(escritor) as imagenes:
+        motor = MotorHibrido(escritor, imagenes, session, cache)
+        try:
+            # ---------------------------------------------------------
+            # 📌 1. SCRAPING DE LISTADO DE LIBROS
+            # ---------------------------------------------------------
+            for pagina in range(PAGINA_INICIO, N_PAGINA):
+                url = f"{BASE}catalogue/page-{pagina}.html"
+                print(f"\n📄 Procesando página {pagina}: {url}")
+                log("INFO", f"Procesando página: {url}")
+
+                try:
+                    motor.listado(url, pagina, enlaces_detalle)
+                except Exception as e:
+                    print(f"❌ Error en página {pagina}: {e}")
+                    log("ERROR", f"Error procesando página {url}: {e}")
+
+            # ---------------------------------------------------------
+            # 📌 2. SCRAPING DE DETALLE DE LIBROS
+            # ---------------------------------------------------------
+            enlaces_detalle = escritor.planificar_detalle(enlaces_detalle, LIBROS_NAVEGA_DETALLE)
+            print(f"\n🔍 Procesando detalle de {len(enlaces_detalle)} libros...")
+            log("INFO", f"Iniciando scraping de detalle de {len(enlaces_detalle)} libros")
+
+            for enlace in enlaces_detalle:
+                print(f"\n➡️  Abriendo detalle: {enlace}")
+                log("INFO", f"Abriendo detalle: {enlace}")
+
+                try:
+                    motor.detalle(enlace)
+                except Exception as e:
+                    print(f"❌ Error en detalle {enlace}: {e}")
+                    log("ERROR", f"Error procesando detalle {enlace}: {e}")
+        finally:
+            motor.cerrar()
+
+    if cache is not None:
+        print(f"\n🗄️  Caché HTTP: {cache.resumen()}")
+        cache.cerrar()
+
+    motor.resumen()
+    print("\n🏁 Scraping híbrido finalizado.")
+    log("INFO", "Scraping híbrido finalizado")
@@ -0,0 +1,394 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from db.base_datos import EscritorLibros
+from scrapers.parsers import extraer_listado, extraer_detalle
+from utils.cliente_http import crear_sesion, obtener
+from utils.cache_http import CacheHTTP, CACHE_HTTP
+from utils.logger import log
+from utils.metricas import metricas
+from utils.imagenes import DescargadorImagenes
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL PIPELINE A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# URL principal del sitio a scrapear
+BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
+
+# Última página de catálogo a recorrer
+N_PAGINA = int(os.getenv("N_PAGINA", 4)) + 1
+
+# Primera página de catálogo a recorrer (permite reanudar o repartir rangos)
+PAGINA_INICIO = int(os.getenv("PAGINA_INICIO", 1))
+
+# Número de libros cuyos detalles serán consultados
+LIBROS_NAVEGA_DETALLE = int(os.getenv("LIBROS_NAVEGA_DETALLE", 5))
+
+# Hilos de descarga (etapa 1)
+CONCURRENCIA = int(os.getenv("CONCURRENCIA", 5))
+
+# Procesos de parseo (etapa 2); por defecto uno por núcleo
+PIPELINE_PROCESOS = int(os.getenv("PIPELINE_PROCESOS", os.cpu_count() or 2))
+
+# Capacidad de cada cola entre etapas (límite de memoria y contrapresión)
+PIPELINE_COLA = int(os.getenv("PIPELINE_COLA", 50))
+
+# Modo incremental: omite las páginas cuyo contenido no cambió desde la última vez
+INCREMENTAL = os.getenv("INCREMENTAL", "0") == "1"
+
+# Marca de fin de flujo entre etapas
+_FIN = None
+
+
+class EstadisticasEtapa:
+    """Contadores de una etapa: elementos procesados y tiempo ocupado."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.elementos = 0
+        self.errores = 0
+        self.ocupado = 0.0
+        self._lock = threading.Lock()
+
+    def sumar(self, segundos, error=False):
+        with self._lock:
+            self.elementos += 1
+            self.ocupado += segundos
+            if error:
+                self.errores += 1
+
+
+class MonitorColas:
+    """Muestrea periódicamente la profundidad de las colas entre etapas."""
+
+    def __init__(self, colas, intervalo=0.2):
+        self.colas = colas
+        self.intervalo = intervalo
+        self.maximos = {nombre: 0 for nombre in colas}
+        self.sumas = {nombre: 0 for nombre in colas}
+        self.muestras = 0
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="monitor-colas", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+        self._hilo.join()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            self.muestras += 1
+            for nombre, cola in self.colas.items():
+                tamano = cola.qsize()
+                self.sumas[nombre] += tamano
+                self.maximos[nombre] = max(self.maximos[nombre], tamano)
+
+
+def _parsear(tipo, html, referencia):
+    """
+    Trabajo de la etapa de parseo (se ejecuta en otro proceso).
+
+    Devuelve (resultado, segundos de CPU empleados), donde resultado es:
+    tipo "catalogo": [(libro, enlace), ...]
+    tipo "detalle":  (titulo_h1, descripcion, upc, categoria)
+    """
+    inicio = time.process_time()
+    if tipo == "catalogo":
+        resultado = extraer_listado(html, referencia)
+    else:
+        resultado = extraer_detalle(html, referencia)
+    return resultado, time.process_time() - inicio
+
+
+class Pipeline:
+    """
+    Pipeline de tres etapas unidas por colas acotadas:
+
+        descarga (hilos) → parseo (ProcessPoolExecutor) → escritura (un hilo)
+
+    Cada cola tiene capacidad PIPELINE_COLA: si una etapa se atasca, las
+    anteriores se bloquean al llenar su cola y la memoria se mantiene plana.
+    """
+
+    def __init__(self, escritor, cache, ejecutor, imagenes):
+        self.escritor = escritor
+        self.imagenes = imagenes
+        self.cache = cache
+        self.ejecutor = ejecutor
+
+        # Una sesión para todos los hilos de descarga; su pool (HTTP_POOL,
+        # al menos CONCURRENCIA) guarda una conexión keep-alive por hilo
+        self.session = crear_sesion()
+
+        self.estadisticas = {
+            "descarga": EstadisticasEtapa("descarga"),
+            "parseo": EstadisticasEtapa("parseo"),
+            "escritura": EstadisticasEtapa("escritura"),
+        }
+        self.monitores = []
+
+    def ejecutar(self, tareas):
+        """
+        Procesa una lista de tareas (tipo, url, referencia) de principio a fin.
+
+        Devuelve los enlaces de detalle encontrados en las páginas de catálogo.
+        """
+        cola_urls = queue.Queue()
+        cola_html = queue.Queue(maxsize=PIPELINE_COLA)
+        cola_futuros = queue.Queue(maxsize=PIPELINE_PROCESOS * 2)
+        cola_registros = queue.Queue(maxsize=PIPELINE_COLA)
+
+        for tarea in tareas:
+            cola_urls.put(tarea)
+        for _ in range(CONCURRENCIA):
+            cola_urls.put(_FIN)
+
+        monitor = MonitorColas({"html": cola_html, "parseo": cola_futuros, "registros": cola_registros})
+        monitor.iniciar()
+
+        descargadores = [
+            threading.Thread(target=self._descargar, args=(cola_urls, cola_html), name=f"descarga-{i}", daemon=True)
+            for i in range(CONCURRENCIA)
+        ]
+        for hilo in descargadores:
+            hilo.start()
+
+        def cerrar_descarga():
+            for hilo in descargadores:
+                hilo.join()
+            cola_html.put(_FIN)
+
+        auxiliares = [
+            threading.Thread(target=cerrar_descarga, name="cierre-descarga", daemon=True),
+            threading.Thread(target=self._despachar, args=(cola_html, cola_futuros), name="despacho", daemon=True),
+            threading.Thread(target=self._recoger, args=(cola_futuros, cola_registros), name="recogida", daemon=True),
+        ]
+        for hilo in auxiliares:
+            hilo.start()
+
+        # La escritura corre en este hilo: un único escritor
+        enlaces = self._escribir(cola_registros)
+
+        for hilo in auxiliares:
+            hilo.join()
+        monitor.detener()
+        self.monitores.append(monitor)
+
+        return enlaces
+
+    # ------------------------------------------------
+    # ETAPA 1: DESCARGA
+    # ------------------------------------------------
+    def _descargar(self, cola_urls, cola_html):
+        session = self.session
+        estadisticas = self.estadisticas["descarga"]
+
+        while True:
+            tarea = cola_urls.get()
+            if tarea is _FIN:
+                return
+
+            tipo, url, referencia = tarea
+            inicio = time.monotonic()
+            try:
+                respuesta = obtener(session, url, self.cache)
+                if respuesta.status_code != 200:
+                    print(f"❌ Error HTTP {respuesta.status_code} en {url}")
+                    log("ERROR", f"HTTP {respuesta.status_code} en {url}")
+                    estadisticas.sumar(time.monotonic() - inicio, error=True)
+                    continue
+
+                html = respuesta.text
+                estadisticas.sumar(time.monotonic() - inicio)
+
+            except Exception as e:
+                print(f"❌ Error descargando {url}: {e}")
+                log("ERROR", f"Error descargando {url}: {e}")
+                estadisticas.sumar(time.monotonic() - inicio, error=True)
+                continue
+
+            # Bloquea si la etapa de parseo va por detrás
+            cola_html.put((tipo, url, referencia, html))
+
+    # ------------------------------------------------
+    # ETAPA 2: PARSEO (ENVÍO Y RECOGIDA)
+    # ------------------------------------------------
+    def _despachar(self, cola_html, cola_futuros):
+        while True:
+            elemento = cola_html.get()
+            if elemento is _FIN:
+                cola_futuros.put(_FIN)
+                return
+
+            tipo, url, referencia, html = elemento
+            sin_cambios, huella = self.escritor.comparar_huella(url, html)
+
+            # En modo incremental una página idéntica no se envía a parsear
+            if INCREMENTAL and sin_cambios:
+                log("INFO", f"Página sin cambios, se omite: {url}")
+                cola_futuros.put((tipo, url, huella, None))
+                continue
+
+            futuro = self.ejecutor.submit(_parsear, tipo, html, referencia)
+            cola_futuros.put((tipo, url, huella, futuro))
+
+    def _recoger(self, cola_futuros, cola_registros):
+        estadisticas = self.estadisticas["parseo"]
+
+        while True:
+            elemento = cola_futuros.get()
+            if elemento is _FIN:
+                cola_registros.put(_FIN)
+                return
+
+            tipo, url, huella, futuro = elemento
+            if futuro is None:
+                cola_registros.put((tipo, url, huella, None))
+                continue
+
+            try:
+                resultado, segundos = futuro.result()
+                estadisticas.sumar(segundos)
+
+                # Las métricas de los procesos hijos no llegan a este proceso:
+                # el tiempo de parseo se registra aquí con lo que devuelve el hijo
+                metricas.observar("parseo", segundos, tipo="listado" if tipo == "catalogo" else "detalle")
+            except Exception as e:
+                print(f"❌ Error parseando {url}: {e}")
+                log("ERROR", f"Error parseando {url}: {e}")
+                estadisticas.sumar(0.0, error=True)
+                continue
+
+            cola_registros.put((tipo, url, huella, resultado))
+
+    # ------------------------------------------------
+    # ETAPA 3: ESCRITURA
+    # ------------------------------------------------
+    def _escribir(self, cola_registros):
+        estadisticas = self.estadisticas["escritura"]
+        enlaces_detalle = []
+
+        while True:
+            elemento = cola_registros.get()
+            if elemento is _FIN:
+                return enlaces_detalle
+
+            tipo, url, huella, resultado = elemento
+            inicio = time.monotonic()
+
+            try:
+                if resultado is None:
+                    # Página sin cambios (modo incremental)
+                    if tipo == "catalogo":
+                        enlaces_detalle.extend(self.escritor.enlaces_nuevos(self.escritor.enlaces_huella(url)))
+                    else:
+                        self.escritor.marcar_detalle(url)
+
+                elif tipo == "catalogo":
+                    enlaces_pagina = []
+                    for libro, enlace in resultado:
+                        self.escritor.guardar(libro)
+                        self.imagenes.encolar(libro)
+                        enlaces_pagina.append(enlace)
+
+                    enlaces_detalle.extend(self.escritor.enlaces_nuevos(enlaces_pagina))
+                    self.escritor.registrar_huella(url, huella, enlaces_pagina)
+
+                else:
+                    titulo_h1, descripcion, upc, categoria = resultado
+                    log("INFO", f"Actualizando libro: {titulo_h1}")
+                    log("DEBUG", f"UPC={upc}, Categoría={categoria}")
+                    self.escritor.actualizar(url, descripcion, upc, categoria)
+                    self.escritor.registrar_huella(url, huella)
+
+                estadisticas.sumar(time.monotonic() - inicio)
+
+            except Exception as e:
+                print(f"❌ Error guardando {url}: {e}")
+                log("ERROR", f"Error guardando {url}: {e}")
+                estadisticas.sumar(time.monotonic() - inicio, error=True)
+
+    # ------------------------------------------------
+    # RESUMEN
+    # ------------------------------------------------
+    def resumen(self, duracion):
+        """Tabla con el rendimiento de cada etapa y la ocupación de las colas."""
+        # Elem/s: ritmo real sobre la duración total.
+        # Capacidad: elementos por segundo de trabajo efectivo de la etapa.
+        lineas = [
+            f"{'Etapa':<10} {'Elementos':>9} {'Errores':>7} {'Ocupado (s)':>11} {'Elem/s':>8} {'Capacidad':>9}",
+        ]
+        for est in self.estadisticas.values():
+            tasa = est.elementos / duracion if duracion else 0
+            capacidad = est.elementos / est.ocupado if est.ocupado else 0
+            lineas.append(
+                f"{est.nombre:<10} {est.elementos:>9} {est.errores:>7} {est.ocupado:>11.2f} {tasa:>8.1f} {capacidad:>9.1f}"
+            )
+
+        lineas.append("")
+        lineas.append(f"{'Cola':<10} {'Media':>9} {'Máximo':>7} {'Capacidad':>11}")
+        capacidades = {"html": PIPELINE_COLA, "parseo": PIPELINE_PROCESOS * 2, "registros": PIPELINE_COLA}
+        muestras = max(sum(m.muestras for m in self.monitores), 1)
+        for nombre, capacidad in capacidades.items():
+            media = sum(m.sumas[nombre] for m in self.monitores) / muestras
+            maximo = max((m.maximos[nombre] for m in self.monitores), default=0)
+            lineas.append(f"{nombre:<10} {media:>9.1f} {maximo:>7} {capacidad:>11}")
+
+        return "\n".join(lineas)
+
+
+def scraper_pipeline():
+    """
+    Scraper por etapas: descarga, parseo y escritura en paralelo.
+
+    Los hilos de descarga (CONCURRENCIA) producen HTML crudo, un pool de
+    PIPELINE_PROCESOS procesos lo convierte en libros (escalando más allá
+    del GIL) y un único escritor los guarda por lotes. Las colas acotadas
+    entre etapas dan contrapresión y mantienen la memoria estable.
+
+    Al final se muestra el rendimiento de cada etapa y la profundidad media
+    de cada cola, para ver cuál es el cuello de botella.
+    """
+    print(f"➡️ Iniciando pipeline ({CONCURRENCIA} descargas, {PIPELINE_PROCESOS} procesos de parseo)...")
+    log("INFO", f"Iniciando pipeline con {CONCURRENCIA} descargas y {PIPELINE_PROCESOS} procesos de parseo")
+
+    cache = CacheHTTP() if CACHE_HTTP else None
+    inicio = time.monotonic()
+
+    with EscritorLibros() as escritor, DescargadorImagenes(escritor) as imagenes, \
+            ProcessPoolExecutor(max_workers=PIPELINE_PROCESOS) as ejecutor:
+        pipeline = Pipeline(escritor, cache, ejecutor, imagenes)
+
+        # ---------------------------------------------------------
+        # 📌 1. SCRAPING DE LISTADO DE LIBROS
+        # ---------------------------------------------------------
+        tareas = [("catalogo", f"{BASE}catalogue/page-{pagina}.html", pagina) for pagina in range(PAGINA_INICIO, N_PAGINA)]
+        enlaces_detalle = pipeline.ejecutar(tareas)
+
+        # ---------------------------------------------------------
+        # 📌 2. SCRAPING DE DETALLE DE LIBROS
+        # ---------------------------------------------------------
+        seleccion = escritor.planificar_detalle(enlaces_detalle, LIBROS_NAVEGA_DETALLE)
+        total_detalle = len(seleccion)
+
+        print(f"\n🔍 Procesando detalle de {total_detalle} libro{'s' if total_detalle != 1 else ''}...")
+        log("INFO", f"Iniciando scraping de detalle de {total_detalle} libros")
+        pipeline.ejecutar([("detalle", enlace, enlace) for enlace in seleccion])
+
+    duracion = time.monotonic() - inicio
+
+    if cache is not None:
+        print(f"\n🗄️  Caché HTTP: {cache.resumen()}")
+        cache.cerrar()
+
+    resumen = pipeline.resumen(duracion)
+    print(f"\n📊 Rendimiento del pipeline ({duracion:.2f} s):\n{resumen}")
+    log("INFO", f"Rendimiento del pipeline ({duracion:.2f} s):\n{resumen}")
+
+    print("\n🏁 Scraping por pipeline finalizado.")
+    log("INFO", "Scraping por pipeline finalizado")
@@ -1,15 +1,20 @@
 import os
-import random
+import time
+import queue
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 
 # Funciones propias del proyecto
 from models.libro_modelo import crear_libro
-from db.base_datos import guardar_libro, actualizar_libro
+from db.base_datos import EscritorLibros
 from utils.logger import log
 from utils.helpers import obtener_rating
 from utils.tiempos import esperar
+from utils.limitador import limitador
+from utils.metricas import metricas
+from utils.imagenes import DescargadorImagenes
 
 # -------------------------------------------------------------
 # CONFIGURACIÓN DEL SCRAPER DESDE VARIABLES DE ENTORNO
@@ -18,159 +23,269 @@ from utils.tiempos import esperar
 # URL base del sitio a scrapear
 BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
 
-# Número total de páginas a procesar (se suma 1 porque range() es exclusivo del final)
+# Última página a procesar (se suma 1 porque range() es exclusivo del final)
 N_PAGINA = int(os.getenv("N_PAGINA", 4)) + 1
 
-# Cantidad de libros cuyos detalles se abrirán de forma aleatoria
+# Primera página de catálogo a recorrer (permite reanudar o repartir rangos)
+PAGINA_INICIO = int(os.getenv("PAGINA_INICIO", 1))
+
+# Cantidad de libros cuyos detalles se abrirán (los elige el planificador de detalle)
 LIBROS_NAVEGA_DETALLE = int(os.getenv("LIBROS_NAVEGA_DETALLE", 5))
 
+# Navegadores headless que trabajan en paralelo
+SELENIUM_NAVEGADORES = int(os.getenv("SELENIUM_NAVEGADORES", 2))
 
-def scraper_selenium():
-    """
-    Scraper principal usando Selenium.
+# Recursos que nunca se renderizan y se bloquean en el navegador
+RECURSOS_BLOQUEADOS = ["*.css", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.woff", "*.woff2"]
 
-    Fase 1: Recorre las páginas del catálogo, extrae datos básicos y los guarda.
-    Fase 2: Selecciona libros aleatoriamente y abre sus páginas de detalle,
-            extrayendo información adicional (descripcion, UPC, categoria).
+# -------------------------------------------------------------
+# EXTRACCIÓN EN UNA SOLA LLAMADA (JAVASCRIPT)
+# -------------------------------------------------------------
+# En lugar de varias llamadas find_element / get_attribute por libro,
+# cada página se extrae con un único execute_script que devuelve JSON.
+
+SCRIPT_LISTADO = """
+return Array.from(document.querySelectorAll('article.product_pod')).map(function (articulo) {
+    var enlace = articulo.querySelector('h3 a');
+    var precio = articulo.querySelector('.price_color');
+    var disponibilidad = articulo.querySelector('.availability');
+    var rating = articulo.querySelector('p.star-rating');
+    var imagen = articulo.querySelector('img');
+    return {
+        titulo: enlace ? enlace.getAttribute('title') : '',
+        enlace: enlace ? enlace.href : '',
+        precio: precio ? precio.innerText : null,
+        disponibilidad: disponibilidad ? disponibilidad.innerText : null,
+        rating: rating ? rating.className : '',
+        imagen: imagen ? imagen.src : ''
+    };
+});
+"""
+
+SCRIPT_DETALLE = """
+var descripcion = document.querySelector('#product_description ~ p');
+var fila = document.querySelector('table.table tr');
+var celda = fila ? fila.querySelector('td') : null;
+var categoria = document.querySelector('ul.breadcrumb li:nth-child(3) a');
+var h1 = document.querySelector('h1');
+return {
+    descripcion: descripcion ? descripcion.innerText : '',
+    upc: celda ? celda.innerText : '',
+    categoria: categoria ? categoria.innerText : '',
+    titulo: h1 ? h1.innerText : ''
+};
+"""
+
+
+def crear_driver():
     """
+    Crea un Chrome headless preparado para scraping:
 
-    # Configura Chrome en modo headless (sin ventana visible)
+    - page_load_strategy "eager": no espera a imágenes ni hojas de estilo.
+    - Imágenes desactivadas y CSS / fuentes bloqueados por CDP.
+    """
     opciones = Options()
     opciones.add_argument("--headless")
+    opciones.add_argument("--blink-settings=imagesEnabled=false")
+    opciones.page_load_strategy = "eager"
+    opciones.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
 
-    print("➡️ Iniciando Selenium (modo headless)...")
-    log("INFO", "Iniciando Selenium...")
+    with metricas.medir("webdriver", operacion="arranque"):
+        driver = webdriver.Chrome(options=opciones)
 
-    # Inicia el driver de Chrome
-    driver = webdriver.Chrome(options=opciones)
-    enlaces_detalle = []  # Guarda enlaces individuales de cada libro
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": RECURSOS_BLOQUEADOS})
+    except Exception as e:
+        log("WARNING", f"No se pudieron bloquear recursos vía CDP: {e}")
 
-    # ---------------------------------------------------------
-    # 📌 1. SCRAPING DE LA LISTA DE LIBROS
-    # ---------------------------------------------------------
-    for pagina in range(1, N_PAGINA):
-        try:
-            url = f"{BASE}catalogue/page-{pagina}.html"
-            print(f"\n📄 Cargando página {pagina}: {url}")
-            log("INFO", f"Cargando página: {url}")
+    return driver
 
-            driver.get(url)
 
-            # Obtiene los artículos que representan libros
-            articulos = driver.find_elements(By.CSS_SELECTOR, "article.product_pod")
+def cargar(driver, url):
+    """
+    Carga una URL en el navegador e informa al limitador compartido.
+
+    WebDriver no expone el código HTTP, así que solo se reporta la
+    latencia de carga (o un error si la carga falla).
+    """
+    inicio = time.monotonic()
+    try:
+        with metricas.medir("webdriver", operacion="get"):
+            driver.get(url)
+    except Exception:
+        limitador.registrar(url, error=True)
+        raise
+    limitador.registrar(url, latencia=time.monotonic() - inicio)
 
-            print(f"   → {len(articulos)} libros encontrados")
-            log("DEBUG", f"{len(articulos)} libros encontrados en página {pagina}")
 
-            # Procesa cada libro encontrado
-            for articulo in articulos:
-                try:
-                    # ---------- TÍTULO ----------
-                    titulo_tag = articulo.find_element(By.TAG_NAME, "h3").find_element(By.TAG_NAME, "a")
-                    titulo = titulo_tag.get_attribute("title") if titulo_tag else ""
-                    if not titulo:
-                        log("WARNING", "No se encontró título de un libro")
-                        continue
+class PoolNavegadores:
+    """
+    Pool de navegadores headless reutilizables.
 
-                    # ---------- PRECIO ----------
-                    precio_tag = articulo.find_elements(By.CSS_SELECTOR, ".price_color")
-                    precio = precio_tag[0].text.replace("£", "") if precio_tag else "0.00"
+    Cada página se carga en un navegador libre del pool y se extrae con un
+    único execute_script. Es seguro usarlo desde varios hilos: cada hilo
+    toma prestado un navegador y lo devuelve al terminar.
+    """
 
-                    # ---------- DISPONIBILIDAD ----------
-                    disponibilidad_tag = articulo.find_elements(By.CSS_SELECTOR, ".availability")
-                    disponibilidad = disponibilidad_tag[0].text.strip() if disponibilidad_tag else ""
+    def __init__(self, tamano=SELENIUM_NAVEGADORES):
+        self.tamano = tamano
+        self._libres = queue.Queue()
 
-                    # ---------- RATING ----------
-                    rating_tag = articulo.find_elements(By.CSS_SELECTOR, "p.star-rating")
-                    rating = obtener_rating(rating_tag[0].get_attribute("class").split()[1]) if rating_tag else 0
+        # Los navegadores tardan en arrancar: se crean en paralelo
+        with ThreadPoolExecutor(max_workers=tamano) as ejecutor:
+            for driver in ejecutor.map(lambda _: crear_driver(), range(tamano)):
+                self._libres.put(driver)
 
-                    # ---------- IMAGEN ----------
-                    imagen_tag = articulo.find_elements(By.TAG_NAME, "img")
-                    imagen_url = imagen_tag[0].get_attribute("src") if imagen_tag else ""
+        log("INFO", f"Pool de {tamano} navegadores iniciado")
 
-                    # ---------- ENLACE AL DETALLE ----------
-                    enlace = titulo_tag.get_attribute("href") if titulo_tag else ""
+    def __enter__(self):
+        return self
 
-                    log("INFO", f"Libro encontrado: {titulo}")
-                    log("DEBUG", f"Precio={precio}, Rating={rating}, URL={enlace}")
+    def __exit__(self, *exc):
+        self.cerrar()
 
-                    # Crea objeto libro y lo guarda en la BD
-                    libro = crear_libro(titulo, precio, disponibilidad, rating, imagen_url)
-                    guardar_libro(libro)
+    @contextmanager
+    def prestar(self):
+        driver = self._libres.get()
+        try:
+            yield driver
+        finally:
+            self._libres.put(driver)
+
+    def listado(self, url, pagina):
+        """Carga una página de catálogo y devuelve [(libro, enlace), ...]."""
+        with self.prestar() as driver:
+            esperar(url)
+            cargar(driver, url)
+            with metricas.medir("webdriver", operacion="script_listado"):
+                articulos = driver.execute_script(SCRIPT_LISTADO)
+
+        print(f"   → {len(articulos)} libros encontrados en página {pagina}")
+        log("DEBUG", f"{len(articulos)} libros encontrados en página {pagina}")
+
+        resultados = []
+        for articulo in articulos:
+            titulo = articulo["titulo"]
+            if not titulo:
+                log("WARNING", "No se encontró título de un libro")
+                continue
+
+            # El enlace de detalle es la clave del libro en la BD
+            if not articulo["enlace"]:
+                log("WARNING", f"No se encontró enlace de detalle para: {titulo}")
+                continue
+
+            # Rating obtenido desde clases CSS como "star-rating Three"
+            clases = articulo["rating"].split()
+            rating = obtener_rating(clases[1]) if len(clases) > 1 else 0
+
+            libro = crear_libro(
+                titulo, articulo["precio"], articulo["disponibilidad"], rating, articulo["imagen"], articulo["enlace"]
+            )
+
+            log("INFO", f"Libro encontrado: {titulo}")
+            log("DEBUG", f"Precio={libro.precio:.2f}, Rating={rating}, URL={articulo['enlace']}")
+
+            resultados.append((libro, articulo["enlace"]))
+
+        return resultados
+
+    def detalle(self, url):
+        """Carga una página de detalle y devuelve (titulo_h1, descripcion, upc, categoria)."""
+        with self.prestar() as driver:
+            esperar(url)
+            cargar(driver, url)
+            with metricas.medir("webdriver", operacion="script_detalle"):
+                datos = driver.execute_script(SCRIPT_DETALLE)
+
+        return datos["titulo"], datos["descripcion"], datos["upc"], datos["categoria"]
+
+    def cerrar(self):
+        """Cierra todos los navegadores del pool."""
+        while not self._libres.empty():
+            driver = self._libres.get()
+            try:
+                driver.quit()
+            except Exception as e:
+                log("WARNING", f"Error cerrando navegador: {e}")
 
-                    enlaces_detalle.append(enlace)
 
-                except Exception as e:
-                    print(f"❌ Error extrayendo libro en página {pagina}: {e}")
-                    log("ERROR", f"Error extrayendo libro en página {pagina}: {e}")
+def scraper_selenium():
+    """
+    Scraper principal usando Selenium.
 
-        except Exception as e:
-            print(f"❌ Error procesando página {pagina}: {e}")
-            log("ERROR", f"Error en Selenium página {pagina}: {e}")
+    Fase 1: Recorre las páginas del catálogo, extrae datos básicos y los guarda.
+    Fase 2: Elige libros con el planificador de detalle y abre sus páginas,
+            extrayendo información adicional (descripcion, UPC, categoria).
 
-        # Espera aleatoria para evitar bloqueos del sitio
-        esperar()
+    Las páginas se reparten entre SELENIUM_NAVEGADORES navegadores headless
+    que trabajan en paralelo; cada página se extrae con una sola llamada
+    execute_script y sin cargar imágenes ni CSS.
+    """
+    print(f"➡️ Iniciando Selenium (modo headless, {SELENIUM_NAVEGADORES} navegadores)...")
+    log("INFO", f"Iniciando Selenium con {SELENIUM_NAVEGADORES} navegadores...")
 
-    # ---------------------------------------------------------
-    # 📌 2. SCRAPING DE PÁGINA DE DETALLE DEL LIBRO
-    # ---------------------------------------------------------
+    enlaces_detalle = []  # Guarda enlaces individuales de cada libro
 
-    total_detalle = min(LIBROS_NAVEGA_DETALLE, len(enlaces_detalle))
-    print(f"\n🔍 Procesando detalle aleatorio de {total_detalle} libro{'s' if total_detalle > 1 else ''}...")
-    log("INFO", f"Iniciando scraping de detalle de {total_detalle} libros")
+    # Un único escritor por ejecución: una conexión y volcados por lotes
+    with EscritorLibros() as escritor, DescargadorImagenes(escritor) as imagenes, PoolNavegadores() as pool, \
+            ThreadPoolExecutor(max_workers=SELENIUM_NAVEGADORES) as ejecutor:
 
-    # Selecciona enlaces aleatorios entre todos los encontrados
-    enlaces_detalle = random.sample(enlaces_detalle, total_detalle)
+        # ---------------------------------------------------------
+        # 📌 1. SCRAPING DE LA LISTA DE LIBROS
+        # ---------------------------------------------------------
+        def procesar_pagina(pagina):
+            url = f"{BASE}catalogue/page-{pagina}.html"
+            print(f"\n📄 Cargando página {pagina}: {url}")
+            log("INFO", f"Cargando página: {url}")
 
-    for enlace in enlaces_detalle:
-        try:
+            try:
+                return pool.listado(url, pagina)
+            except Exception as e:
+                print(f"❌ Error procesando página {pagina}: {e}")
+                log("ERROR", f"Error en Selenium página {pagina}: {e}")
+                return []
+
+        # Los libros se guardan desde este hilo a medida que llegan las páginas
+        for resultados in ejecutor.map(procesar_pagina, range(PAGINA_INICIO, N_PAGINA)):
+            for libro, enlace in resultados:
+                escritor.guardar(libro)
+                imagenes.encolar(libro)
+            enlaces_detalle.extend(escritor.enlaces_nuevos(enlace for _, enlace in resultados))
+
+        # ---------------------------------------------------------
+        # 📌 2. SCRAPING DE PÁGINA DE DETALLE DEL LIBRO
+        # ---------------------------------------------------------
+
+        # Selecciona los enlaces más valiosos: detalles que faltan o más antiguos
+        enlaces_detalle = escritor.planificar_detalle(enlaces_detalle, LIBROS_NAVEGA_DETALLE)
+        total_detalle = len(enlaces_detalle)
+        print(f"\n🔍 Procesando detalle de {total_detalle} libro{'s' if total_detalle != 1 else ''}...")
+        log("INFO", f"Iniciando scraping de detalle de {total_detalle} libros")
+
+        def procesar_detalle(enlace):
             print(f"\n➡️  Abriendo detalle: {enlace}")
             log("INFO", f"Abriendo detalle: {enlace}")
 
-            driver.get(enlace)
-
-            # ---------- DESCRIPCIÓN ----------
-            descripcion_tag = driver.find_elements(By.CSS_SELECTOR, "#product_description ~ p")
-            descripcion = descripcion_tag[0].text if descripcion_tag else ""
-
-            # ---------- UPC ----------
-            filas = driver.find_elements(By.CSS_SELECTOR, "table.table tr")
-            if filas and filas[0].find_elements(By.TAG_NAME, "td"):
-                upc = filas[0].find_elements(By.TAG_NAME, "td")[0].text
-            else:
-                upc = ""
-
-            # ---------- CATEGORÍA ----------
             try:
-                categoria_tag = driver.find_element(By.CSS_SELECTOR, "ul.breadcrumb li:nth-child(3) a")
-                categoria = categoria_tag.text
-            except:
-                categoria = ""
+                return pool.detalle(enlace)
+            except Exception as e:
+                print(f"❌ Error procesando detalle: {e}")
+                log("ERROR", f"Error en detalle Selenium: {e}")
+                return None
 
-            # ---------- TÍTULO EN LA PÁGINA DE DETALLE ----------
-            try:
-                titulo_h1_tag = driver.find_element(By.TAG_NAME, "h1")
-                titulo_h1 = titulo_h1_tag.text
-            except:
-                titulo_h1 = ""
+        for enlace, datos in zip(enlaces_detalle, ejecutor.map(procesar_detalle, enlaces_detalle)):
+            if datos is None:
+                continue
 
+            titulo_h1, descripcion, upc, categoria = datos
             print(f"   ✏️ Actualizando libro: {titulo_h1}")
             log("INFO", f"Actualizando detalles de: {titulo_h1}")
             log("DEBUG", f"UPC={upc}, Categoría={categoria}")
 
             # Actualiza el libro en la base de datos
-            actualizar_libro(titulo_h1, descripcion, upc, categoria)
-
-            print("      ✔ Detalles actualizados correctamente")
-            log("INFO", f"Detalles actualizados: {titulo_h1}")
-
-            esperar()
-
-        except Exception as e:
-            print(f"❌ Error procesando detalle: {e}")
-            log("ERROR", f"Error en detalle Selenium: {e}")
+            escritor.actualizar(enlace, descripcion, upc, categoria)
 
-    # Cierra el navegador al finalizar
-    driver.quit()
     print("\n🏁 Scraping Selenium finalizado.")
     log("INFO", "Scraping Selenium finalizado")
@@ -0,0 +1,213 @@
+import os
+import time
+import multiprocessing
+from db.base_datos import EscritorLibros
+from db.frontera import Frontera, PRIORIDAD_LISTADO, PRIORIDAD_DETALLE
+from db.fallidos import listar_fallidos, reencolar_fallidos
+from scrapers.scraper_bs4 import guardar_listado, guardar_detalle
+from utils.cliente_http import crear_sesion, obtener
+from utils.cache_http import CacheHTTP, CACHE_HTTP
+from utils.limitador import limitador
+from utils.imagenes import DescargadorImagenes
+from utils.logger import log
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DE LOS TRABAJADORES A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# URL principal del sitio a scrapear
+BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
+
+# Última página de catálogo a sembrar
+N_PAGINA = int(os.getenv("N_PAGINA", 4)) + 1
+
+# Primera página de catálogo a sembrar
+PAGINA_INICIO = int(os.getenv("PAGINA_INICIO", 1))
+
+# URLs que un trabajador reclama de una vez
+FRONTERA_LOTE = int(os.getenv("FRONTERA_LOTE", 10))
+
+# Segundos de espera cuando no hay nada pendiente pero otros trabajadores siguen activos
+FRONTERA_ESPERA = float(os.getenv("FRONTERA_ESPERA", 0.5))
+
+
+class ErrorHTTP(Exception):
+    """Respuesta distinta de 200: la URL se libera para reintentarla."""
+
+
+def sembrar():
+    """
+    Añade a la frontera las páginas de catálogo PAGINA_INICIO..N_PAGINA.
+
+    Las que ya se procesaron en una ronda anterior vuelven a pendiente.
+    """
+    paginas = [(f"{BASE}catalogue/page-{pagina}.html", pagina) for pagina in range(PAGINA_INICIO, N_PAGINA)]
+
+    with Frontera() as frontera:
+        nuevas = frontera.agregar(paginas, "listado", PRIORIDAD_LISTADO, reabrir=True)
+        resumen = frontera.resumen()
+
+    print(f"🌱 Frontera sembrada: {nuevas} páginas de catálogo pendientes {resumen}")
+    log("INFO", f"Frontera sembrada con {nuevas} páginas de catálogo; estado: {resumen}")
+    return nuevas
+
+
+def _descargar(session, cache, url):
+    """HTML de `url`; lanza ErrorHTTP si la respuesta no es 200."""
+    respuesta = obtener(session, url, cache)
+    if respuesta.status_code != 200:
+        raise ErrorHTTP(f"HTTP {respuesta.status_code}")
+    return respuesta.text
+
+
+def trabajador(procesos=1):
+    """
+    Reclama lotes de la frontera compartida y los procesa hasta vaciarla.
+
+    Por cada lote:
+        1. Descarga y extrae cada URL con el mismo código que el motor bs4.
+        2. Vuelca los libros a la BD.
+        3. Añade a la frontera los detalles descubiertos que no estaban ya
+           (ya con su libro en la BD).
+        4. Confirma las URLs procesadas y libera las que fallaron.
+
+    Si el proceso muere entre 1 y 4, sus URLs vuelven a la frontera cuando
+    caduca la concesión; si el volcado de 2 falla, el lote entero se libera. `procesos` es el número de trabajadores que
+    comparten el presupuesto de ritmo de esta máquina.
+    """
+    limitador.repartir(procesos)
+
+    session = crear_sesion()
+    cache = CacheHTTP() if CACHE_HTTP else None
+
+    procesadas = fallidas = 0
+    inicio = time.monotonic()
+
+    with Frontera() as frontera, EscritorLibros() as escritor, DescargadorImagenes(escritor) as imagenes:
+        print(f"👷 Trabajador {frontera.trabajador} iniciado")
+        log("INFO", f"Trabajador {frontera.trabajador} iniciado (lote={FRONTERA_LOTE})")
+
+        while True:
+            lote = frontera.reclamar(FRONTERA_LOTE)
+
+            if not lote:
+                # Otros trabajadores pueden descubrir detalles todavía
+                if not frontera.activa():
+                    break
+                time.sleep(FRONTERA_ESPERA)
+                continue
+
+            concedido = time.monotonic()
+            hechas, errores, descubiertas = [], [], []
+
+            for posicion, (url, tipo, pagina) in enumerate(lote):
+                # Renueva la concesión del resto si el lote va lento
+                if time.monotonic() - concedido > frontera.concesion / 2:
+                    frontera.renovar([u for u, _, _ in lote[posicion:]])
+                    concedido = time.monotonic()
+
+                try:
+                    html = _descargar(session, cache, url)
+                    if tipo == "listado":
+                        guardar_listado(escritor, imagenes, url, html, pagina, descubiertas)
+                    else:
+                        guardar_detalle(escritor, url, html)
+                    hechas.append(url)
+
+                except Exception as e:
+                    print(f"❌ Error en {url}: {e}")
+                    log("ERROR", f"Error procesando {url}: {e}")
+                    errores.append((url, str(e)))
+
+            # Los datos llegan a la BD antes de confirmar y de publicar sus detalles
+            try:
+                escritor.volcar()
+            except Exception as e:
+                # Nada del lote está en la BD: todas sus URLs vuelven a la frontera
+                frontera.liberar([u for u, _, _ in lote], f"Error al guardar en la BD: {e}")
+                fallidas += len(lote)
+                print(f"   ❌ Lote de {len(lote)} liberado: no se pudo guardar en la BD")
+                log("ERROR", f"Lote de {len(lote)} URLs liberado por un error al volcar: {e}")
+                continue
+
+            # Los detalles ya visitados en rondas anteriores no se reabren
+            frontera.agregar(descubiertas, "detalle", PRIORIDAD_DETALLE)
+            frontera.confirmar(hechas)
+            for url, error in errores:
+                frontera.liberar([url], error)
+
+            procesadas += len(hechas)
+            fallidas += len(errores)
+            print(f"   ✔ Lote de {len(lote)}: {len(hechas)} hechas, {len(errores)} con error, "
+                  f"{len(descubiertas)} detalles descubiertos")
+
+    if cache is not None:
+        cache.cerrar()
+
+    duracion = time.monotonic() - inicio
+    print(f"🏁 Trabajador terminado: {procesadas} URLs en {duracion:.1f} s "
+          f"({procesadas / duracion if duracion else 0:.1f}/s), {fallidas} con error")
+    log("INFO", f"Trabajador terminado: {procesadas} URLs, {fallidas} errores, {duracion:.1f} s")
+    return procesadas
+
+
+def lanzar_trabajadores(procesos=1, sembrar_frontera=True):
+    """
+    Siembra la frontera (opcional) y ejecuta `procesos` trabajadores en esta máquina.
+
+    Con un solo proceso el trabajador corre aquí mismo (y sus métricas
+    salen en el informe final). En otras máquinas basta con ejecutar
+    `main.py trabajador --sin-sembrar` contra la misma frontera.
+    """
+    if sembrar_frontera:
+        sembrar()
+
+    inicio = time.monotonic()
+
+    if procesos <= 1:
+        trabajador()
+        exito = True
+    else:
+        hijos = [
+            multiprocessing.Process(target=trabajador, args=(procesos,), name=f"trabajador-{i}")
+            for i in range(procesos)
+        ]
+        for hijo in hijos:
+            hijo.start()
+        for hijo in hijos:
+            hijo.join()
+
+        fallidos = [hijo.name for hijo in hijos if hijo.exitcode != 0]
+        if fallidos:
+            print(f"❌ Trabajadores terminados con error: {', '.join(fallidos)}")
+            log("ERROR", f"Trabajadores terminados con error: {fallidos}")
+        exito = not fallidos
+
+    with Frontera() as frontera:
+        resumen = frontera.resumen()
+
+    print(f"\n📋 Frontera tras {time.monotonic() - inicio:.1f} s con {procesos} trabajador(es): {resumen}")
+    log("INFO", f"Frontera: {resumen}")
+    return exito
+
+
+def reintentar_fallidos(procesos=1, solo_listar=False):
+    """
+    Vuelve a procesar las URLs de la tabla fallidos a través de la frontera.
+
+    Solo se piden esas URLs (y los detalles que descubran sus catálogos),
+    no el rastreo completo. Con `solo_listar` únicamente las muestra.
+    """
+    fallidos = listar_fallidos()
+    print(f"🩹 {len(fallidos)} URLs fallidas")
+    for fila in fallidos:
+        motivo = f"HTTP {fila['estado']}" if fila["estado"] else fila["error"]
+        print(f"   {fila['url']}  ({motivo}; fallos: {fila['veces']}; último: {fila['ultima_fecha']})")
+
+    if solo_listar or not fallidos:
+        return True
+
+    with Frontera() as frontera:
+        reencolar_fallidos(frontera)
+
+    return lanzar_trabajadores(procesos, sembrar_frontera=False)
@@ -0,0 +1,232 @@
+import os
+import gzip
+import glob
+import time
+import uuid
+import zlib
+import atexit
+import base64
+import hashlib
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from utils.metricas import metricas
+from utils.logger import log
+
+# ---------------------------------------------------------
+# ARCHIVO DE RESPUESTAS EN BRUTO (WARC)
+# ---------------------------------------------------------
+# Con ARCHIVAR_WARC=1 cada respuesta que llega de la red (cliente_http.obtener
+# y el motor async) se guarda tal cual, con su estado, cabeceras y fecha, en
+# ficheros WARC 1.1 comprimidos bajo RUTA_WARC. `main.py reprocesar` los
+# vuelve a parsear sin red cuando se corrige un error de extracción.
+#
+# - Cada registro es un miembro gzip independiente (el formato .warc.gz
+#   habitual): un fichero cortado a mitad de escritura solo pierde su
+#   último registro, y cada registro se vuelca al escribirlo.
+# - El cuerpo se guarda ya descomprimido, como lo recibe el scraper, así
+#   que se omiten Content-Encoding y Transfer-Encoding y Content-Length se
+#   recalcula.
+# - Cada proceso escribe en su propio fichero y los ficheros rotan al pasar
+#   de WARC_MAX_MB; sus nombres empiezan por la fecha, así que ordenarlos
+#   por nombre es ordenarlos en el tiempo.
+# - Las páginas servidas desde la caché HTTP no se vuelven a archivar.
+
+# Archiva las respuestas (1) o no (0)
+ARCHIVAR_WARC = os.getenv("ARCHIVAR_WARC", "0") == "1"
+
+# Carpeta de los ficheros .warc.gz
+RUTA_WARC = os.getenv("RUTA_WARC", "data/warc")
+
+# Tamaño a partir del cual se empieza un fichero nuevo
+WARC_MAX_MB = float(os.getenv("WARC_MAX_MB", 256))
+
+_CABECERAS_OMITIDAS = {"content-encoding", "transfer-encoding", "content-length"}
+
+RegistroWARC = namedtuple("RegistroWARC", "url fecha estado cabeceras cuerpo")
+
+
+def _fecha_warc():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _registro(tipo, campos, bloque, content_type):
+    """Registro WARC completo (cabecera + bloque) comprimido como un miembro gzip."""
+    cabecera = [
+        "WARC/1.1",
+        f"WARC-Type: {tipo}",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {_fecha_warc()}",
+        *(f"{clave}: {valor}" for clave, valor in campos.items()),
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(bloque)}",
+    ]
+    datos = ("\r\n".join(cabecera) + "\r\n\r\n").encode("utf-8") + bloque + b"\r\n\r\n"
+    return gzip.compress(datos, compresslevel=6)
+
+
+class ArchivoWARC:
+    """
+    Escritor de ficheros WARC seguro entre hilos.
+
+    El fichero se abre con el primer registro (un proceso que no descarga
+    nada no deja ficheros vacíos) y se reabre si el proceso cambió, para
+    que los trabajadores creados con fork no compartan el del padre.
+    """
+
+    def __init__(self, ruta=RUTA_WARC, activo=ARCHIVAR_WARC, max_mb=WARC_MAX_MB):
+        self.ruta = ruta
+        self.activo = activo
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._fichero = None
+        self._pid = None
+        self._bytes = 0
+        self._secuencia = 0
+        self.registros = 0
+
+    def _abrir(self):
+        os.makedirs(self.ruta, exist_ok=True)
+        if self._pid != os.getpid():
+            self._pid, self._secuencia = os.getpid(), 0
+            atexit.register(self.cerrar)
+
+        self._secuencia += 1
+        nombre = f"libros-{time.strftime('%Y%m%d%H%M%S')}-{self._pid}-{self._secuencia:05d}.warc.gz"
+        self._fichero = open(os.path.join(self.ruta, nombre), "ab")
+        self._bytes = 0
+
+        info = b"software: scraper-libros\r\nformat: WARC File Format 1.1\r\n"
+        self._escribir(_registro("warcinfo", {"WARC-Filename": nombre}, info, "application/warc-fields"))
+
+        print(f"🗃️  Archivando respuestas en {os.path.join(self.ruta, nombre)}")
+        log("INFO", f"Archivo WARC abierto: {nombre}")
+
+    def _escribir(self, comprimido):
+        self._fichero.write(comprimido)
+        self._fichero.flush()
+        self._bytes += len(comprimido)
+
+    def archivar(self, url, estado, motivo, cabeceras, cuerpo):
+        """Guarda una respuesta HTTP; no hace nada si ARCHIVAR_WARC está desactivado."""
+        if not self.activo:
+            return
+
+        lineas = [f"HTTP/1.1 {estado} {motivo or ''}".rstrip()]
+        lineas += [f"{clave}: {valor}" for clave, valor in cabeceras.items() if clave.lower() not in _CABECERAS_OMITIDAS]
+        lineas.append(f"Content-Length: {len(cuerpo)}")
+        bloque = ("\r\n".join(lineas) + "\r\n\r\n").encode("utf-8", errors="replace") + cuerpo
+
+        digesto = base64.b32encode(hashlib.sha1(cuerpo).digest()).decode()
+        campos = {"WARC-Target-URI": url, "WARC-Payload-Digest": f"sha1:{digesto}"}
+
+        # La compresión, fuera del lock: los hilos de descarga no se esperan entre sí
+        comprimido = _registro("response", campos, bloque, "application/http;msgtype=response")
+
+        try:
+            with self._lock:
+                if self._fichero is None or self._pid != os.getpid():
+                    self._abrir()
+                self._escribir(comprimido)
+                self.registros += 1
+                if self._bytes >= self.max_bytes:
+                    self._cerrar_fichero()
+        except OSError as e:
+            # Un disco lleno no debe parar el rastreo
+            log("ERROR", f"No se pudo archivar {url} en WARC: {e}")
+            return
+
+        metricas.contar("warc_registros")
+        metricas.contar("warc_bytes", len(comprimido))
+
+    def _cerrar_fichero(self):
+        if self._fichero is not None:
+            self._fichero.close()
+            self._fichero = None
+
+    def cerrar(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._cerrar_fichero()
+
+
+# Instancia compartida por todo el proceso
+archivo_warc = ArchivoWARC()
+
+
+# ---------------------------------------------------------
+# LECTURA
+# ---------------------------------------------------------
+def archivos_warc(rutas=None):
+    """Ficheros .warc.gz / .warc de `rutas` (ficheros o carpetas; por defecto RUTA_WARC), del más antiguo al más reciente."""
+    encontrados = []
+    for ruta in rutas or [RUTA_WARC]:
+        if os.path.isdir(ruta):
+            encontrados += sorted(glob.glob(os.path.join(ruta, "*.warc.gz")) + glob.glob(os.path.join(ruta, "*.warc")))
+        else:
+            encontrados.append(ruta)
+    return encontrados
+
+
+def _leer_cabecera(fichero):
+    """Campos de la cabecera del siguiente registro, o None al final del fichero."""
+    linea = fichero.readline()
+    while linea in (b"\r\n", b"\n"):
+        linea = fichero.readline()
+    if not linea:
+        return None
+    if not linea.startswith(b"WARC/"):
+        raise ValueError(f"Registro WARC no válido: {linea[:40]!r}")
+
+    campos = {}
+    for linea in iter(fichero.readline, b""):
+        if linea in (b"\r\n", b"\n"):
+            break
+        clave, _, valor = linea.decode("utf-8", errors="replace").partition(":")
+        campos[clave.strip().lower()] = valor.strip()
+    return campos
+
+
+def _respuesta_http(bloque):
+    """(estado, cabeceras, cuerpo) del bloque de un registro response."""
+    cabecera, _, cuerpo = bloque.partition(b"\r\n\r\n")
+    lineas = cabecera.decode("iso-8859-1").split("\r\n")
+    partes = lineas[0].split(" ", 2)
+    estado = int(partes[1]) if len(partes) > 1 and partes[1].isdigit() else 0
+
+    cabeceras = {}
+    for linea in lineas[1:]:
+        clave, _, valor = linea.partition(":")
+        cabeceras[clave.strip().lower()] = valor.strip()
+    return estado, cabeceras, cuerpo
+
+
+def leer_warc(ruta):
+    """
+    Generador de RegistroWARC con cada respuesta HTTP guardada en `ruta`.
+
+    Lee el fichero en flujo (la memoria no depende de su tamaño) y se salta
+    los registros que no son respuestas. Si el fichero acaba a mitad de un
+    registro (el proceso murió escribiéndolo), avisa y termina.
+    """
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    with abrir(ruta, "rb") as fichero:
+        while True:
+            try:
+                campos = _leer_cabecera(fichero)
+                if campos is None:
+                    return
+                longitud = int(campos.get("content-length", 0))
+                bloque = fichero.read(longitud)
+                if len(bloque) < longitud:
+                    raise EOFError("registro incompleto")
+            except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+                print(f"⚠️ {ruta} termina con un registro incompleto; se ignora")
+                log("WARNING", f"Registro WARC incompleto al final de {ruta}: {e}")
+                return
+
+            if campos.get("warc-type") != "response":
+                continue
+
+            estado, cabeceras, cuerpo = _respuesta_http(bloque)
+            yield RegistroWARC(campos.get("warc-target-uri"), campos.get("warc-date"), estado, cabeceras, cuerpo)
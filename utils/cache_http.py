@@ -0,0 +1,242 @@
+import os
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from utils.logger import log
+
+load_dotenv()
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DE LA CACHÉ DESDE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# Activa (1) o desactiva (0) la caché HTTP en disco
+CACHE_HTTP = os.getenv("CACHE_HTTP", "1") == "1"
+
+# Archivo SQLite donde se guardan las respuestas
+RUTA_CACHE = os.getenv("RUTA_CACHE", "data/cache_http.db")
+
+# Segundos durante los que una respuesta se sirve del disco sin preguntar al servidor
+CACHE_TTL = float(os.getenv("CACHE_TTL", 3600))
+
+# Tamaño máximo de la caché; al superarlo se expulsan las menos usadas (LRU)
+CACHE_MAX_MB = float(os.getenv("CACHE_MAX_MB", 200))
+
+
+def decodificar(cuerpo, content_type):
+    """
+    Decodifica un cuerpo HTTP igual que lo hace `requests`:
+    usa el charset de la cabecera y, si no viene, ISO-8859-1 para text/*.
+
+    Así una página servida desde la caché o descargada por otro motor
+    produce exactamente el mismo texto que con requests.
+    """
+    content_type = content_type or ""
+    for parte in content_type.split(";")[1:]:
+        clave, _, valor = parte.strip().partition("=")
+        if clave.lower() == "charset" and valor:
+            return cuerpo.decode(valor.strip("'\""), errors="replace")
+
+    if "text" in content_type:
+        return cuerpo.decode("ISO-8859-1")
+
+    return cuerpo.decode("utf-8", errors="replace")
+
+
+class RespuestaCacheada:
+    """Respuesta servida desde la caché, con la interfaz mínima de requests.Response."""
+
+    def __init__(self, url, cuerpo, content_type):
+        self.url = url
+        self.status_code = 200
+        self.content = cuerpo
+        self.headers = {"Content-Type": content_type or ""}
+        self.desde_cache = True
+
+    @property
+    def text(self):
+        return decodificar(self.content, self.headers["Content-Type"])
+
+
+class CacheHTTP:
+    """
+    Caché HTTP persistente en SQLite con revalidación condicional.
+
+    - Guarda el cuerpo de cada respuesta 200 junto a su ETag / Last-Modified.
+    - Dentro de CACHE_TTL la respuesta se sirve del disco sin tocar la red.
+    - Pasado el TTL se revalida con If-None-Match / If-Modified-Since; un 304
+      renueva la entrada y se reutiliza el cuerpo guardado.
+    - Al superar CACHE_MAX_MB se expulsan las entradas usadas hace más tiempo.
+
+    Lleva contadores de aciertos, revalidaciones, fallos y bytes ahorrados.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, ttl=CACHE_TTL, max_mb=CACHE_MAX_MB):
+        self.ttl = ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        # check_same_thread=False: el acceso se serializa con self._lock
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS respuestas (
+                url TEXT PRIMARY KEY,
+                cuerpo BLOB,
+                content_type TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                guardado REAL,
+                acceso REAL,
+                tamano INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_acceso ON respuestas(acceso)")
+        self.conn.commit()
+
+        self._lock = threading.Lock()
+        self._total = self.conn.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+
+        self.aciertos = 0
+        self.revalidados = 0
+        self.fallos = 0
+        self.bytes_ahorrados = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # ------------------------------------------------
+    # CONSULTA
+    # ------------------------------------------------
+    def buscar(self, url):
+        """
+        Devuelve (respuesta, cabeceras) para `url`:
+
+        - (RespuestaCacheada, None) si hay copia dentro del TTL.
+        - (None, cabeceras_condicionales) si hay copia caducada que revalidar.
+        - (None, {}) si no hay copia.
+        """
+        with self._lock:
+            fila = self.conn.execute(
+                "SELECT cuerpo, content_type, etag, last_modified, guardado FROM respuestas WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+            if fila is None:
+                return None, {}
+
+            cuerpo, content_type, etag, last_modified, guardado = fila
+
+            if time.time() - guardado < self.ttl:
+                self.aciertos += 1
+                self.bytes_ahorrados += len(cuerpo)
+                self._tocar(url)
+                log("DEBUG", f"Caché HTTP: acierto para {url}")
+                return RespuestaCacheada(url, cuerpo, content_type), None
+
+        cabeceras = {}
+        if etag:
+            cabeceras["If-None-Match"] = etag
+        if last_modified:
+            cabeceras["If-Modified-Since"] = last_modified
+        return None, cabeceras
+
+    # ------------------------------------------------
+    # ACTUALIZACIÓN TRAS UNA RESPUESTA DEL SERVIDOR
+    # ------------------------------------------------
+    def revalidada(self, url, headers):
+        """Marca la copia como vigente tras un 304 y la devuelve."""
+        with self._lock:
+            fila = self.conn.execute(
+                "SELECT cuerpo, content_type FROM respuestas WHERE url = ?", (url,)
+            ).fetchone()
+            if fila is None:
+                return None
+
+            cuerpo, content_type = fila
+            ahora = time.time()
+            self.conn.execute(
+                """
+                UPDATE respuestas
+                SET guardado = ?, acceso = ?,
+                    etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE url = ?
+                """,
+                (ahora, ahora, headers.get("ETag"), headers.get("Last-Modified"), url)
+            )
+            self.conn.commit()
+
+            self.revalidados += 1
+            self.bytes_ahorrados += len(cuerpo)
+
+        log("DEBUG", f"Caché HTTP: 304 para {url}")
+        return RespuestaCacheada(url, cuerpo, content_type)
+
+    def guardar(self, url, cuerpo, headers):
+        """Guarda (o reemplaza) la respuesta 200 de `url`."""
+        ahora = time.time()
+        with self._lock:
+            anterior = self.conn.execute("SELECT tamano FROM respuestas WHERE url = ?", (url,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, cuerpo, headers.get("Content-Type"), headers.get("ETag"),
+                 headers.get("Last-Modified"), ahora, ahora, len(cuerpo))
+            )
+            self._total += len(cuerpo) - (anterior[0] if anterior else 0)
+            self.fallos += 1
+
+            if self._total > self.max_bytes:
+                self._expulsar()
+
+            self.conn.commit()
+
+    def cerrar(self):
+        """Registra el resumen de uso y cierra la conexión."""
+        log("INFO", f"Caché HTTP: {self.resumen()}")
+        with self._lock:
+            self.conn.close()
+
+    def resumen(self):
+        """Texto con los contadores de la ejecución."""
+        total = self.aciertos + self.revalidados + self.fallos
+        tasa = (self.aciertos + self.revalidados) / total * 100 if total else 0
+        return (
+            f"{self.aciertos} aciertos, {self.revalidados} revalidados (304), "
+            f"{self.fallos} fallos, {tasa:.1f}% servido desde disco, "
+            f"{self.bytes_ahorrados / 1024:.1f} KB ahorrados"
+        )
+
+    # ------------------------------------------------
+    # INTERNOS (se llaman con self._lock tomado)
+    # ------------------------------------------------
+    def _tocar(self, url):
+        self.conn.execute("UPDATE respuestas SET acceso = ? WHERE url = ?", (time.time(), url))
+        self.conn.commit()
+
+    def _expulsar(self):
+        """Elimina las entradas menos usadas hasta quedar bajo el límite."""
+        expulsadas = 0
+
+        while self._total > self.max_bytes:
+            filas = self.conn.execute(
+                "SELECT url, tamano FROM respuestas ORDER BY acceso LIMIT 100"
+            ).fetchall()
+            if not filas:
+                break
+
+            for url, tamano in filas:
+                if self._total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM respuestas WHERE url = ?", (url,))
+                self._total -= tamano
+                expulsadas += 1
+
+        log("DEBUG", f"Caché HTTP: {expulsadas} entradas expulsadas por tamaño")
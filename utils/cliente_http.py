@@ -0,0 +1,259 @@
+import os
+import time
+import random
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from db.fallidos import registrar_fallido
+from utils.tiempos import esperar
+from utils.limitador import limitador, _segundos_retry_after
+from utils.metricas import metricas
+from utils.archivo_warc import archivo_warc
+from utils.logger import log
+
+load_dotenv()
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL CLIENTE HTTP A TRAVÉS DE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# Segundos máximos de cada request
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))
+
+# Reintentos tras el primer intento ante errores transitorios
+HTTP_REINTENTOS = int(os.getenv("HTTP_REINTENTOS", 3))
+
+# Backoff exponencial con jitter: base * 2^intento, como mucho HTTP_BACKOFF_MAX
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30))
+
+# Conexiones persistentes por host en el pool de cada sesión
+HTTP_POOL = int(os.getenv("HTTP_POOL", max(10, int(os.getenv("CONCURRENCIA", 5)))))
+
+# Fallos seguidos que abren el circuito de un host y segundos de pausa
+CIRCUITO_FALLOS = int(os.getenv("CIRCUITO_FALLOS", 5))
+CIRCUITO_PAUSA = float(os.getenv("CIRCUITO_PAUSA", 30))
+
+# Respuestas que merecen otro intento; el resto de no-200 son definitivas
+CODIGOS_REINTENTABLES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def crear_sesion(pool=HTTP_POOL):
+    """
+    Sesión requests con un pool de `pool` conexiones keep-alive por host.
+
+    El HTTPAdapter por defecto guarda solo 10 conexiones; con más hilos
+    que eso, las sobrantes se abren y cierran en cada request. Los
+    reintentos los gestiona obtener(), no urllib3.
+    """
+    session = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=0)
+    session.mount("http://", adaptador)
+    session.mount("https://", adaptador)
+    return session
+
+
+def espera_reintento(intento, retry_after=None):
+    """
+    Segundos antes del reintento número `intento` (0, 1, 2...).
+
+    "Full jitter": un valor aleatorio entre 0 y base * 2^intento, para que
+    los clientes que fallaron a la vez no reintenten a la vez. Si el
+    servidor mandó Retry-After, nunca se espera menos.
+    """
+    espera = random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** intento))
+    minimo = _segundos_retry_after(retry_after)
+    return max(espera, minimo) if minimo is not None else espera
+
+
+# ---------------------------------------------------------
+# CIRCUIT BREAKER POR HOST
+# ---------------------------------------------------------
+class _EstadoCircuito:
+    __slots__ = ("fallos", "abierto_hasta", "sonda")
+
+    def __init__(self):
+        self.fallos = 0            # Fallos seguidos
+        self.abierto_hasta = 0.0   # Mientras no llegue, nadie pide a este host
+        self.sonda = False         # Semiabierto: un único request de prueba en vuelo
+
+
+class Circuito:
+    """
+    Circuit breaker por host, compartido por todos los hilos del proceso.
+
+    - Cerrado: los requests pasan; cada éxito pone a cero los fallos.
+    - Abierto: tras CIRCUITO_FALLOS fallos seguidos nadie pide a ese host
+      durante CIRCUITO_PAUSA segundos (el rastreo de ese sitio se pausa).
+    - Semiabierto: pasada la pausa sale un único request de prueba; si
+      funciona el circuito se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, umbral=CIRCUITO_FALLOS, pausa=CIRCUITO_PAUSA):
+        self.umbral = umbral
+        self.pausa = pausa
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, host):
+        estado = self._estados.get(host)
+        if estado is None:
+            estado = self._estados[host] = _EstadoCircuito()
+        return estado
+
+    def espera(self, url):
+        """Segundos hasta que se pueda pedir `url`; 0 si se puede ya (y reserva la sonda)."""
+        with self._lock:
+            estado = self._estado(urlsplit(url).netloc)
+            if estado.fallos < self.umbral:
+                return 0.0
+
+            restante = estado.abierto_hasta - time.monotonic()
+            if restante > 0:
+                return restante
+            if estado.sonda:
+                # Otro hilo está probando; se vuelve a mirar en un momento
+                return min(1.0, self.pausa)
+
+            estado.sonda = True
+            return 0.0
+
+    def exito(self, url):
+        with self._lock:
+            estado = self._estado(urlsplit(url).netloc)
+            cerrado = estado.fallos < self.umbral
+            estado.fallos = 0
+            estado.sonda = False
+
+        if not cerrado:
+            print(f"✅ Circuito cerrado: {urlsplit(url).netloc} vuelve a responder")
+            log("INFO", f"Circuito cerrado para {urlsplit(url).netloc}")
+
+    def fallo(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            estado = self._estado(host)
+            estado.fallos += 1
+            estado.sonda = False
+            abrir = estado.fallos >= self.umbral
+            if abrir:
+                estado.abierto_hasta = time.monotonic() + self.pausa
+
+        if abrir:
+            metricas.contar("circuito_abierto", host=host)
+            print(f"⛔ Circuito abierto: {host} falla, pausa de {self.pausa:.0f} s")
+            log("WARNING", f"Circuito abierto para {host} tras {estado.fallos} fallos seguidos; pausa de {self.pausa:.0f} s")
+
+    def esperar(self, url):
+        """Bloquea mientras el circuito del host de `url` esté abierto."""
+        while (espera := self.espera(url)) > 0:
+            time.sleep(espera)
+
+
+# Instancia compartida por todos los scrapers
+circuito = Circuito()
+
+
+# ---------------------------------------------------------
+# GET CON REINTENTOS, CIRCUITO, LIMITADOR Y CACHÉ
+# ---------------------------------------------------------
+def obtener(session, url, cache=None, reintentos=HTTP_REINTENTOS, condicional=True):
+    """
+    Hace un GET respetando el circuito, el limitador compartido y la caché HTTP.
+
+    - Si la caché tiene una copia dentro del TTL, se devuelve sin tocar la red
+      (ni consumir turno del limitador).
+    - Si la copia está caducada, se revalida con cabeceras condicionales y un
+      304 devuelve el cuerpo guardado. Si la copia se expulsó mientras tanto,
+      la página se pide una vez más sin cabeceras condicionales.
+    - Errores de red, timeouts y respuestas CODIGOS_REINTENTABLES se
+      reintentan hasta `reintentos` veces con backoff exponencial y jitter.
+    - Si los reintentos se agotan, la URL se anota en la tabla fallidos para
+      reintentarla más tarde (`main.py reintentar`); un error definitivo
+      (404, 403...) solo se registra en el log. Un error de red se relanza;
+      una respuesta HTTP se devuelve para que el llamante la vea.
+    """
+    cabeceras = {}
+    if cache is not None and condicional:
+        cacheada, cabeceras = cache.buscar(url)
+        if cacheada is not None:
+            metricas.contar("cache", resultado="acierto")
+            return cacheada
+
+    for intento in range(reintentos + 1):
+        circuito.esperar(url)
+
+        # Espera su turno para no saturar el sitio
+        esperar(url)
+
+        try:
+            respuesta = session.get(url, headers=cabeceras, timeout=HTTP_TIMEOUT)
+        except Exception as e:
+            limitador.registrar(url, error=True)
+            metricas.contar("http_errores")
+            circuito.fallo(url)
+
+            if intento < reintentos:
+                _reintentar(url, intento, motivo=type(e).__name__)
+                continue
+
+            registrar_fallido(url, error=str(e), intentos=intento + 1)
+            raise
+
+        latencia = respuesta.elapsed.total_seconds()
+        limitador.registrar(
+            url,
+            estado=respuesta.status_code,
+            latencia=latencia,
+            retry_after=respuesta.headers.get("Retry-After"),
+        )
+        metricas.observar("http", latencia, estado=respuesta.status_code)
+
+        # Copia en bruto para poder reparsear sin red (ARCHIVAR_WARC=1)
+        archivo_warc.archivar(url, respuesta.status_code, respuesta.reason, respuesta.headers, respuesta.content)
+
+        if respuesta.status_code not in CODIGOS_REINTENTABLES:
+            circuito.exito(url)
+            break
+
+        circuito.fallo(url)
+        if intento < reintentos:
+            _reintentar(url, intento, motivo=f"HTTP {respuesta.status_code}",
+                        retry_after=respuesta.headers.get("Retry-After"))
+            continue
+
+    if cache is not None:
+        if respuesta.status_code == 304 and condicional:
+            cacheada = cache.revalidada(url, respuesta.headers)
+            if cacheada is not None:
+                metricas.contar("cache", resultado="revalidada")
+                return cacheada
+
+            # La copia se expulsó entre buscar() y el 304: no hay cuerpo que devolver
+            metricas.contar("cache", resultado="expulsada")
+            log("WARNING", f"304 sin copia en caché para {url}; se pide de nuevo sin condiciones")
+            return obtener(session, url, cache, reintentos, condicional=False)
+        if respuesta.status_code == 200:
+            cache.guardar(url, respuesta.content, respuesta.headers)
+
+    if respuesta.status_code in CODIGOS_REINTENTABLES:
+        registrar_fallido(url, estado=respuesta.status_code, intentos=intento + 1)
+    elif respuesta.status_code != 200:
+        error_definitivo(url, respuesta.status_code)
+
+    return respuesta
+
+
+def error_definitivo(url, estado):
+    """Respuesta que no se arregla reintentando (404, 410, 403...): no va a fallidos."""
+    metricas.contar("http_definitivos", estado=estado)
+    log("WARNING", f"HTTP {estado} definitivo en {url}; no se anota para reintentar")
+
+
+def _reintentar(url, intento, motivo, retry_after=None):
+    espera = espera_reintento(intento, retry_after)
+    metricas.contar("http_reintentos", motivo=motivo)
+    log("WARNING", f"{motivo} en {url}; reintento {intento + 1} en {espera:.2f} s")
+    time.sleep(espera)
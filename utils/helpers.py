@@ -5,26 +5,117 @@ ENV_FILE = ".env"
 
 # Contenido predeterminado para el archivo .env en caso de que no exista.
 # Incluye delays, nivel de logs, URL base, páginas a procesar, rutas, etc.
-ENV_DEFAULTS = """# Tiempo de espera entre requests (en segundos)
+ENV_DEFAULTS = """# Tiempo de espera entre requests (en segundos).
+# Fija la tasa inicial del limitador si no se indica TASA_RPS.
 DELAY_SEGUNDOS=2
 
+# Limitador adaptativo por host: tasa inicial (req/s), ráfaga y límites
+TASA_RAFAGA=3
+TASA_MIN_RPS=0.1
+TASA_MAX_RPS=5
+
 # Nivel de logs: DEBUG / INFO / WARNING / ERROR
 LOG_NIVEL=INFO
 
 # Nombre del archivo de logs
 LOG_ARCHIVO=logs.log
 
+# Formato de los logs: texto / jsonl
+LOG_FORMATO=texto
+
+# Métricas: puerto del endpoint /metrics (0 = desactivado) y ruta base de los volcados
+METRICAS_PUERTO=0
+METRICAS_ARCHIVO=data/metricas
+
 # URL a scrapear
 URL_DESTINO=https://books.toscrape.com/
 
-# Número de páginas a procesar
+# Páginas a procesar: de PAGINA_INICIO a N_PAGINA (ambas incluidas)
+PAGINA_INICIO=1
 N_PAGINA=3
 
+# Descubrimiento: 1 sigue los enlaces "next" desde PAGINA_INICIO en lugar de
+# llegar hasta N_PAGINA; categorías de la barra lateral ("*" o "Travel,Poetry")
+# y tope de páginas (0 = sin tope)
+DESCUBRIR=0
+DESCUBRIR_CATEGORIAS=
+DESCUBRIR_MAX_PAGINAS=0
+
 # Ruta de la base de datos
 RUTA_BD=data/libros.db
 
+# Escritura por lotes: filas por lote y segundos máximos entre volcados
+BD_TAMANO_LOTE=200
+BD_INTERVALO_LOTE=5
+
 # Define cuántos libros por página procesará
 LIBROS_NAVEGA_DETALLE=5
+
+# Requests simultáneos del motor asíncrono
+CONCURRENCIA=5
+
+# Modo incremental: 1 omite páginas cuyo contenido no cambió desde la última ejecución
+INCREMENTAL=0
+
+# Parser HTML: html.parser / lxml / selectolax
+PARSER_HTML=html.parser
+
+# Navegadores headless en paralelo del motor Selenium
+SELENIUM_NAVEGADORES=2
+
+# Motor híbrido: navegadores de escalado, escaladas seguidas para enrutar un
+# patrón de URL al navegador y cada cuántas páginas se vuelve a probar HTTP
+HIBRIDO_NAVEGADORES=1
+HIBRIDO_UMBRAL=2
+HIBRIDO_SONDEO=20
+
+# Pipeline: procesos de parseo y capacidad de las colas entre etapas
+PIPELINE_PROCESOS=4
+PIPELINE_COLA=50
+
+# Caché HTTP en disco: activada (1/0), TTL en segundos y tamaño máximo
+CACHE_HTTP=1
+CACHE_TTL=3600
+CACHE_MAX_MB=200
+
+# Archivo WARC de respuestas en bruto: activado (1/0), carpeta y tamaño de cada fichero
+ARCHIVAR_WARC=0
+RUTA_WARC=data/warc
+WARC_MAX_MB=256
+
+# Reprocesado de los archivos WARC: procesos de parseo y páginas por tarea
+REPROCESAR_PROCESOS=4
+REPROCESAR_LOTE=50
+
+# Portadas: descarga activada (1/0), carpeta y descargas simultáneas
+DESCARGAR_IMAGENES=0
+RUTA_IMAGENES=data/imagenes
+IMAGENES_HILOS=4
+
+# Cliente HTTP: timeout, reintentos, backoff exponencial (base y máximo en
+# segundos) y conexiones keep-alive por host
+HTTP_TIMEOUT=10
+HTTP_REINTENTOS=3
+HTTP_BACKOFF_BASE=0.5
+HTTP_BACKOFF_MAX=30
+HTTP_POOL=10
+
+# Circuit breaker: fallos seguidos que pausan un host y segundos de pausa
+CIRCUITO_FALLOS=5
+CIRCUITO_PAUSA=30
+
+# Deduplicación en memoria: claves máximas en un set exacto y tasa de falsos
+# positivos del filtro de Bloom que se usa por encima de ese tamaño
+VISTOS_MAX_CLAVES=1000000
+VISTOS_TASA_FP=0.001
+
+# Frontera compartida (main.py trabajador): URLs por lote, segundos de concesión e intentos
+FRONTERA_LOTE=10
+FRONTERA_CONCESION=120
+FRONTERA_MAX_INTENTOS=3
+
+# Filas leídas por lote al exportar (main.py exportar)
+TAMANO_LOTE_EXPORTACION=5000
 """
 
 def crear_env_si_no_existe():
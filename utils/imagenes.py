@@ -0,0 +1,203 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils.logger import log
+from utils.tiempos import esperar
+from utils.limitador import limitador
+from utils.metricas import metricas
+
+load_dotenv()
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DE LA DESCARGA DE PORTADAS
+# ---------------------------------------------------------
+
+# Activa (1) o desactiva (0) la descarga de portadas
+DESCARGAR_IMAGENES = os.getenv("DESCARGAR_IMAGENES", "0") == "1"
+
+# Carpeta donde se guardan las portadas, por hash de contenido
+RUTA_IMAGENES = os.getenv("RUTA_IMAGENES", "data/imagenes")
+
+# Descargas simultáneas (y tamaño del pool de conexiones)
+IMAGENES_HILOS = int(os.getenv("IMAGENES_HILOS", 4))
+
+# Tamaño de cada bloque leído del socket y escrito a disco
+TAMANO_BLOQUE = 64 * 1024
+
+EXTENSIONES = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+
+class DescargadorImagenes:
+    """
+    Descarga las portadas en segundo plano mientras el scraper recorre el catálogo.
+
+    - Un pool de IMAGENES_HILOS hilos comparte una sesión HTTP con el mismo
+      número de conexiones persistentes.
+    - Cada imagen se escribe a disco por bloques mientras se calcula su
+      SHA-256, sin tener nunca el cuerpo completo en memoria.
+    - El archivo se guarda como <RUTA_IMAGENES>/<ab>/<sha256>.<ext>: dos
+      portadas idénticas ocupan un único archivo.
+    - Las URLs ya descargadas en ejecuciones anteriores no se vuelven a pedir.
+    - La ruta y el hash se anotan en `libros` a través del escritor, en el
+      mismo volcado por lotes que los datos del libro.
+
+    Si `activo` es False todos los métodos son no-ops, así los scrapers
+    pueden usarlo siempre sin comprobar la configuración.
+    """
+
+    def __init__(self, escritor, activo=DESCARGAR_IMAGENES, hilos=IMAGENES_HILOS, ruta=RUTA_IMAGENES):
+        self.escritor = escritor
+        self.activo = activo
+        self.ruta = ruta
+
+        self.descargadas = 0
+        self.duplicadas = 0
+        self.omitidas = 0
+        self.errores = 0
+        self.bytes = 0
+
+        if not activo:
+            return
+
+        os.makedirs(os.path.join(ruta, "tmp"), exist_ok=True)
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=hilos, pool_maxsize=hilos)
+        self.session.mount("http://", adaptador)
+        self.session.mount("https://", adaptador)
+
+        # url_imagen -> (ruta, hash) de lo ya descargado, también en ejecuciones anteriores
+        self._conocidas = escritor.imagenes_descargadas()
+        self._en_curso = set()
+        self._lock = threading.Lock()
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="imagenes")
+
+        log("INFO", f"Descarga de portadas activa ({hilos} hilos, {len(self._conocidas)} ya en disco)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def encolar(self, libro):
+        """Programa la descarga de la portada de `libro` si todavía no se tiene."""
+        if not self.activo or not libro.imagen_url:
+            return
+
+        url = libro.imagen_url
+        with self._lock:
+            conocida = self._conocidas.get(url)
+            if conocida is None:
+                if url in self._en_curso:
+                    return
+                self._en_curso.add(url)
+
+        if conocida is not None:
+            # Ya está en disco: solo se asegura que este libro la tenga anotada
+            with self._lock:
+                self.omitidas += 1
+            self.escritor.registrar_imagen(url, *conocida)
+            return
+
+        self._ejecutor.submit(self._descargar, url)
+
+    def cerrar(self):
+        """Espera a las descargas pendientes y muestra el resumen."""
+        if not self.activo:
+            return
+
+        self._ejecutor.shutdown(wait=True)
+        self.session.close()
+
+        resumen = (
+            f"{self.descargadas} descargadas ({self.bytes / 1024:.0f} KB), "
+            f"{self.duplicadas} con contenido repetido, {self.omitidas} ya en disco, {self.errores} errores"
+        )
+        print(f"\n🖼️  Portadas: {resumen}")
+        log("INFO", f"Portadas: {resumen}")
+
+    # ------------------------------------------------
+    # DESCARGA (HILOS DEL POOL)
+    # ------------------------------------------------
+    def _descargar(self, url):
+        try:
+            with metricas.medir("imagen"):
+                ruta, huella, tamano = self._guardar(url)
+        except Exception as e:
+            print(f"❌ Error descargando portada {url}: {e}")
+            log("ERROR", f"Error descargando portada {url}: {e}")
+            with self._lock:
+                self.errores += 1
+                self._en_curso.discard(url)
+            return
+
+        with self._lock:
+            self._conocidas[url] = (ruta, huella)
+            self._en_curso.discard(url)
+            if tamano is None:
+                self.duplicadas += 1
+            else:
+                self.descargadas += 1
+                self.bytes += tamano
+
+        self.escritor.registrar_imagen(url, ruta, huella)
+        log("DEBUG", f"Portada guardada: {url} → {ruta}")
+
+    def _guardar(self, url):
+        """
+        Descarga `url` por bloques a un temporal y lo mueve a su ruta por hash.
+
+        Devuelve (ruta, hash, bytes escritos), con bytes None si el contenido ya existía.
+        """
+        esperar(url)
+        inicio = time.monotonic()
+
+        try:
+            respuesta = self.session.get(url, stream=True, timeout=10)
+        except Exception:
+            limitador.registrar(url, error=True)
+            raise
+
+        with respuesta:
+            limitador.registrar(
+                url,
+                estado=respuesta.status_code,
+                latencia=time.monotonic() - inicio,
+                retry_after=respuesta.headers.get("Retry-After"),
+            )
+            respuesta.raise_for_status()
+
+            sha = hashlib.sha256()
+            tamano = 0
+            descriptor, temporal = tempfile.mkstemp(dir=os.path.join(self.ruta, "tmp"))
+            try:
+                with os.fdopen(descriptor, "wb") as archivo:
+                    for bloque in respuesta.iter_content(TAMANO_BLOQUE):
+                        sha.update(bloque)
+                        archivo.write(bloque)
+                        tamano += len(bloque)
+            except BaseException:
+                os.remove(temporal)
+                raise
+
+            tipo = respuesta.headers.get("Content-Type", "").split(";")[0].strip()
+
+        huella = sha.hexdigest()
+        extension = EXTENSIONES.get(tipo) or os.path.splitext(url)[1].lower() or ".img"
+        destino = os.path.join(self.ruta, huella[:2], huella + extension)
+
+        if os.path.exists(destino):
+            # Misma portada ya guardada (por otra URL o en otra ejecución)
+            os.remove(temporal)
+            return destino, huella, None
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(temporal, destino)
+        return destino, huella, tamano
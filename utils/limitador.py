@@ -0,0 +1,192 @@
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from utils.logger import log
+
+load_dotenv()
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DEL LIMITADOR DESDE VARIABLES DE ENTORNO
+# ---------------------------------------------------------
+
+# Por compatibilidad, la tasa inicial se deriva de DELAY_SEGUNDOS
+# (un request cada DELAY segundos) salvo que se indique TASA_RPS.
+_DELAY = float(os.getenv("DELAY_SEGUNDOS", "2"))
+TASA_RPS = float(os.getenv("TASA_RPS", 1 / _DELAY if _DELAY > 0 else 10))
+
+# Requests que se pueden lanzar seguidos cuando la cubeta está llena
+TASA_RAFAGA = float(os.getenv("TASA_RAFAGA", 3))
+
+# Límites entre los que se mueve la tasa adaptativa
+TASA_MIN_RPS = float(os.getenv("TASA_MIN_RPS", min(0.1, TASA_RPS)))
+TASA_MAX_RPS = float(os.getenv("TASA_MAX_RPS", max(5, TASA_RPS)))
+
+# Códigos que indican que el servidor pide bajar el ritmo
+CODIGOS_SATURACION = {429, 503}
+
+# Por debajo de esta latencia (segundos) el servidor se considera sano,
+# aunque sea el doble de la mejor observada
+LATENCIA_SANA = 0.25
+
+
+def _segundos_retry_after(valor):
+    """
+    Interpreta la cabecera Retry-After, que puede venir en segundos
+    o como fecha HTTP. Devuelve los segundos a esperar o None.
+    """
+    if not valor:
+        return None
+
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+
+    try:
+        fecha = parsedate_to_datetime(valor)
+        return max(0.0, fecha.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Cubeta:
+    """Estado del token bucket de un host."""
+
+    __slots__ = ("tasa", "tokens", "ultimo", "pausa_hasta", "latencia", "latencia_base")
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+        self.pausa_hasta = 0.0
+        self.latencia = None        # Media móvil de la latencia observada
+        self.latencia_base = None   # Mejor latencia media vista (servidor "sano")
+
+
+class LimitadorTasa:
+    """
+    Token bucket por host con tasa adaptativa.
+
+    - Cada request consume un token; los tokens se reponen a `tasa` por
+      segundo hasta un máximo de `rafaga`.
+    - Tras cada respuesta la tasa se ajusta sola: sube poco a poco mientras
+      el servidor responde rápido, baja a la mitad ante 429/503 o errores,
+      y baja suavemente si la latencia se dispara.
+    - Retry-After pausa el host durante el tiempo indicado.
+
+    Es seguro entre hilos y sirve tanto para código síncrono como asyncio,
+    porque reservar() solo calcula cuánto hay que esperar.
+    """
+
+    def __init__(self, tasa=TASA_RPS, rafaga=TASA_RAFAGA, tasa_min=TASA_MIN_RPS, tasa_max=TASA_MAX_RPS):
+        self.tasa_inicial = tasa
+        self.rafaga = rafaga
+        self.tasa_min = tasa_min
+        self.tasa_max = tasa_max
+        self._cubetas = {}
+        self._lock = threading.Lock()
+
+    def _cubeta(self, host):
+        cubeta = self._cubetas.get(host)
+        if cubeta is None:
+            cubeta = self._cubetas[host] = _Cubeta(self.tasa_inicial, self.rafaga)
+        return cubeta
+
+    def reservar(self, url):
+        """
+        Reserva un token para el host de `url` y devuelve los segundos
+        que hay que esperar antes de lanzar el request.
+
+        Si no quedan tokens, la cubeta queda "en deuda", de modo que los
+        siguientes llamantes esperan en fila sin adelantarse.
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            cubeta = self._cubeta(host)
+            ahora = time.monotonic()
+
+            # Reposición de tokens desde la última reserva
+            cubeta.tokens = min(self.rafaga, cubeta.tokens + (ahora - cubeta.ultimo) * cubeta.tasa)
+            cubeta.ultimo = ahora
+            cubeta.tokens -= 1
+
+            espera = -cubeta.tokens / cubeta.tasa if cubeta.tokens < 0 else 0.0
+            espera = max(espera, cubeta.pausa_hasta - ahora)
+
+        # Pequeño margen aleatorio para evitar patrones predecibles
+        if espera > 0:
+            espera += random.uniform(0, 0.2 / cubeta.tasa)
+
+        return espera
+
+    def registrar(self, url, estado=None, latencia=None, retry_after=None, error=False):
+        """
+        Ajusta la tasa del host según la respuesta observada.
+
+        estado:      código HTTP (None si no se conoce, ej. Selenium)
+        latencia:    segundos que tardó la respuesta
+        retry_after: valor crudo de la cabecera Retry-After
+        error:       True si el request falló sin respuesta (timeout, conexión)
+        """
+        host = urlsplit(url).netloc
+        pausa = _segundos_retry_after(retry_after)
+
+        with self._lock:
+            cubeta = self._cubeta(host)
+            tasa_anterior = cubeta.tasa
+
+            if pausa is not None:
+                cubeta.pausa_hasta = max(cubeta.pausa_hasta, time.monotonic() + pausa)
+
+            if error or estado in CODIGOS_SATURACION or (estado is not None and estado >= 500):
+                # Decremento multiplicativo: el servidor está sufriendo
+                cubeta.tasa = max(self.tasa_min, cubeta.tasa * 0.5)
+
+            elif latencia is not None:
+                # Media móvil exponencial de la latencia
+                cubeta.latencia = latencia if cubeta.latencia is None else 0.8 * cubeta.latencia + 0.2 * latencia
+                if cubeta.latencia_base is None or cubeta.latencia < cubeta.latencia_base:
+                    cubeta.latencia_base = cubeta.latencia
+
+                if cubeta.latencia > max(2 * cubeta.latencia_base, LATENCIA_SANA):
+                    # Latencia disparada: se frena un poco
+                    cubeta.tasa = max(self.tasa_min, cubeta.tasa * 0.9)
+                else:
+                    # Incremento aditivo mientras haya margen
+                    cubeta.tasa = min(self.tasa_max, cubeta.tasa + self.tasa_inicial * 0.05)
+
+            tasa_nueva = cubeta.tasa
+
+        if tasa_nueva < tasa_anterior * 0.95:
+            log("WARNING", f"Reduciendo ritmo en {host}: {tasa_anterior:.2f} → {tasa_nueva:.2f} req/s (HTTP {estado})")
+        if pausa:
+            log("WARNING", f"{host} pidió Retry-After de {pausa:.1f} segundos")
+
+    def tasa(self, url):
+        """Tasa actual (req/s) del host de `url`."""
+        with self._lock:
+            return self._cubeta(urlsplit(url).netloc).tasa
+
+    def repartir(self, partes):
+        """
+        Divide el presupuesto entre `partes` procesos que atacan los mismos hosts.
+
+        Cada proceso tiene su propio limitador; para que entre todos no
+        superen TASA_RPS / TASA_MAX_RPS, cada uno se queda con su parte.
+        """
+        if partes <= 1:
+            return
+        with self._lock:
+            self.tasa_inicial /= partes
+            self.tasa_min /= partes
+            self.tasa_max /= partes
+            self.rafaga = max(1.0, self.rafaga / partes)
+            self._cubetas.clear()
+
+
+# Instancia compartida por todos los scrapers
+limitador = LimitadorTasa()
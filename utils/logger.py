@@ -1,4 +1,9 @@
 import os
+import json
+import time
+import queue
+import atexit
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -7,19 +12,125 @@ load_dotenv()
 # Archivo donde se guardarán los logs (desde .env)
 ARCHIVO_LOG = os.getenv("LOG_ARCHIVO", "logs.log")
 
+# Nivel mínimo que se escribe: DEBUG / INFO / WARNING / ERROR
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO").upper()
+
+# Formato de salida: "texto" (por defecto) o "jsonl" (una línea JSON por mensaje)
+LOG_FORMATO = os.getenv("LOG_FORMATO", "texto").lower()
+
+# Máximo de mensajes que el hilo escritor agrupa en una sola escritura
+LOG_LOTE = 500
+
+NIVELES = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+_UMBRAL = NIVELES.get(LOG_NIVEL, NIVELES["INFO"])
+
+# Cola entre los hilos que registran y el hilo que escribe el archivo
+_cola = queue.SimpleQueue()
+_hilo = None
+_lock_hilo = threading.Lock()
+_FIN = None
+
+
 def iniciar_logger():
-    """Crear archivo si no existe."""
+    """Crear archivo si no existe y arrancar el hilo escritor."""
     open(ARCHIVO_LOG, "a").close()
+    _asegurar_hilo()
+
 
 def log(nivel, mensaje):
     """
-    Escribe un log en formato texto.
-    Ejemplo:
+    Registra un mensaje si su nivel alcanza LOG_NIVEL.
+
+    Los mensajes por debajo del nivel se descartan antes de formatear nada.
+    El resto se encola y los escribe un hilo en segundo plano, que mantiene
+    el archivo abierto y vuelca en lotes.
+
+    Ejemplo (formato texto):
     [2025-01-12 12:00:00] [INFO] Inicio del proceso
     """
-    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    linea = f"[{fecha}] [{nivel}] {mensaje}\n"
+    if NIVELES.get(nivel, NIVELES["ERROR"]) < _UMBRAL:
+        return
+
+    if _hilo is None:
+        _asegurar_hilo()
+
+    _cola.put((time.time(), nivel, mensaje))
+
+
+def cerrar_logger():
+    """Espera a que se escriban los mensajes pendientes y detiene el hilo."""
+    global _hilo
+    with _lock_hilo:
+        if _hilo is None:
+            return
+        _cola.put(_FIN)
+        _hilo.join()
+        _hilo = None
+
+
+def _asegurar_hilo():
+    global _hilo
+    with _lock_hilo:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_escritor, name="logger", daemon=True)
+            _hilo.start()
+
+
+def _formatear(marca, nivel, mensaje, cache):
+    """Formatea una línea reutilizando la fecha si cae en el mismo segundo."""
+    segundo = int(marca)
+    if cache[0] != segundo:
+        cache[0] = segundo
+        cache[1] = datetime.fromtimestamp(segundo).strftime("%Y-%m-%d %H:%M:%S")
+
+    if LOG_FORMATO == "jsonl":
+        return json.dumps({"fecha": cache[1], "nivel": nivel, "mensaje": str(mensaje)}, ensure_ascii=False) + "\n"
+
+    return f"[{cache[1]}] [{nivel}] {mensaje}\n"
+
+
+def _escritor():
+    """Bucle del hilo escritor: agrupa mensajes de la cola y los escribe juntos."""
+    cache = [None, ""]
 
     with open(ARCHIVO_LOG, "a", encoding="utf-8") as f:
-        f.write(linea)
+        while True:
+            registro = _cola.get()
+            lineas = []
+            terminar = registro is _FIN
+
+            if not terminar:
+                lineas.append(_formatear(*registro, cache))
+
+            # Recoge lo que ya esté en cola sin bloquear
+            while not terminar and len(lineas) < LOG_LOTE:
+                try:
+                    registro = _cola.get_nowait()
+                except queue.Empty:
+                    break
+                if registro is _FIN:
+                    terminar = True
+                else:
+                    lineas.append(_formatear(*registro, cache))
+
+            if lineas:
+                f.writelines(lineas)
+                f.flush()
+
+            if terminar:
+                return
+
+
+def _reiniciar_tras_fork():
+    # El proceso hijo no hereda el hilo escritor: se parte de cero
+    global _cola, _hilo, _lock_hilo
+    _cola = queue.SimpleQueue()
+    _hilo = None
+    _lock_hilo = threading.Lock()
+
+
+atexit.register(cerrar_logger)
 
+# register_at_fork solo existe en sistemas POSIX
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_tras_fork)
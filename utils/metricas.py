@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from dotenv import load_dotenv
+from utils.logger import log
+
+load_dotenv()
+
+# ---------------------------------------------------------
+# MÉTRICAS DE EJECUCIÓN (CONTADORES E HISTOGRAMAS)
+# ---------------------------------------------------------
+# Los scrapers registran aquí cuánto tarda cada request HTTP, cada parseo,
+# cada escritura en la BD y cada llamada a WebDriver. Al final de la
+# ejecución se imprime una tabla resumen y se vuelca en JSON y en el
+# formato de texto de Prometheus; durante la ejecución el mismo volcado
+# puede consultarse en http://127.0.0.1:METRICAS_PUERTO/metrics.
+
+# Puerto del endpoint de métricas (0 = desactivado)
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", 0))
+
+# Ruta base de los volcados: se escriben <ruta>.json y <ruta>.prom ("" = no volcar)
+METRICAS_ARCHIVO = os.getenv("METRICAS_ARCHIVO", "data/metricas")
+
+# Límites superiores (segundos) de las cubetas de los histogramas
+CUBETAS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+PREFIJO_PROMETHEUS = "scraper_"
+
+
+class Histograma:
+    """
+    Histograma de latencias con cubetas fijas.
+
+    Ocupa lo mismo con diez observaciones que con un millón; los percentiles
+    se estiman interpolando dentro de la cubeta correspondiente.
+    """
+
+    __slots__ = ("cuentas", "suma", "total", "maximo")
+
+    def __init__(self):
+        self.cuentas = [0] * len(CUBETAS)
+        self.suma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, segundos):
+        self.cuentas[bisect.bisect_left(CUBETAS, segundos)] += 1
+        self.suma += segundos
+        self.total += 1
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, p):
+        if not self.total:
+            return 0.0
+
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for i, cuenta in enumerate(self.cuentas):
+            if acumulado + cuenta >= objetivo and cuenta:
+                inferior = CUBETAS[i - 1] if i else 0.0
+                superior = min(CUBETAS[i], self.maximo)
+                return inferior + (superior - inferior) * (objetivo - acumulado) / cuenta
+            acumulado += cuenta
+        return self.maximo
+
+
+def _etiquetas_prometheus(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{clave}="{valor}"' for clave, valor in pares) + "}"
+
+
+class RegistroMetricas:
+    """
+    Registro de métricas compartido por todos los hilos de una ejecución.
+
+    Cada serie se identifica por un nombre y unas etiquetas (por ejemplo
+    "http" con estado="200"). Las operaciones son baratas y están protegidas
+    por un lock, así que pueden llamarse desde cualquier hilo o corrutina.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._indicadores = {}
+        self._histogramas = {}
+        self._inicio = time.monotonic()
+        self._servidor = None
+
+    # ---------------- REGISTRO ----------------
+
+    def contar(self, nombre, n=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + n
+
+    def fijar(self, nombre, valor, **etiquetas):
+        """Indicador que puede subir o bajar (memoria, tamaño de una estructura...)."""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._indicadores[clave] = valor
+
+    def observar(self, nombre, segundos, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma()
+            histograma.observar(segundos)
+
+    @contextmanager
+    def medir(self, nombre, **etiquetas):
+        """Mide la duración del bloque; si falla también cuenta un error."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.contar(f"{nombre}_errores", **etiquetas)
+            raise
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+    # ---------------- EXPORTACIÓN ----------------
+
+    def instantanea(self):
+        """Estado actual de todas las series como diccionario serializable."""
+        with self._lock:
+            contadores = [
+                {"nombre": nombre, "etiquetas": dict(etiquetas), "valor": valor}
+                for (nombre, etiquetas), valor in sorted(self._contadores.items())
+            ]
+            indicadores = [
+                {"nombre": nombre, "etiquetas": dict(etiquetas), "valor": valor}
+                for (nombre, etiquetas), valor in sorted(self._indicadores.items())
+            ]
+            histogramas = [
+                {
+                    "nombre": nombre,
+                    "etiquetas": dict(etiquetas),
+                    "total": h.total,
+                    "suma_s": round(h.suma, 6),
+                    "p50_s": round(h.percentil(50), 6),
+                    "p95_s": round(h.percentil(95), 6),
+                    "p99_s": round(h.percentil(99), 6),
+                    "max_s": round(h.maximo, 6),
+                    "cubetas": {str(limite): cuenta for limite, cuenta in zip(CUBETAS, h.cuentas)},
+                }
+                for (nombre, etiquetas), h in sorted(self._histogramas.items())
+            ]
+        return {
+            "duracion_s": round(time.monotonic() - self._inicio, 3),
+            "contadores": contadores,
+            "indicadores": indicadores,
+            "histogramas": histogramas,
+        }
+
+    def prometheus(self):
+        """Volcado en el formato de texto de Prometheus."""
+        lineas = []
+        with self._lock:
+            vistos = set()
+            for (nombre, etiquetas), valor in sorted(self._contadores.items()):
+                metrica = f"{PREFIJO_PROMETHEUS}{nombre}_total"
+                if metrica not in vistos:
+                    lineas.append(f"# TYPE {metrica} counter")
+                    vistos.add(metrica)
+                lineas.append(f"{metrica}{_etiquetas_prometheus(etiquetas)} {valor}")
+
+            for (nombre, etiquetas), valor in sorted(self._indicadores.items()):
+                metrica = f"{PREFIJO_PROMETHEUS}{nombre}"
+                if metrica not in vistos:
+                    lineas.append(f"# TYPE {metrica} gauge")
+                    vistos.add(metrica)
+                lineas.append(f"{metrica}{_etiquetas_prometheus(etiquetas)} {valor}")
+
+            for (nombre, etiquetas), h in sorted(self._histogramas.items()):
+                metrica = f"{PREFIJO_PROMETHEUS}{nombre}_segundos"
+                if metrica not in vistos:
+                    lineas.append(f"# TYPE {metrica} histogram")
+                    vistos.add(metrica)
+
+                acumulado = 0
+                for limite, cuenta in zip(CUBETAS, h.cuentas):
+                    acumulado += cuenta
+                    le = "+Inf" if limite == float("inf") else repr(limite)
+                    lineas.append(f"{metrica}_bucket{_etiquetas_prometheus(etiquetas, [('le', le)])} {acumulado}")
+                lineas.append(f"{metrica}_sum{_etiquetas_prometheus(etiquetas)} {h.suma}")
+                lineas.append(f"{metrica}_count{_etiquetas_prometheus(etiquetas)} {h.total}")
+
+        return "\n".join(lineas) + "\n"
+
+    def tabla(self):
+        """Tabla resumen legible de histogramas y contadores."""
+        datos = self.instantanea()
+        lineas = [
+            f"{'Métrica':<12} {'Etiquetas':<26} {'N':>7} {'Total s':>9} {'Media ms':>9} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Máx ms':>8}"
+        ]
+        for h in datos["histogramas"]:
+            etiquetas = ",".join(f"{k}={v}" for k, v in h["etiquetas"].items()) or "-"
+            media = h["suma_s"] / h["total"] * 1000 if h["total"] else 0.0
+            lineas.append(
+                f"{h['nombre']:<12} {etiquetas:<26} {h['total']:>7} {h['suma_s']:>9.3f} {media:>9.2f} "
+                f"{h['p50_s'] * 1000:>8.2f} {h['p95_s'] * 1000:>8.2f} {h['p99_s'] * 1000:>8.2f} {h['max_s'] * 1000:>8.2f}"
+            )
+
+        if datos["contadores"]:
+            lineas.append("")
+            lineas.append(f"{'Contador':<20} {'Etiquetas':<26} {'Valor':>9}")
+            for c in datos["contadores"]:
+                etiquetas = ",".join(f"{k}={v}" for k, v in c["etiquetas"].items()) or "-"
+                lineas.append(f"{c['nombre']:<20} {etiquetas:<26} {c['valor']:>9}")
+
+        if datos["indicadores"]:
+            lineas.append("")
+            lineas.append(f"{'Indicador':<20} {'Etiquetas':<26} {'Valor':>9}")
+            for i in datos["indicadores"]:
+                etiquetas = ",".join(f"{k}={v}" for k, v in i["etiquetas"].items()) or "-"
+                valor = f"{i['valor']:.6g}" if isinstance(i["valor"], float) else i["valor"]
+                lineas.append(f"{i['nombre']:<20} {etiquetas:<26} {valor:>9}")
+
+        lineas.append(f"\nDuración total: {datos['duracion_s']:.2f} s")
+        return "\n".join(lineas)
+
+    def volcar(self, ruta=METRICAS_ARCHIVO):
+        """Escribe <ruta>.json y <ruta>.prom con el estado actual."""
+        if not ruta:
+            return
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+
+        with open(f"{ruta}.json", "w", encoding="utf-8") as f:
+            json.dump(self.instantanea(), f, indent=2, ensure_ascii=False)
+        with open(f"{ruta}.prom", "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+
+        log("INFO", f"Métricas volcadas en {ruta}.json y {ruta}.prom")
+
+    def informe(self):
+        """Imprime la tabla resumen y vuelca las métricas a disco."""
+        print("\n📈 Métricas de la ejecución:")
+        print(self.tabla())
+        try:
+            self.volcar()
+        except OSError as e:
+            log("ERROR", f"No se pudieron volcar las métricas: {e}")
+
+    # ---------------- ENDPOINT HTTP ----------------
+
+    def servir(self, puerto=METRICAS_PUERTO, host="127.0.0.1"):
+        """
+        Expone /metrics (Prometheus) y /metrics.json en un hilo de fondo
+        para consultar el progreso durante ejecuciones largas.
+        """
+        if self._servidor is not None or not puerto:
+            return
+
+        registro = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    cuerpo, tipo = registro.prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    cuerpo, tipo = json.dumps(registro.instantanea()), "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+
+                datos = cuerpo.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, formato, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="metricas-http", daemon=True).start()
+
+        print(f"📈 Métricas disponibles en http://{host}:{puerto}/metrics")
+        log("INFO", f"Endpoint de métricas escuchando en {host}:{puerto}")
+
+
+# Registro único compartido por todos los scrapers
+metricas = RegistroMetricas()
@@ -1,31 +1,50 @@
 import os
 import time
-import random
+import asyncio
 from dotenv import load_dotenv
 from utils.logger import log
+from utils.limitador import limitador
+from utils.metricas import metricas
 
 # Carga las variables desde el archivo .env
 load_dotenv()
 
-# Obtiene el valor base de espera desde las variables de entorno.
-# Si no existe, usa un valor por defecto de 2 segundos.
-DELAY = int(os.getenv("DELAY_SEGUNDOS", "2"))
+# URL base usada cuando no se indica a qué host va el request
+BASE = os.getenv("URL_DESTINO", "https://books.toscrape.com/")
 
-def esperar():
+
+def esperar(url=BASE):
     """
-    Pausa la ejecución del programa por un tiempo compuesto por:
-    - un delay fijo obtenido desde el entorno
-    - un pequeño valor aleatorio para evitar patrones predecibles
+    Pausa la ejecución lo justo para respetar el límite de ritmo
+    del host de `url` antes de lanzar un request.
+
+    El tiempo lo decide el limitador compartido (utils/limitador.py),
+    que reparte un presupuesto de requests por segundo con ráfagas y
+    se adapta a la latencia, a los 429/503 y a Retry-After.
 
-    También registra el tiempo real de espera.
+    También registra el tiempo de espera en el log y en las métricas.
     """
-    
-    # Calcula el tiempo final combinando delay y un margen aleatorio entre 0.2 y 0.8 s
-    tiempo = DELAY + random.uniform(0.2, 0.8)
+    tiempo = limitador.reservar(url)
+    metricas.observar("espera", tiempo)
+
+    if tiempo > 0:
+        # Registra el tiempo de pausa con dos decimales
+        log("DEBUG", f"Pausa de {tiempo:.2f} segundos")
+
+        # Detiene la ejecución durante el tiempo calculado
+        time.sleep(tiempo)
 
-    # Registra el tiempo de pausa con dos decimales
-    log("INFO", f"Pausa de {tiempo:.2f} segundos")
 
-    # Detiene la ejecución durante el tiempo calculado
-    time.sleep(tiempo)
+async def esperar_async(url=BASE):
+    """
+    Versión asíncrona de esperar().
+
+    Calcula la pausa de la misma forma, pero cede el control al event loop
+    en lugar de bloquear el hilo, para que otros requests sigan en curso.
+    """
+    tiempo = limitador.reservar(url)
+    metricas.observar("espera", tiempo)
 
+    if tiempo > 0:
+        log("DEBUG", f"Pausa de {tiempo:.2f} segundos")
+        await asyncio.sleep(tiempo)
@@ -0,0 +1,149 @@
+import os
+import sys
+import math
+import hashlib
+from dotenv import load_dotenv
+from utils.metricas import metricas
+
+load_dotenv()
+
+# ---------------------------------------------------------
+# CONFIGURACIÓN DE LOS CONJUNTOS DE VISTOS
+# ---------------------------------------------------------
+
+# Hasta este número de claves se usa un set exacto; por encima, un filtro de Bloom
+VISTOS_MAX_CLAVES = int(os.getenv("VISTOS_MAX_CLAVES", 1_000_000))
+
+# Tasa de falsos positivos objetivo del filtro de Bloom
+VISTOS_TASA_FP = float(os.getenv("VISTOS_TASA_FP", 0.001))
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre un bytearray de tamaño fijo.
+
+    Dimensionado para `capacidad` claves con una tasa de falsos positivos
+    `tasa_fp`: m = -n·ln(p) / ln(2)² bits y k = m/n · ln(2) funciones hash,
+    obtenidas por doble hashing de un único blake2b de 128 bits.
+    Nunca da falsos negativos.
+    """
+
+    __slots__ = ("bits", "m", "k", "claves")
+
+    def __init__(self, capacidad, tasa_fp=VISTOS_TASA_FP):
+        capacidad = max(1, capacidad)
+        self.m = max(8, int(-capacidad * math.log(tasa_fp) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacidad * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.claves = 0
+
+    def _posiciones(self, clave):
+        resumen = hashlib.blake2b(clave.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(resumen[:8], "little")
+        h2 = int.from_bytes(resumen[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def agregar(self, clave):
+        for posicion in self._posiciones(clave):
+            self.bits[posicion >> 3] |= 1 << (posicion & 7)
+        self.claves += 1
+
+    def __contains__(self, clave):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._posiciones(clave))
+
+    def tasa_estimada(self):
+        """Probabilidad de falso positivo con las claves añadidas hasta ahora."""
+        return (1 - math.exp(-self.k * self.claves / self.m)) ** self.k
+
+
+class ConjuntoVistos:
+    """
+    Claves ya vistas (URLs de libros, enlaces de detalle) con comprobación O(1) en memoria.
+
+    - Con pocas claves (≤ VISTOS_MAX_CLAVES) es un set exacto.
+    - Con más, un filtro de Bloom de memoria acotada. Un "sí" del filtro
+      puede ser un falso positivo, así que si se indica `consulta` (una
+      función clave -> bool contra la BD) se confirma con ella; un "no"
+      es siempre exacto y no toca la BD.
+
+    Las claves añadidas durante la ejecución se guardan además en un set,
+    porque pueden no estar todavía en la BD cuando se pregunta por ellas.
+    """
+
+    def __init__(self, nombre, claves=(), total=0, consulta=None,
+                 max_claves=VISTOS_MAX_CLAVES, tasa_fp=VISTOS_TASA_FP):
+        self.nombre = nombre
+        self.consulta = consulta
+        self.consultas = 0
+        self.falsos_positivos = 0
+
+        # Margen para las claves nuevas de esta y próximas ejecuciones
+        self._bloom = FiltroBloom(int(total * 1.5), tasa_fp) if total > max_claves else None
+        self._conjunto = set()
+
+        if self._bloom is None:
+            self._conjunto.update(claves)
+        else:
+            for clave in claves:
+                self._bloom.agregar(clave)
+
+    def __len__(self):
+        return len(self._conjunto) + (self._bloom.claves if self._bloom is not None else 0)
+
+    def __contains__(self, clave):
+        if clave in self._conjunto:
+            return True
+        if self._bloom is None or clave not in self._bloom:
+            return False
+        if self.consulta is None:
+            return True
+
+        # Posible falso positivo: se confirma contra la BD
+        self.consultas += 1
+        existe = bool(self.consulta(clave))
+        if not existe:
+            self.falsos_positivos += 1
+        return existe
+
+    def agregar(self, clave):
+        """Añade `clave` y devuelve True si no estaba."""
+        if clave in self:
+            return False
+        self._conjunto.add(clave)
+        return True
+
+    def nuevas(self, claves):
+        """Las claves de `claves` que no se habían visto, ya añadidas, en orden."""
+        return [clave for clave in claves if self.agregar(clave)]
+
+    # ------------------------------------------------
+    # RESUMEN
+    # ------------------------------------------------
+    def memoria(self):
+        """Bytes aproximados que ocupa la estructura (set + cadenas + filtro)."""
+        total = sys.getsizeof(self._conjunto) + sum(sys.getsizeof(clave) for clave in self._conjunto)
+        if self._bloom is not None:
+            total += sys.getsizeof(self._bloom.bits)
+        return total
+
+    def tasa_falsos_positivos(self):
+        """Tasa estimada del filtro (0 con set exacto)."""
+        return self._bloom.tasa_estimada() if self._bloom is not None else 0.0
+
+    def publicar(self):
+        """Registra claves, memoria y tasa de falsos positivos como indicadores."""
+        metricas.fijar("vistos_claves", len(self), conjunto=self.nombre)
+        metricas.fijar("vistos_bytes", self.memoria(), conjunto=self.nombre)
+        metricas.fijar("vistos_fp_estimada", self.tasa_falsos_positivos(), conjunto=self.nombre)
+        if self.consultas:
+            metricas.fijar("vistos_fp_observada", self.falsos_positivos / self.consultas, conjunto=self.nombre)
+
+    def resumen(self):
+        tipo = f"Bloom (m={self._bloom.m} bits, k={self._bloom.k})" if self._bloom is not None else "set"
+        texto = (
+            f"{self.nombre}: {len(self)} claves en {tipo}, {self.memoria() / 1024:.0f} KB, "
+            f"falsos positivos estimados {self.tasa_falsos_positivos():.4%}"
+        )
+        if self._bloom is not None and self.consulta is not None:
+            texto += f", observados {self.falsos_positivos}/{self.consultas} consultas a la BD"
+        return texto